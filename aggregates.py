@@ -0,0 +1,297 @@
+import threading
+from collections import Counter
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from salary_sketch import grouped_sketches
+from sketches import CellSketches, FrameSketches
+from skill_matrix import grouped_counts
+
+# Whole-dataset aggregates keyed by DatasetStore dataset key (dataset_id, version)
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _nested_counts(group_codes, groups, item_codes, items):
+    """{group: {item: count}} from code arrays, groups and items in first-seen order; -1 codes are skipped"""
+    group_codes = np.asarray(group_codes)
+    item_codes = np.asarray(item_codes)
+    valid = (group_codes >= 0) & (item_codes >= 0)
+    return {
+        groups[group]: {items[item]: count for item, count in pairs}
+        for group, pairs in grouped_counts(group_codes[valid], item_codes[valid], max(len(items), 1))
+    }
+
+
+def _merge_counts(left, right):
+    """Add two {group: {item: count}} dicts; new groups and items go after the existing ones"""
+    merged = {group: dict(counts) for group, counts in left.items()}
+    for group, counts in right.items():
+        target = merged.setdefault(group, {})
+        for item, count in counts.items():
+            target[item] = target.get(item, 0) + count
+    return merged
+
+
+def _merge_sketches(left, right):
+    """Merge two {group: SalarySketch} dicts; new groups go after the existing ones"""
+    merged = dict(left)
+    for group, sketch in right.items():
+        merged[group] = merged[group].merge(sketch) if group in merged else sketch
+    return merged
+
+
+def _codes_with_missing(df, column):
+    """Factorize a column with missing values (or a missing column) as one trailing None group"""
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=np.int64), [None]
+    codes, values = pd.factorize(df[column])
+    return np.where(codes < 0, len(values), codes), list(values) + [None]
+
+
+class GroupAggregates:
+    """Mergeable per-value statistics of one column (city or company); salaries are SalarySketches"""
+
+    def __init__(self, column, paired_column):
+        self.column = column
+        self.paired_column = paired_column
+        self.has_remote = False
+        self.jobs = {}
+        self.skills = {}
+        self.salaries = {}
+        self.remote = {}
+        self.paired = {}
+        self.seniority = {}
+
+    @classmethod
+    def from_frame(cls, df, column, paired_column, matrix, salaries):
+        aggregates = cls(column, paired_column)
+        aggregates.has_remote = 'remote' in df.columns
+        if column not in df.columns:
+            return aggregates
+
+        codes, values = pd.factorize(df[column])
+        values = list(values)
+        jobs = np.bincount(codes[codes >= 0], minlength=len(values))
+        aggregates.jobs = {value: int(count) for value, count in zip(values, jobs)}
+
+        aggregates.skills = _nested_counts(codes[matrix.entry_rows], values, matrix.indices, matrix.skills)
+
+        aggregates.salaries = {
+            values[group]: sketch for group, sketch in grouped_sketches(codes, salaries).items()
+        }
+
+        if aggregates.has_remote:
+            remote = pd.to_numeric(df['remote'], errors='coerce').astype(float).to_numpy()
+            valid = (codes >= 0) & ~np.isnan(remote)
+            sums = np.bincount(codes[valid], weights=remote[valid], minlength=len(values))
+            counts = np.bincount(codes[valid], minlength=len(values))
+            aggregates.remote = {
+                value: (float(total), int(count))
+                for value, total, count in zip(values, sums, counts) if count
+            }
+
+        if paired_column in df.columns:
+            paired_codes, paired_values = pd.factorize(df[paired_column])
+            aggregates.paired = {
+                value: set(paired)
+                for value, paired in _nested_counts(codes, values, paired_codes, list(paired_values)).items()
+            }
+
+        if 'seniority' in df.columns:
+            seniority_codes, seniorities = pd.factorize(df['seniority'])
+            aggregates.seniority = _nested_counts(codes, values, seniority_codes, list(seniorities))
+
+        return aggregates
+
+    def merge(self, other):
+        """Aggregates of this data followed by other's"""
+        merged = GroupAggregates(self.column, self.paired_column)
+        merged.has_remote = self.has_remote or other.has_remote
+
+        merged.jobs = dict(self.jobs)
+        for value, count in other.jobs.items():
+            merged.jobs[value] = merged.jobs.get(value, 0) + count
+
+        merged.skills = _merge_counts(self.skills, other.skills)
+        merged.salaries = _merge_sketches(self.salaries, other.salaries)
+        merged.seniority = _merge_counts(self.seniority, other.seniority)
+
+        merged.remote = dict(self.remote)
+        for value, (total, count) in other.remote.items():
+            merged_total, merged_count = merged.remote.get(value, (0.0, 0))
+            merged.remote[value] = (merged_total + total, merged_count + count)
+
+        merged.paired = {value: set(paired) for value, paired in self.paired.items()}
+        for value, paired in other.paired.items():
+            merged.paired.setdefault(value, set()).update(paired)
+
+        return merged
+
+    def salary_stats(self, value):
+        """Mean, median, count and percentiles of the salaries of a value, {} without salaries"""
+        sketch = self.salaries.get(value)
+        return sketch.summary() if sketch is not None else {}
+
+    def remote_ratio(self, value):
+        if not self.has_remote:
+            return 0
+        total, count = self.remote.get(value, (0.0, 0))
+        return total / count if count else np.nan
+
+    def top_skills(self, value, top_n):
+        """Most requested skills of a value; ties keep first-seen order like Counter.most_common"""
+        return sorted(self.skills.get(value, {}).items(), key=lambda x: x[1], reverse=True)[:top_n]
+
+    def seniority_distribution(self, value):
+        """Seniority counts of a value in descending order, ties in first-seen order like value_counts"""
+        return dict(sorted(self.seniority.get(value, {}).items(), key=lambda x: x[1], reverse=True))
+
+
+class DatasetAggregates:
+    """Mergeable aggregates of a whole dataset version.
+
+    Skill and level counters, skills by seniority, the skill co-occurrence
+    matrix, salary sketches per skill and seniority, per-city/company
+    statistics and the approximate FrameSketches, whole and per cell. A new upload builds them
+    for the accepted offers only and merges them onto the previous version.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = set()
+        self.skills = []
+        self.skill_counts = np.zeros(0, dtype=np.int64)
+        self.skill_levels = {}
+        self.skills_by_seniority = {}
+        self.cooccurrence = sp.csr_matrix((0, 0), dtype=np.int64)
+        self.skill_salaries = {}
+        self.seniority_salaries = {}
+        self.sketches = FrameSketches()
+        self.cell_sketches = CellSketches()
+        self.locations = GroupAggregates('city', 'company')
+        self.companies = GroupAggregates('company', 'city')
+
+    @classmethod
+    def from_frame(cls, df, matrix, parsed_salaries):
+        """Aggregates of df; parsed_salaries are its salary_avg values after DataProcessor salary parsing"""
+        aggregates = cls()
+        aggregates.rows = len(df)
+        aggregates.columns = set(df.columns)
+        aggregates.skills = list(matrix.skills)
+        aggregates.skill_counts = matrix.skill_counts().astype(np.int64)
+
+        level_names = [None] + list(matrix.levels)
+        aggregates.skill_levels = _nested_counts(matrix.indices, matrix.skills, matrix.data, level_names)
+
+        seniority_codes, seniorities = _codes_with_missing(df, 'seniority')
+        aggregates.skills_by_seniority = _nested_counts(
+            seniority_codes[matrix.entry_rows], seniorities, matrix.indices, matrix.skills)
+
+        aggregates.cooccurrence = matrix.cooccurrence()
+
+        # Salary sketches over positive parsed salaries, like DataProcessor.process_salary_data
+        parsed_salaries = np.asarray(parsed_salaries, dtype=float)
+        positive = np.where(parsed_salaries > 0, parsed_salaries, np.nan)
+        aggregates.skill_salaries = {
+            matrix.skills[skill]: sketch
+            for skill, sketch in grouped_sketches(matrix.indices, positive[matrix.entry_rows]).items()
+        }
+        if 'seniority' in df.columns:
+            seniority_codes, seniorities = pd.factorize(df['seniority'])
+            aggregates.seniority_salaries = {
+                seniorities[seniority]: sketch
+                for seniority, sketch in grouped_sketches(seniority_codes, positive).items()
+            }
+
+        aggregates.sketches = FrameSketches.from_frame(df, matrix)
+        aggregates.cell_sketches = CellSketches.from_frame(df, matrix)
+
+        # Location stats use the salary_avg column (parsed at upload for enriched frames), company stats the parsed salaries
+        salaries = np.full(len(df), np.nan)
+        if 'salary_avg' in df.columns:
+            salaries = pd.to_numeric(df['salary_avg'], errors='coerce').to_numpy(dtype=float)
+        aggregates.locations = GroupAggregates.from_frame(df, 'city', 'company', matrix, salaries)
+        aggregates.companies = GroupAggregates.from_frame(
+            df, 'company', 'city', matrix, parsed_salaries)
+        return aggregates
+
+    def merge(self, other):
+        """Aggregates of this dataset followed by other's rows; skills new to this one get the next ids"""
+        merged = DatasetAggregates()
+        merged.rows = self.rows + other.rows
+        merged.columns = self.columns | other.columns
+
+        skill_ids = {skill: i for i, skill in enumerate(self.skills)}
+        merged.skills = self.skills + [skill for skill in other.skills if skill not in skill_ids]
+        skill_ids.update((skill, i) for i, skill in enumerate(merged.skills))
+        skill_map = np.array([skill_ids[skill] for skill in other.skills], dtype=np.int64)
+
+        n_skills = len(merged.skills)
+        merged.skill_counts = np.zeros(n_skills, dtype=np.int64)
+        merged.skill_counts[:len(self.skills)] = self.skill_counts
+        np.add.at(merged.skill_counts, skill_map, other.skill_counts)
+
+        cooccurrence = self.cooccurrence.tocoo()
+        other_cooccurrence = other.cooccurrence.tocoo()
+        merged.cooccurrence = (
+            sp.csr_matrix((cooccurrence.data, (cooccurrence.row, cooccurrence.col)), shape=(n_skills, n_skills))
+            + sp.csr_matrix((other_cooccurrence.data, (skill_map[other_cooccurrence.row],
+                                                       skill_map[other_cooccurrence.col])),
+                            shape=(n_skills, n_skills))
+        ).tocsr()
+
+        merged.skill_levels = _merge_counts(self.skill_levels, other.skill_levels)
+        merged.skills_by_seniority = _merge_counts(self.skills_by_seniority, other.skills_by_seniority)
+        merged.skill_salaries = _merge_sketches(self.skill_salaries, other.skill_salaries)
+        merged.seniority_salaries = _merge_sketches(self.seniority_salaries, other.seniority_salaries)
+        merged.sketches = self.sketches.merge(other.sketches)
+        # Aggregates pickled by an older version (shared cache) have no cell sketches
+        cell_sketches, other_cell_sketches = getattr(self, 'cell_sketches', None), getattr(other, 'cell_sketches', None)
+        if cell_sketches is not None and other_cell_sketches is not None:
+            merged.cell_sketches = cell_sketches.merge(other_cell_sketches)
+        else:
+            merged.cell_sketches = CellSketches()
+            merged.cell_sketches.cells = None
+        merged.locations = self.locations.merge(other.locations)
+        merged.companies = self.companies.merge(other.companies)
+        return merged
+
+    def skills_data(self):
+        """Same result as DataProcessor.process_skills_data on the whole dataset"""
+        skills_counter = Counter(dict(zip(self.skills, self.skill_counts.tolist())))
+        skills_levels = {skill: Counter(levels) for skill, levels in self.skill_levels.items()}
+
+        # Jobs without seniority are grouped under NaN, or 'Unknown' if no job has the column
+        missing = np.nan if 'seniority' in self.columns else 'Unknown'
+        skills_by_seniority = {
+            (missing if seniority is None else seniority): Counter(skills)
+            for seniority, skills in self.skills_by_seniority.items()
+        }
+        return skills_counter, skills_levels, skills_by_seniority
+
+
+def register(key, aggregates):
+    with _registry_lock:
+        _registry[key] = aggregates
+
+
+def unregister(key):
+    with _registry_lock:
+        _registry.pop(key, None)
+
+
+def get(key):
+    with _registry_lock:
+        return _registry.get(key)
+
+
+def for_frame(df):
+    """Aggregates of a DataFrame if it is a whole registered dataset (not filtered), else None"""
+    aggregates = get(df.attrs.get('dataset_key'))
+    if aggregates is None or len(df) != aggregates.rows:
+        return None
+    if not df.index.equals(pd.RangeIndex(aggregates.rows)):
+        return None
+    return aggregates
@@ -1,14 +1,12 @@
 import os
-import json
-import pandas as pd
+import multiprocessing
 import dash
-from dash import dcc, html, Input, Output, State, dash_table
+from dash import dcc, html, Input, Output, State, MATCH, dash_table
 from dash.exceptions import PreventUpdate
 import plotly.express as px
 import plotly.graph_objects as go
 import dash_bootstrap_components as dbc
 from datetime import datetime
-import base64
 import logging
 from flask import Flask, render_template, redirect, url_for, flash
 from flask_login import LoginManager, login_required, current_user
@@ -16,6 +14,11 @@ from werkzeug.middleware.proxy_fix import ProxyFix
 
 from data_processor import DataProcessor
 from visualizations import ChartGenerator
+from dataset_store import DatasetStore, StaleVersionError, UPLOAD_FOLDER
+from render_cache import RenderCache
+from background_jobs import JobSigner, create_background_manager
+from ingest import OfferIngestor, iter_json_offers
+from sketches import CELL_DIMENSIONS
 from models import db, User
 from auth import create_auth_routes, create_admin_routes
 
@@ -55,6 +58,18 @@ def load_user(user_id):
 create_auth_routes(server)
 create_admin_routes(server)
 
+# Heavy tab contents are rendered by background jobs in subprocesses, so a slow
+# render does not hold a web worker until the gunicorn timeout
+background_manager = create_background_manager(UPLOAD_FOLDER)
+job_signer = JobSigner(server.config['SECRET_KEY'])
+
+# Tabs and salary panels rendered as background jobs when a manager is available
+BACKGROUND_TABS = ['location-tab', 'company-tab']
+BACKGROUND_SALARY_PANELS = ['skills-correlation', 'correlation-matrix']
+
+# Tabs answered from the rollup cube without materializing filtered rows when the filters allow it
+CUBE_TABS = ['experience-tab', 'trends-tab', 'location-tab']
+
 # Initialize Dash app with Flask server
 app = dash.Dash(__name__, 
                 server=server,
@@ -63,6 +78,7 @@ app = dash.Dash(__name__,
                     'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css'
                 ],
                 suppress_callback_exceptions=True,
+                background_callback_manager=background_manager,
                 url_base_pathname='/dashboard/')
 
 app.title = "Dashboard Analizy Ofert Pracy"
@@ -71,6 +87,47 @@ app.title = "Dashboard Analizy Ofert Pracy"
 data_processor = DataProcessor()
 chart_generator = ChartGenerator()
 
+# Server-side dataset registry - dcc.Store components only hold small handles.
+# The last uploaded dataset is memory-mapped from the uploads volume at startup.
+dataset_store = DatasetStore()
+# Process pool workers (see partitioned) import the main script again and serve no requests
+if multiprocessing.parent_process() is None:
+    dataset_store.load_current()
+
+# Rendered tab contents - switching back to a tab with the same data,
+# filters and role is served without rebuilding the charts; figures rendered
+# by another worker are taken from the shared cache of the dataset store
+render_cache = RenderCache(shared=dataset_store.shared_cache)
+
+def render_key(data, *view):
+    """Render cache key: dataset version, filter selection and approximate mode of a handle plus view parameters"""
+    filters = DatasetStore.normalize_filters(data.get('filters') or {})
+    return (DatasetStore.dataset_key(data), DatasetStore.filters_key(filters), bool(data.get('approximate'))) + view
+
+def current_role():
+    return current_user.role if current_user.is_authenticated else 'guest'
+
+def resolve_data(data):
+    """Resolve a data store handle to a DataFrame, or None when there is nothing to show"""
+    if not data:
+        return None
+    df = dataset_store.resolve(data)
+    if df is None or df.empty:
+        return None
+    return df
+
+def resolve_cube(data):
+    """Rollup cube slice of a handle when the cube can answer its filters, else None"""
+    if not data:
+        return None
+    return dataset_store.cube_slice(data)
+
+def resolve_sketches(data):
+    """Approximate sketches of a handle in approximate mode when its filters allow it, else None"""
+    if not data or not data.get('approximate'):
+        return None
+    return dataset_store.sketches(data)
+
 def create_protected_layout():
     """Create dashboard layout for authenticated users"""
     # Check if user is authenticated in Flask context
@@ -174,42 +231,48 @@ def create_tabs_based_on_role():
     
     return dbc.Tabs(id="main-tabs", active_tab="skills-tab", children=base_tabs)
 
-# Set layout - static layout with dynamic components
-app.layout = dbc.Container([
-    dcc.Store(id='job-data-store'),
-    dcc.Store(id='filtered-data-store'),
+def serve_layout():
+    """Layout with data stores pointing at the most recently uploaded dataset"""
+    current_data = dataset_store.current_handle()
     
-    # Header
-    dbc.Row([
-        dbc.Col([
-            html.H1("📊 Dashboard Analizy Ofert Pracy", className="text-center mb-2"),
-            html.Div(id="user-info-header")
-        ])
-    ]),
-    
-    # Navigation
-    html.Div(id="navigation-menu"),
-    
-    # Upload section (dynamic - will be populated by callback)
-    html.Div(id="upload-section"),
-    
-    # Filters section 
-    html.Div(id="filters-section"),
-    
-    # Summary stats
-    dbc.Row([
-        dbc.Col([
-            html.Div(id='summary-stats')
+    return dbc.Container([
+        dcc.Store(id='job-data-store', data=current_data),
+        dcc.Store(id='filtered-data-store', data=current_data),
+        
+        # Header
+        dbc.Row([
+            dbc.Col([
+                html.H1("📊 Dashboard Analizy Ofert Pracy", className="text-center mb-2"),
+                html.Div(id="user-info-header")
+            ])
+        ]),
+        
+        # Navigation
+        html.Div(id="navigation-menu"),
+        
+        # Upload section (dynamic - will be populated by callback)
+        html.Div(id="upload-section"),
+        
+        # Filters section 
+        html.Div(id="filters-section"),
+        
+        # Summary stats
+        dbc.Row([
+            dbc.Col([
+                html.Div(id='summary-stats')
+            ])
+        ], className="mb-4"),
+        
+        # Tabs
+        html.Div(id="tabs-container"),
+        
+        html.Div(id='tab-content', className="mt-4", children=[
+            dbc.Alert("Wybierz zakładkę powyżej, aby zobaczyć analizy", color="info")
         ])
-    ], className="mb-4"),
-    
-    # Tabs
-    html.Div(id="tabs-container"),
-    
-    html.Div(id='tab-content', className="mt-4", children=[
-        dbc.Alert("Wybierz zakładkę powyżej, aby zobaczyć analizy", color="info")
     ])
-])
+
+# Set layout - evaluated on every page load so a new upload is picked up after refresh
+app.layout = serve_layout
 
 # Flask routes
 @server.route('/')
@@ -342,6 +405,14 @@ def update_ui_based_on_auth(data):
                     dbc.Row([
                         dbc.Col([
                             dbc.Button("Resetuj filtry", id="reset-filters", color="secondary", className="mt-3")
+                        ], width="auto"),
+                        dbc.Col([
+                            dbc.Switch(
+                                id='approximate-mode',
+                                label="Tryb przybliżony (HyperLogLog, Count-Min, Space-Saving)",
+                                value=False,
+                                className="mt-4"
+                            )
                         ])
                     ])
                 ])
@@ -377,55 +448,42 @@ def update_data(list_of_contents, list_of_names, existing_data):
     if list_of_contents is None:
         if existing_data is None:
             return None, dbc.Alert("Brak wczytanych danych", color="warning")
-        return existing_data, dbc.Alert(f"Wczytano {len(existing_data)} ofert pracy", color="success")
+        return existing_data, dbc.Alert(f"Wczytano {existing_data.get('rows', 0)} ofert pracy", color="success")
     
-    all_data = existing_data if existing_data else []
+    # Offers are parsed one at a time and deduplicated on the fly against the
+    # existing dataset and each other - see ingest.offer_key for the key fields
+    ingestor = OfferIngestor(seen=dataset_store.digests(existing_data))
     
     for content, name in zip(list_of_contents, list_of_names):
         try:
             content_type, content_string = content.split(',')
-            decoded = base64.b64decode(content_string)
             
             if name.endswith('.json'):
-                data = json.loads(decoded.decode('utf-8'))
-                if isinstance(data, list):
-                    all_data.extend(data)
-                else:
-                    all_data.append(data)
+                ingestor.add_all(iter_json_offers(content_string))
             else:
-                return all_data, dbc.Alert(f"Nieobsługiwany format pliku: {name}", color="danger")
+                return existing_data, dbc.Alert(f"Nieobsługiwany format pliku: {name}", color="danger")
                 
         except Exception as e:
-            return all_data, dbc.Alert(f"Błąd wczytywania pliku {name}: {str(e)}", color="danger")
-    
-    # Remove duplicates based on key fields: role, category, city, company, salary, published_date, skills
-    seen_combinations = set()
-    unique_data = []
-    duplicates_count = 0
-    
-    for item in all_data:
-        # Create a tuple of key fields to identify duplicates
-        duplicate_key = (
-            item.get('role', ''),
-            item.get('category', ''),
-            item.get('city', ''),
-            item.get('company', ''),
-            item.get('salary', ''),
-            item.get('published_date', ''),
-            str(sorted(item.get('skills', {}).items()) if isinstance(item.get('skills'), dict) else '')
-        )
-        
-        if duplicate_key not in seen_combinations:
-            unique_data.append(item)
-            seen_combinations.add(duplicate_key)
-        else:
-            duplicates_count += 1
+            return existing_data, dbc.Alert(f"Błąd wczytywania pliku {name}: {str(e)}", color="danger")
+    
+    # Only the new offers are aggregated; the store merges them onto the existing version
+    new_df = ingestor.to_frame()
+    if existing_data is not None:
+        try:
+            handle = dataset_store.append(existing_data, new_df, digests=ingestor.seen)
+        except StaleVersionError as e:
+            print(f"Error appending to dataset: {e}")
+            return existing_data, dbc.Alert(
+                "Dane zostały w międzyczasie zmienione (np. w innej karcie) - odśwież stronę i wczytaj plik ponownie",
+                color="danger")
+    else:
+        handle = dataset_store.create(new_df, digests=ingestor.seen)
     
-    message = f"Pomyślnie wczytano {len(unique_data)} unikalnych ofert pracy"
-    if duplicates_count > 0:
-        message += f" (pominięto {duplicates_count} duplikatów)"
+    message = f"Pomyślnie wczytano {handle['rows']} unikalnych ofert pracy"
+    if ingestor.duplicates > 0:
+        message += f" (pominięto {ingestor.duplicates} duplikatów)"
     
-    return unique_data, dbc.Alert(message, color="success")
+    return handle, dbc.Alert(message, color="success")
 
 # Callback for updating filter options
 @app.callback(
@@ -440,11 +498,10 @@ def update_filter_options(data):
     if not current_user.is_authenticated or not current_user.can_access_advanced():
         raise PreventUpdate
         
-    if not data:
+    df = dataset_store.get(data) if data else None
+    if df is None or df.empty:
         return [], [], [], [], []
     
-    df = pd.DataFrame(data)
-    
     # City options
     cities = sorted([city for city in df['city'].dropna().unique() if city])
     city_options = [{'label': city, 'value': city} for city in cities]
@@ -479,42 +536,30 @@ def update_filter_options(data):
      Input('skills-filter', 'value'),
      Input('company-filter', 'value'),
      Input('remote-filter', 'value'),
-     Input('category-filter', 'value')],
+     Input('category-filter', 'value'),
+     Input('approximate-mode', 'value')],
     prevent_initial_call=True
 )
-def filter_data(data, cities, seniority, skills, companies, remote, categories):
+def filter_data(data, cities, seniority, skills, companies, remote, categories, approximate=False):
     if not current_user.is_authenticated:
-        return data if data else []
+        return data if data else None
     
     if not current_user.can_access_advanced():
-        return data if data else []
+        return data if data else None
         
     if not data:
-        return []
-    
-    df = pd.DataFrame(data)
-    
-    # Apply filters (only if user has advanced access)
-    if current_user.can_access_advanced():
-        if cities:
-            df = df[df['city'].isin(cities)]
-        if seniority:
-            df = df[df['seniority'].isin(seniority)]
-        if companies:
-            df = df[df['company'].isin(companies)]
-        if remote is not None:
-            df = df[df['remote'].isin(remote)]
-        if categories:
-            df = df[df['category'].isin(categories)]
-        if skills:
-            # Filter by skills - job must have at least one of the selected skills
-            def has_required_skills(job_skills):
-                if not isinstance(job_skills, dict):
-                    return False
-                return any(skill in job_skills for skill in skills)
-            df = df[df['skills'].apply(has_required_skills)]
-    
-    return df.to_dict('records')
+        return None
+    
+    # Only the handle and the normalized filters go back to the browser;
+    # the filtered rows are resolved server-side by every consumer
+    return dataset_store.filtered_handle(data, {
+        'city': cities,
+        'seniority': seniority,
+        'company': companies,
+        'remote': remote,
+        'category': categories,
+        'skills': skills
+    }, approximate=bool(approximate))
 
 # Callback for reset filters
 @app.callback(
@@ -541,24 +586,45 @@ def reset_filters(n_clicks):
     [Input('filtered-data-store', 'data')]
 )
 def update_summary_stats(data):
-    if not data:
+    # Calculate statistics - from the rollup cube when the filters allow it, without
+    # materializing the filtered rows; approximate mode reads the dataset version's sketches
+    cube = resolve_cube(data)
+    sketches = resolve_sketches(data)
+    df = resolve_data(data) if cube is None else None
+    if (cube.total_jobs() == 0) if cube is not None else df is None:
         return dbc.Alert("Brak danych do wyświetlenia", color="info")
     
-    df = pd.DataFrame(data)
-    
-    # Calculate statistics
-    total_jobs = len(df)
-    unique_companies = df['company'].nunique()
-    unique_cities = df['city'].nunique()
-    remote_jobs = df['remote'].sum() if 'remote' in df.columns else 0
-    # Calculate average skills count
-    avg_skills = 0
-    if not df.empty:
-        skills_counts = []
-        for _, row in df.iterrows():
-            if isinstance(row.get('skills'), dict):
-                skills_counts.append(len(row['skills']))
-        avg_skills = sum(skills_counts) / len(skills_counts) if skills_counts else 0
+    if cube is not None:
+        total_jobs = cube.total_jobs()
+        remote_jobs = cube.remote_jobs()
+        avg_skills = cube.avg_skills()
+        salary_stats = data_processor.get_salary_summary(None, cube)
+    else:
+        total_jobs = len(df)
+        remote_jobs = df['remote'].sum() if 'remote' in df.columns else 0
+        # Average skills count of offers with skills data
+        skills_counts = data_processor.skills_counts(df).dropna()
+        avg_skills = skills_counts.mean() if len(skills_counts) else 0
+        salary_stats = data_processor.get_salary_summary(df)
+    
+    if salary_stats:
+        salary_text = f"{salary_stats['mean']:,.0f} PLN"
+        salary_note = f" (σ {salary_stats['std']:,.0f})" if salary_stats['std'] is not None else ""
+    else:
+        salary_text, salary_note = "Brak danych", ""
+    
+    # Distinct counts - HyperLogLog estimates with their standard error in approximate mode
+    distinct_note = ""
+    if sketches is not None:
+        companies_text = f"≈{sketches.companies.estimate():,}"
+        cities_text = f"≈{sketches.cities.estimate():,}"
+        distinct_note = f" (±{sketches.companies.relative_error():.1%})"
+    elif cube is not None:
+        companies_text = f"{cube.nunique('company'):,}"
+        cities_text = f"{cube.nunique('city'):,}"
+    else:
+        companies_text = f"{df['company'].nunique():,}"
+        cities_text = f"{df['city'].nunique():,}"
     
     return dbc.Row([
         dbc.Col([
@@ -572,16 +638,16 @@ def update_summary_stats(data):
         dbc.Col([
             dbc.Card([
                 dbc.CardBody([
-                    html.H4(f"{unique_companies:,}", className="text-success mb-0"),
-                    html.P("Firm", className="text-muted mb-0")
+                    html.H4(companies_text, className="text-success mb-0"),
+                    html.P(f"Firm{distinct_note}", className="text-muted mb-0")
                 ])
             ])
         ], md=2),
         dbc.Col([
             dbc.Card([
                 dbc.CardBody([
-                    html.H4(f"{unique_cities:,}", className="text-info mb-0"),
-                    html.P("Miast", className="text-muted mb-0")
+                    html.H4(cities_text, className="text-info mb-0"),
+                    html.P(f"Miast{distinct_note}", className="text-muted mb-0")
                 ])
             ])
         ], md=2),
@@ -600,6 +666,14 @@ def update_summary_stats(data):
                     html.P("Śr. umiejętności", className="text-muted mb-0")
                 ])
             ])
+        ], md=2),
+        dbc.Col([
+            dbc.Card([
+                dbc.CardBody([
+                    html.H4(salary_text, className="text-secondary mb-0"),
+                    html.P(f"Śr. pensja{salary_note}", className="text-muted mb-0")
+                ])
+            ])
         ], md=2)
     ])
 
@@ -628,7 +702,18 @@ def update_tab_content(active_tab, data):
             ])
         ], color="info")
         
-    if not data:
+    # Cube tabs skip materializing the filtered rows when the cube can answer the filters,
+    # and so does the approximate skills tab when the sketches can
+    cube = resolve_cube(data) if active_tab in CUBE_TABS else None
+    sketches = resolve_sketches(data) if active_tab == "skills-tab" else None
+    df = resolve_data(data) if cube is None and sketches is None else None
+    if sketches is not None:
+        empty = not data.get('rows')
+    elif cube is not None:
+        empty = cube.total_jobs() == 0
+    else:
+        empty = df is None
+    if empty:
         message = "Brak danych do wyświetlenia."
         if current_user.is_authenticated and current_user.can_access_admin():
             message += " Wczytaj pliki JSON z ofertami pracy używając sekcji 'Wczytaj Dane' powyżej."
@@ -636,28 +721,97 @@ def update_tab_content(active_tab, data):
             message += " Administrator musi wczytać dane aby były dostępne."
         return dbc.Alert(message, color="info")
     
-    df = pd.DataFrame(data)
-    
     # Check permissions for advanced tabs
     if active_tab in ["trends-tab", "salary-tab", "detailed-tab"] and current_user.is_authenticated and not current_user.can_access_advanced():
         return dbc.Alert(f"Brak uprawnień do tej sekcji. Wymagana rola: analyst lub admin. Twoja rola: {current_user.role}", color="warning")
     
-    if active_tab == "skills-tab":
-        return chart_generator.create_skills_analysis(df)
-    elif active_tab == "experience-tab" and current_user.is_authenticated:
-        return chart_generator.create_experience_analysis(df)
-    elif active_tab == "location-tab" and current_user.is_authenticated:
-        return chart_generator.create_location_analysis(df)
-    elif active_tab == "company-tab" and current_user.is_authenticated:
-        return chart_generator.create_company_analysis(df)
-    elif active_tab == "trends-tab" and current_user.is_authenticated and current_user.can_access_advanced():
-        return chart_generator.create_trends_analysis(df)
-    elif active_tab == "salary-tab" and current_user.is_authenticated and current_user.can_access_advanced():
-        return chart_generator.create_salary_analysis(df)
-    elif active_tab == "detailed-tab" and current_user.is_authenticated and current_user.can_access_advanced():
-        return chart_generator.create_detailed_analysis(df)
-    
-    return html.Div("Wybierz zakładkę aby zobaczyć analizę")
+    def render():
+        if active_tab == "skills-tab":
+            if sketches is not None:
+                return chart_generator.create_approximate_skills_analysis(sketches, data['rows'])
+            if data.get('approximate'):
+                if all(column in CELL_DIMENSIONS for column in data.get('filters') or {}):
+                    message = ("Tryb przybliżony jest niedostępny - ta wersja danych ma zbyt wiele kombinacji miast, "
+                               "poziomów, kategorii i pracy zdalnej dla budżetu szkiców. Pokazano wyniki dokładne.")
+                else:
+                    message = "Tryb przybliżony nie obsługuje filtrów firm i umiejętności - pokazano wyniki dokładne."
+                return html.Div([
+                    dbc.Alert(message, color="info"),
+                    chart_generator.create_skills_analysis(df)
+                ])
+            return chart_generator.create_skills_analysis(df)
+        elif active_tab == "experience-tab" and current_user.is_authenticated:
+            return chart_generator.create_experience_analysis(df, cube)
+        elif active_tab == "location-tab" and current_user.is_authenticated:
+            return chart_generator.create_location_analysis(df, cube)
+        elif active_tab == "company-tab" and current_user.is_authenticated:
+            return chart_generator.create_company_analysis(df)
+        elif active_tab == "trends-tab" and current_user.is_authenticated and current_user.can_access_advanced():
+            return chart_generator.create_trends_analysis(df, cube)
+        elif active_tab == "salary-tab" and current_user.is_authenticated and current_user.can_access_advanced():
+            return chart_generator.create_salary_analysis(df)
+        elif active_tab == "detailed-tab" and current_user.is_authenticated and current_user.can_access_advanced():
+            return chart_generator.create_detailed_analysis(df)
+        
+        return html.Div("Wybierz zakładkę aby zobaczyć analizę")
+    
+    key = render_key(data, active_tab, current_role())
+    # A tab the cube answers is cheap enough to render in the request
+    if active_tab in BACKGROUND_TABS and background_manager is not None and cube is None:
+        content = render_cache.get(key, DatasetStore.cache_namespace(data))
+        if content is None:
+            return html.Div([
+                dcc.Store(id='tab-job', data=job_signer.sign((active_tab,), data, current_role())),
+                dbc.Progress(id='tab-job-progress', value=0, striped=True, animated=True, className="mb-3"),
+                html.Div(id='tab-job-content')
+            ])
+        return content
+    
+    content = render_cache.get_or_render(key, render, DatasetStore.cache_namespace(data))
+    logging.debug(f"Render cache: {render_cache.stats()}")
+    return content
+
+def render_job(job, set_progress=None):
+    """Render a signed background job's view; permissions were checked when it was signed"""
+    def report(value, label):
+        if set_progress is not None:
+            set_progress((value, label))
+    
+    if job is None:
+        return dbc.Alert("Zadanie wygasło. Odśwież stronę, aby ponownie wczytać analizę.", color="warning")
+    
+    report(10, "Wczytywanie danych...")
+    df = resolve_data(job['data'])
+    if df is None:
+        return dbc.Alert("Brak danych do wyświetlenia.", color="info")
+    
+    view = job['view']
+    def render():
+        report(40, "Generowanie wykresów...")
+        if view[0] == 'location-tab':
+            return chart_generator.create_location_analysis(df)
+        elif view[0] == 'company-tab':
+            return chart_generator.create_company_analysis(df)
+        elif view[0] == 'salary-panel':
+            return chart_generator.create_salary_panel(df, view[1])
+        return html.Div()
+    
+    content = render_cache.get_or_render(render_key(job['data'], *view, job['role']), render,
+                                         DatasetStore.cache_namespace(job['data']))
+    report(100, "Gotowe")
+    return content
+
+# Background job for heavy tabs - cancelled when the user switches tabs or changes filters
+@app.callback(
+    Output('tab-job-content', 'children'),
+    [Input('tab-job', 'data')],
+    background=True,
+    progress=[Output('tab-job-progress', 'value'), Output('tab-job-progress', 'label')],
+    running=[(Output('tab-job-progress', 'style'), {'display': 'flex'}, {'display': 'none'})],
+    cancel=[Input('main-tabs', 'active_tab'), Input('filtered-data-store', 'data')]
+)
+def update_tab_job(set_progress, token):
+    return render_job(job_signer.verify(token), set_progress)
 
 # Callback for detailed skill analysis
 @app.callback(
@@ -669,32 +823,97 @@ def update_detailed_skill_analysis(selected_skill, data):
     if not current_user.is_authenticated or not current_user.can_access_advanced():
         return dbc.Alert("Brak uprawnień do tej funkcji", color="warning")
         
-    if not selected_skill or not data:
+    df = resolve_data(data)
+    if not selected_skill or df is None:
         return dbc.Alert("Wybierz umiejętność aby zobaczyć szczegółową analizę", color="info")
     
-    df = pd.DataFrame(data)
-    return chart_generator.create_skill_specific_analysis(df, selected_skill)
+    return render_cache.get_or_render(
+        render_key(data, 'detailed-skill', selected_skill, current_role()),
+        lambda: chart_generator.create_skill_specific_analysis(df, selected_skill),
+        DatasetStore.cache_namespace(data)
+    )
+
+# Callback for the salary tab panels - each panel is requested on its own when
+# the tab is shown, so quick statistics do not wait for the correlations
+@app.callback(
+    Output({'type': 'salary-panel', 'panel': MATCH}, 'children'),
+    [Input({'type': 'salary-panel', 'panel': MATCH}, 'id')],
+    [State('filtered-data-store', 'data')]
+)
+def update_salary_panel(panel_id, data):
+    if not current_user.is_authenticated or not current_user.can_access_advanced():
+        return dbc.Alert("Brak uprawnień do tej funkcji", color="warning")
+    
+    df = resolve_data(data)
+    if df is None:
+        return html.Div()
+    
+    panel = panel_id['panel']
+    key = render_key(data, 'salary-panel', panel, current_role())
+    if panel in BACKGROUND_SALARY_PANELS and background_manager is not None:
+        content = render_cache.get(key, DatasetStore.cache_namespace(data))
+        if content is None:
+            return html.Div([
+                dcc.Store(id={'type': 'salary-panel-job', 'panel': panel},
+                          data=job_signer.sign(('salary-panel', panel), data, current_role())),
+                html.Div(id={'type': 'salary-panel-job-content', 'panel': panel})
+            ])
+        return content
+    
+    return render_cache.get_or_render(
+        key,
+        lambda: chart_generator.create_salary_panel(df, panel),
+        DatasetStore.cache_namespace(data)
+    )
+
+# Background job for heavy salary panels - the panel's loading spinner runs until it finishes
+@app.callback(
+    Output({'type': 'salary-panel-job-content', 'panel': MATCH}, 'children'),
+    [Input({'type': 'salary-panel-job', 'panel': MATCH}, 'data')],
+    background=True,
+    cancel=[Input('main-tabs', 'active_tab'), Input('filtered-data-store', 'data')]
+)
+def update_salary_panel_job(token):
+    return render_job(job_signer.verify(token))
+
+# Callback for skill trends options
+@app.callback(
+    Output('skill-trends-chart', 'figure'),
+    [Input('trends-top-n', 'value'),
+     Input('trends-frequency', 'value'),
+     Input('trends-rolling', 'value')],
+    [State('filtered-data-store', 'data')],
+    prevent_initial_call=True
+)
+def update_skill_trends(top_n, frequency, rolling, data):
+    if not current_user.is_authenticated or not current_user.can_access_advanced():
+        raise PreventUpdate
+    
+    cube = resolve_cube(data)
+    df = resolve_data(data) if cube is None else None
+    if (cube.total_jobs() == 0) if cube is not None else df is None:
+        raise PreventUpdate
+    
+    skill_trends = data_processor.get_skill_trends(df, top_n or 5, frequency or 'D', rolling or None, cube=cube)
+    return chart_generator.create_skill_trends_figure(skill_trends, top_n or 5)
 
 # Callback for co-occurring skills
 @app.callback(
     Output('cooccurrence-results', 'children'),
     [Input('skill-selector', 'value'),
+     Input('cooccurrence-mode', 'value'),
      Input('filtered-data-store', 'data')]
 )
-def update_cooccurrence_results(selected_skills, data):
+def update_cooccurrence_results(selected_skills, mode, data):
     if not current_user.is_authenticated:
         return html.P("Musisz być zalogowany", style={'color': 'white', 'textAlign': 'center', 'padding': '20px'})
         
-    if not selected_skills or not data:
+    df = resolve_data(data)
+    if not selected_skills or df is None:
         return html.P("Wybierz umiejętności, aby zobaczyć najczęściej współwystępujące z nimi.", 
                      style={'color': 'white', 'textAlign': 'center', 'padding': '20px'})
     
-    # Limit to 3 skills maximum
-    if len(selected_skills) > 3:
-        selected_skills = selected_skills[:3]
-    
-    df = pd.DataFrame(data)
-    cooccurring = data_processor.get_cooccurring_skills(df, selected_skills)
+    cooccurring = data_processor.get_cooccurring_skills(df, selected_skills, mode or 'any')
     
     if not cooccurring:
         return html.P("Brak współwystępujących umiejętności dla wybranych opcji.", 
@@ -0,0 +1,51 @@
+import os
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+
+try:
+    import diskcache
+    from dash import DiskcacheManager
+except ImportError:
+    diskcache = None
+
+# Seconds a signed job stays valid - a page left open longer re-requests its tab
+JOB_TOKEN_MAX_AGE = int(os.environ.get('JOB_TOKEN_MAX_AGE', '3600'))
+
+
+def create_background_manager(storage_dir):
+    """Dash background callback manager keeping job results in storage_dir/jobs,
+    shared by the workers of one host; None when diskcache is not installed"""
+    if diskcache is None:
+        print("Error creating background callback manager: the diskcache package is not installed, rendering in requests")
+        return None
+    try:
+        return DiskcacheManager(diskcache.Cache(os.path.join(storage_dir, 'jobs')))
+    except (ImportError, OSError) as e:
+        print(f"Error creating background callback manager: {e}")
+        return None
+
+
+class JobSigner:
+    """Signs what a background job renders: view, data handle and role.
+
+    Jobs run in a subprocess outside the request, where current_user is
+    not available. The request callback checks permissions and hands the
+    job a signed description, so the browser cannot change the role or
+    view it is rendered for.
+    """
+
+    def __init__(self, secret_key):
+        self.serializer = URLSafeTimedSerializer(secret_key, salt='background-job')
+
+    def sign(self, view, data, role):
+        return self.serializer.dumps({'view': list(view), 'data': data, 'role': role})
+
+    def verify(self, token):
+        """The signed job as {'view': tuple, 'data': handle, 'role': str}, or None if invalid or expired"""
+        if not token:
+            return None
+        try:
+            job = self.serializer.loads(token, max_age=JOB_TOKEN_MAX_AGE)
+        except BadSignature:
+            return None
+        job['view'] = tuple(job['view'])
+        return job
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+# Columns indexed by value; 'skills' is indexed from the skill matrix
+VALUE_COLUMNS = ['city', 'seniority', 'company', 'remote', 'category']
+
+# A value gets a packed bitmap (rows / 8 bytes) once it covers more than
+# 1/32 of the rows, where that beats 4 bytes per row id; rarer values keep
+# a sorted array of row ids
+DENSE_RATIO = 32
+
+
+class ColumnIndex:
+    """Per-value row sets of one column, stored roaring-style as packed bitmaps or row id arrays"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.dense = {}
+        self.sparse = {}
+
+    def add(self, value, row_ids):
+        if len(row_ids) * DENSE_RATIO > self.rows:
+            mask = np.zeros(self.rows, dtype=bool)
+            mask[row_ids] = True
+            self.dense[value] = np.packbits(mask)
+        else:
+            self.sparse[value] = np.asarray(row_ids, dtype=np.int32)
+
+    def __contains__(self, value):
+        return value in self.dense or value in self.sparse
+
+    def row_ids(self, value):
+        """Sorted positions of the rows holding a value"""
+        if value in self.dense:
+            return np.flatnonzero(np.unpackbits(self.dense[value], count=self.rows)).astype(np.int32)
+        return self.sparse[value]
+
+    def append(self, other):
+        """Index of this column's rows followed by other's"""
+        merged = ColumnIndex(self.rows + other.rows)
+        for value in dict.fromkeys([*self.dense, *self.sparse, *other.dense, *other.sparse]):
+            parts = []
+            if value in self:
+                parts.append(self.row_ids(value))
+            if value in other:
+                parts.append(other.row_ids(value) + self.rows)
+            merged.add(value, np.concatenate(parts))
+        return merged
+
+    def union(self, values):
+        """Packed bitmap of rows holding any of the values"""
+        bits = np.zeros((self.rows + 7) // 8, dtype=np.uint8)
+        sparse = []
+        for value in values:
+            try:
+                if value in self.dense:
+                    np.bitwise_or(bits, self.dense[value], out=bits)
+                elif value in self.sparse:
+                    sparse.append(self.sparse[value])
+            except TypeError:
+                # Unhashable filter value never matches
+                continue
+
+        if sparse:
+            row_ids = np.concatenate(sparse)
+            np.bitwise_or.at(bits, row_ids >> 3, (128 >> (row_ids & 7)).astype(np.uint8))
+        return bits
+
+
+class BitmapIndex:
+    """Bitmap index of the filterable columns of a dataset.
+
+    Built once per dataset version; a filter selection then costs a few
+    OR operations inside each column and AND operations across columns.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.columns = {}
+        # Columns with unhashable values are matched with isin on the fly
+        self.fallback = {}
+
+    @classmethod
+    def from_frame(cls, df, matrix=None):
+        """Index the value columns of df and the skills of its SkillMatrix"""
+        index = cls(len(df))
+
+        for column in VALUE_COLUMNS:
+            if column not in df.columns:
+                continue
+            try:
+                index.columns[column] = cls._index_codes(len(df), *pd.factorize(df[column]))
+            except TypeError:
+                index.fallback[column] = df[column]
+
+        if matrix is not None:
+            csc = matrix.matrix.tocsc()
+            csc.sort_indices()
+            column_index = ColumnIndex(len(df))
+            for skill_id, skill in enumerate(matrix.skills):
+                column_index.add(skill, csc.indices[csc.indptr[skill_id]:csc.indptr[skill_id + 1]])
+            index.columns['skills'] = column_index
+
+        return index
+
+    def append(self, other):
+        """Index of this index's rows followed by other's, or None when the two do not
+        index the same columns or one matches a column on the fly"""
+        if self.fallback or other.fallback or set(self.columns) != set(other.columns):
+            return None
+        index = BitmapIndex(self.rows + other.rows)
+        for column, column_index in self.columns.items():
+            index.columns[column] = column_index.append(other.columns[column])
+        return index
+
+    @staticmethod
+    def _index_codes(rows, codes, uniques):
+        column_index = ColumnIndex(rows)
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes + 1, minlength=len(uniques) + 1)
+        # Code -1 (missing value) sorts first and is never matched by a filter
+        bounds = np.cumsum(counts)
+        for code, value in enumerate(uniques.tolist()):
+            column_index.add(value, order[bounds[code]:bounds[code + 1]])
+        return column_index
+
+    def column_bits(self, column, values):
+        """Packed bitmap of rows matching any of the values in a column"""
+        if column in self.columns:
+            return self.columns[column].union(values)
+        mask = np.zeros(self.rows, dtype=bool)
+        if column in self.fallback:
+            mask = self.fallback[column].isin(values).to_numpy()
+        return np.packbits(mask)
+
+    def row_ids(self, filters):
+        """Positions of rows passing all filters (AND across columns, OR within a column)"""
+        bits = None
+        for column, values in filters.items():
+            column_bits = self.column_bits(column, values)
+            bits = column_bits if bits is None else np.bitwise_and(bits, column_bits, out=bits)
+
+        if bits is None:
+            return np.arange(self.rows)
+        return np.flatnonzero(np.unpackbits(bits, count=self.rows))
@@ -0,0 +1,490 @@
+import os
+import json
+import shutil
+import pickle
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Bump when the on-disk layout changes; older directories are ignored, except
+# format 1 (self-contained .npy files), which is still read
+FORMAT_VERSION = 2
+READABLE_FORMAT_VERSIONS = (1, FORMAT_VERSION)
+
+META_FILE = 'meta.json'
+
+# Committed byte length of every file of a column store; bytes past it are a failed append
+STORE_FILE = 'store.json'
+LOCK_FILE = '.lock'
+
+# Dictionary codes have a fixed width so appending new values never rewrites them
+CODES_DTYPE = np.int32
+
+_SCALAR_TYPES = (str, int, float, bool, np.integer, np.floating, np.bool_)
+
+
+def _smallest_int_dtype(max_value):
+    """Smallest signed integer dtype able to hold codes up to max_value"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _native(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _merge_vocab(skills, levels, other):
+    """Skills and levels of a block followed by other's new ones, and arrays mapping other's ids to them"""
+    skill_ids = {skill: i for i, skill in enumerate(skills)}
+    skills = list(skills) + [skill for skill in other.skills if skill not in skill_ids]
+    skill_ids.update((skill, i) for i, skill in enumerate(skills))
+    skill_map = np.array([skill_ids[skill] for skill in other.skills], dtype=np.int32)
+
+    level_ids = {level: i for i, level in enumerate(levels)}
+    levels = list(levels) + [level for level in other.levels if level not in level_ids]
+    level_ids.update((level, i) for i, level in enumerate(levels))
+    level_map = np.array([0] + [level_ids[level] + 1 for level in other.levels])
+    return skills, levels, skill_map, level_map
+
+
+class SkillsBlock:
+    """Skills incidence of a dataset in CSR layout.
+
+    Row i owns skill ids indices[indptr[i]:indptr[i+1]] with level ids
+    data[...] - levels are stored 1-based so an entry is never zero.
+    Rows whose 'skills' value was not a dict have present[i] == False.
+    """
+
+    def __init__(self, indptr, indices, data, present, skills, levels):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.present = present
+        self.skills = skills
+        self.levels = levels
+
+    @classmethod
+    def from_series(cls, series):
+        skill_ids = {}
+        level_ids = {}
+        indptr = np.zeros(len(series) + 1, dtype=np.int64)
+        present = np.zeros(len(series), dtype=bool)
+        indices = []
+        data = []
+
+        for i, skills in enumerate(series):
+            if isinstance(skills, dict):
+                present[i] = True
+                for skill, level in skills.items():
+                    indices.append(skill_ids.setdefault(skill, len(skill_ids)))
+                    data.append(level_ids.setdefault(level, len(level_ids)) + 1)
+            indptr[i + 1] = len(indices)
+
+        return cls(
+            indptr,
+            np.asarray(indices, dtype=np.int32),
+            np.asarray(data, dtype=_smallest_int_dtype(len(level_ids))),
+            present,
+            list(skill_ids),
+            list(level_ids)
+        )
+
+    def to_dicts(self):
+        """Rebuild the per-row skills dicts"""
+        skill_names = np.asarray(self.skills, dtype=object)[self.indices].tolist()
+        level_names = np.asarray([None] + self.levels, dtype=object)[self.data].tolist()
+        indptr = self.indptr.tolist()
+        present = self.present.tolist()
+
+        return [
+            dict(zip(skill_names[indptr[i]:indptr[i + 1]], level_names[indptr[i]:indptr[i + 1]]))
+            if present[i] else None
+            for i in range(len(present))
+        ]
+
+    def append(self, other):
+        """Block of this block's rows followed by other's rows.
+
+        Skills and levels new to this block get the next ids, so ids stay
+        in order of first appearance like in from_series.
+        """
+        skills, levels, skill_map, level_map = _merge_vocab(self.skills, self.levels, other)
+        return SkillsBlock(
+            np.concatenate([self.indptr, other.indptr[1:] + self.indptr[-1]]),
+            np.concatenate([self.indices, skill_map[other.indices]]).astype(np.int32),
+            np.concatenate([self.data, level_map[other.data]]).astype(_smallest_int_dtype(len(levels))),
+            np.concatenate([self.present, other.present]),
+            skills,
+            levels
+        )
+
+    @classmethod
+    def load(cls, path, prefix, mmap_mode='r'):
+        """Block saved in a format 1 dataset directory"""
+        arrays = {
+            name: np.load(os.path.join(path, f"{prefix}.{name}.npy"), mmap_mode=mmap_mode)
+            for name in ('indptr', 'indices', 'data', 'present')
+        }
+        with open(os.path.join(path, f"{prefix}.vocab.json"), encoding='utf-8') as f:
+            vocab = json.load(f)
+        return cls(skills=vocab['skills'], levels=vocab['levels'], **arrays)
+
+
+def _dictionary_encode(series, categories=None):
+    """Dictionary-encode a column of JSON scalars; returns None if it holds anything else.
+
+    Values missing from categories are appended to it, so codes of rows
+    encoded before stay valid. Returns (codes, categories).
+    """
+    values = series.to_numpy(dtype=object)
+    for value in values:
+        if value is not None and not isinstance(value, _SCALAR_TYPES):
+            return None
+
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    categories = list(categories or [])
+    ids = {value: code for code, value in enumerate(categories)}
+    mapping = []
+    for value in uniques:
+        value = _native(value)
+        if value not in ids:
+            ids[value] = len(categories)
+            categories.append(value)
+        mapping.append(ids[value])
+    # Code -1 marks a missing value and stays -1
+    codes = np.asarray(mapping + [-1], dtype=CODES_DTYPE)[codes]
+    return codes, categories
+
+
+class _Rewrite(Exception):
+    """The rows cannot be appended to the base version's column store"""
+
+
+class _ColumnStore:
+    """Append-only column files shared by the versions of a dataset.
+
+    Each version reads a prefix of every file, so appending rows for a new
+    version never changes what older versions read. store.json holds the
+    committed length of each file and the committed row count; only a
+    writer that extends the latest committed rows may append.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_file = None
+        self.state = {'rows': 0, 'lengths': {}}
+
+    def __enter__(self):
+        os.makedirs(self.path, exist_ok=True)
+        self.lock_file = open(os.path.join(self.path, LOCK_FILE), 'a')
+        if fcntl is not None:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        try:
+            with open(os.path.join(self.path, STORE_FILE), encoding='utf-8') as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {'rows': 0, 'lengths': {}}
+        self._pending = dict(self.state['lengths'])
+        return self
+
+    def __exit__(self, *exc_info):
+        self.lock_file.close()
+        self.lock_file = None
+
+    def append(self, name, array):
+        """Append an array's bytes to a file, dropping bytes a failed append left behind"""
+        file_path = os.path.join(self.path, name)
+        committed = self._pending.get(name, 0)
+        with open(file_path, 'ab') as f:
+            if f.tell() != committed:
+                f.truncate(committed)
+            f.write(np.ascontiguousarray(array).tobytes())
+        self._pending[name] = committed + np.asarray(array).nbytes
+
+    def write_pickle(self, name, values):
+        with open(os.path.join(self.path, name), 'wb') as f:
+            pickle.dump(values, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def commit(self, rows):
+        self.state = {'rows': rows, 'lengths': self._pending}
+        tmp_path = os.path.join(self.path, STORE_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.path, STORE_FILE))
+
+
+def _write_json(path, name, value):
+    with open(os.path.join(path, name), 'w', encoding='utf-8') as f:
+        json.dump(value, f, ensure_ascii=False)
+
+
+def _read_json(path, name):
+    with open(os.path.join(path, name), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _append_columns(store, version_path, df, skills_block, base_path=None, base_meta=None):
+    """Append df's columns to a column store; returns the column entries of the version meta.
+
+    Without base_meta the store is new and df is the whole dataset. With it
+    df holds rows following the base version's; _Rewrite is raised when they
+    do not fit its columns (other columns, dtypes or value kinds).
+    """
+    base_columns = base_meta['columns'] if base_meta is not None else None
+    if base_columns is not None and list(df.columns) != [column['name'] for column in base_columns]:
+        raise _Rewrite()
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        base = base_columns[i] if base_columns is not None else None
+        prefix = base['prefix'] if base is not None else f"col{i}"
+        column = dict(base) if base is not None else {'name': name, 'prefix': prefix}
+
+        if (base is None or base['kind'] == 'skills') and name == 'skills' and series.dtype == object:
+            try:
+                block = skills_block or SkillsBlock.from_series(series)
+            except TypeError:
+                # Unhashable level values - keep the column as objects
+                block = None
+            if block is not None:
+                if base is None:
+                    skills, levels = block.skills, block.levels
+                    indptr, indices, data = block.indptr, block.indices, block.data
+                    column.update({'kind': 'skills', 'entries': 0, 'dtype': _smallest_int_dtype(len(levels)).__name__})
+                else:
+                    vocab = _read_json(base_path, f"{prefix}.vocab.json")
+                    skills, levels, skill_map, level_map = _merge_vocab(vocab['skills'], vocab['levels'], block)
+                    if _smallest_int_dtype(len(levels)) != np.dtype(base['dtype']):
+                        raise _Rewrite()
+                    indptr, indices, data = block.indptr[1:], skill_map[block.indices], level_map[block.data]
+                store.append(f"{prefix}.indptr.bin", (indptr + column['entries']).astype(np.int64))
+                store.append(f"{prefix}.indices.bin", indices.astype(np.int32))
+                store.append(f"{prefix}.data.bin", data.astype(column['dtype']))
+                store.append(f"{prefix}.present.bin", block.present.astype(bool))
+                column['entries'] += len(block.indices)
+                _write_json(version_path, f"{prefix}.vocab.json", {'skills': skills, 'levels': levels})
+                columns.append(column)
+                continue
+        if base is not None and base['kind'] == 'skills':
+            raise _Rewrite()
+
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biufM':
+            if base is not None and (base['kind'] != 'numeric' or base['dtype'] != series.dtype.str):
+                raise _Rewrite()
+            store.append(f"{prefix}.bin", series.to_numpy())
+            column.update({'kind': 'numeric', 'dtype': series.dtype.str})
+            columns.append(column)
+            continue
+        if base is not None and base['kind'] == 'numeric':
+            raise _Rewrite()
+
+        encoded = None
+        if base is None or base['kind'] == 'dictionary':
+            categories = _read_json(base_path, f"{prefix}.categories.json") if base is not None else None
+            encoded = _dictionary_encode(series, categories)
+            if encoded is None and base is not None:
+                raise _Rewrite()
+        if encoded is not None:
+            codes, categories = encoded
+            store.append(f"{prefix}.codes.bin", codes)
+            _write_json(version_path, f"{prefix}.categories.json", categories)
+            column['kind'] = 'dictionary'
+        else:
+            chunks = list(column.get('chunks', []))
+            chunk = f"{prefix}.{store.state['rows']}.pkl"
+            store.write_pickle(chunk, series.tolist())
+            column.update({'kind': 'object', 'chunks': chunks + [chunk]})
+
+        columns.append(column)
+    return columns
+
+
+def _write_version(path, store_path, df, meta, skills_block, arrays, base_path=None, base_meta=None):
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    with _ColumnStore(store_path) as store:
+        base_rows = base_meta['rows'] if base_meta is not None else 0
+        if store.state['rows'] != base_rows:
+            # The base version is not the last one written to the store
+            raise _Rewrite()
+        columns = _append_columns(store, tmp_path, df, skills_block, base_path, base_meta)
+
+        # Extra arrays are kept only while every version has them
+        base_arrays = base_meta.get('arrays', {}) if base_meta is not None else None
+        meta_arrays = {}
+        for name, array in (arrays or {}).items():
+            array = np.asarray(array)
+            base_array = base_arrays.get(name) if base_arrays is not None else None
+            if base_arrays is not None and (base_array is None or base_array['dtype'] != array.dtype.str):
+                continue
+            store.append(f"{name}.bin", array)
+            meta_arrays[name] = {
+                'dtype': array.dtype.str,
+                'shape': list(array.shape[1:]),
+                'count': (base_array['count'] if base_array is not None else 0) + len(array)
+            }
+        store.commit(base_rows + len(df))
+
+    meta = dict(meta or {})
+    meta.update({
+        'format_version': FORMAT_VERSION,
+        'rows': base_rows + len(df),
+        'store': os.path.basename(store_path),
+        'columns': columns,
+        'arrays': meta_arrays
+    })
+    _write_json(tmp_path, META_FILE, meta)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def write_dataset(path, store_path, df, meta=None, skills_block=None, arrays=None):
+    """Write a DataFrame of offers as a new column store and a version directory reading it.
+
+    - numeric, bool and datetime columns are stored as raw arrays
+    - scalar object columns (city, company, seniority, category, ...) are
+      dictionary-encoded into integer codes plus a JSON list of values
+    - 'skills' is stored as a CSR incidence block (see SkillsBlock);
+      pass skills_block if the caller already encoded it
+    - anything else falls back to pickled chunks
+    arrays are extra per-row arrays (e.g. offer digests) read back with
+    read_array. The store directory sits next to the version directory;
+    append_dataset adds the rows of later versions to it.
+    """
+    shutil.rmtree(store_path, ignore_errors=True)
+    _write_version(path, store_path, df, meta, skills_block, arrays)
+
+
+def append_dataset(path, base_path, df, meta=None, skills_block=None, arrays=None):
+    """Write the version made of base_path's rows followed by df's, appending only df's rows
+    to the base version's column store. skills_block and arrays cover df's rows only.
+
+    Returns False without writing anything if the rows cannot be appended
+    (another version was already appended to the base, or df does not fit
+    its columns); the caller then writes the whole dataset.
+    """
+    base_meta = read_meta(base_path)
+    if base_meta is None or base_meta['format_version'] != FORMAT_VERSION:
+        return False
+    store_path = os.path.join(os.path.dirname(base_path), base_meta['store'])
+    try:
+        _write_version(path, store_path, df, meta, skills_block, arrays, base_path, base_meta)
+        return True
+    except _Rewrite:
+        shutil.rmtree(path + '.tmp', ignore_errors=True)
+        return False
+
+
+def read_meta(path):
+    """Read the metadata of a dataset directory, or None if it is missing or outdated"""
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('format_version') not in READABLE_FORMAT_VERSIONS:
+        return None
+    return meta
+
+
+def store_name(meta):
+    """Column store directory name a version reads, None for self-contained format 1 directories"""
+    return meta.get('store')
+
+
+def _store_array(store_path, name, dtype, count, mmap_mode, shape=()):
+    """First count items of an append-only store file"""
+    dtype = np.dtype(dtype)
+    if count == 0:
+        return np.zeros((0,) + tuple(shape), dtype=dtype)
+    file_path = os.path.join(store_path, name)
+    if mmap_mode is None:
+        return np.fromfile(file_path, dtype=dtype, count=count * int(np.prod(shape))).reshape((count,) + tuple(shape))
+    return np.memmap(file_path, dtype=dtype, mode=mmap_mode, shape=(count,) + tuple(shape))
+
+
+def read_array(path, name, mmap_mode='r'):
+    """Extra array written with a dataset version, or None if the version has none"""
+    meta = read_meta(path)
+    if meta is None or name not in meta.get('arrays', {}):
+        return None
+    array = meta['arrays'][name]
+    store_path = os.path.join(os.path.dirname(path), meta['store'])
+    return _store_array(store_path, f"{name}.bin", array['dtype'], array['count'], mmap_mode, array['shape'])
+
+
+def read_dataset(path, mmap_mode='r', decoded=None):
+    """Load a dataset directory written by write_dataset or append_dataset.
+
+    Column files are memory-mapped, so loading costs roughly the time of
+    decoding dictionary columns and rebuilding skills dicts. decoded is a
+    DataFrame of the same rows (e.g. the one just written) whose dictionary,
+    skills and object columns are taken instead of decoding them again.
+    Returns (DataFrame, SkillsBlock or None).
+    """
+    meta = read_meta(path)
+    if meta is None:
+        return None, None
+    legacy = meta['format_version'] == 1
+    store_path = path if legacy else os.path.join(os.path.dirname(path), meta['store'])
+    rows = meta['rows']
+
+    def array(file_name, dtype, count):
+        if legacy:
+            return np.load(os.path.join(path, file_name.replace('.bin', '.npy')), mmap_mode=mmap_mode)
+        return _store_array(store_path, file_name, dtype, count, mmap_mode)
+
+    if decoded is not None and len(decoded) != rows:
+        decoded = None
+
+    data = {}
+    skills_block = None
+    for column in meta['columns']:
+        name, prefix, kind = column['name'], column['prefix'], column['kind']
+        reuse = decoded is not None and name in decoded.columns
+
+        if kind == 'numeric':
+            data[name] = array(f"{prefix}.bin", column.get('dtype'), rows)
+        elif kind in ('dictionary', 'object') and reuse:
+            data[name] = decoded[name]
+        elif kind == 'dictionary':
+            codes = array(f"{prefix}.codes.bin", CODES_DTYPE, rows)
+            categories = _read_json(path, f"{prefix}.categories.json")
+            # Code -1 marks a missing value and picks the trailing None
+            data[name] = np.asarray(categories + [None], dtype=object)[codes]
+        elif kind == 'skills':
+            if legacy:
+                skills_block = SkillsBlock.load(path, prefix, mmap_mode=mmap_mode)
+            else:
+                vocab = _read_json(path, f"{prefix}.vocab.json")
+                skills_block = SkillsBlock(
+                    array(f"{prefix}.indptr.bin", np.int64, rows + 1),
+                    array(f"{prefix}.indices.bin", np.int32, column['entries']),
+                    array(f"{prefix}.data.bin", column['dtype'], column['entries']),
+                    array(f"{prefix}.present.bin", bool, rows),
+                    vocab['skills'],
+                    vocab['levels']
+                )
+            data[name] = decoded[name] if reuse else skills_block.to_dicts()
+        else:
+            values = []
+            for chunk in column.get('chunks', [f"{prefix}.pkl"]):
+                with open(os.path.join(store_path, chunk), 'rb') as f:
+                    values.extend(pickle.load(f))
+            data[name] = values
+
+    df = pd.DataFrame(data, columns=[column['name'] for column in meta['columns']],
+                      index=pd.RangeIndex(rows), copy=False)
+    return df, skills_block
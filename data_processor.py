@@ -3,32 +3,136 @@ import numpy as np
 from datetime import datetime, timedelta
 from collections import Counter
 import json
+import threading
+
+import aggregates
+import skill_matrix
+from salary_sketch import grouped_sketches
+from skill_matrix import first_seen_order, grouped_counts
+
+# Parsed (min, max, avg) per raw salary string, shared by all DataProcessor instances
+SALARY_CACHE_SIZE = 200000
+_salary_cache = {}
+_salary_cache_lock = threading.Lock()
+
+# Filter out unrealistic salary values (below 4k or above 60k PLN)
+SALARY_MIN_VALID = 4000
+SALARY_MAX_VALID = 60000
+
+# Columns derived from every offer once, when it is added to a dataset (see DataProcessor.enrich)
+DERIVED_COLUMNS = ['skillsCount', 'salary_min', 'salary_max', 'salary_avg', 'published_at']
+
+# Time series buckets: period used to bucket dates, frequency of the bucket start dates
+TREND_FREQUENCIES = {
+    'D': ('D', 'D'),
+    'W': ('W', 'W-MON'),
+    'M': ('M', 'MS')
+}
+
+
+def _parse_salary_string(salary_str):
+    """Parse a single salary string; returns (min, max, avg) with NaN when it cannot be used"""
+    invalid = (np.nan, np.nan, np.nan)
+    try:
+        # Remove 'PLN' and other text
+        salary_clean = salary_str.replace('PLN', '').replace('zł', '').strip()
+        
+        # Handle range format like "11 000 - 16 000"
+        if '-' in salary_clean:
+            parts = salary_clean.split('-')
+            if len(parts) != 2:
+                return invalid
+            min_sal = float(parts[0].replace(' ', '').replace(',', ''))
+            max_sal = float(parts[1].replace(' ', '').replace(',', ''))
+            avg_sal = (min_sal + max_sal) / 2
+        else:
+            # Single value
+            min_sal = max_sal = avg_sal = float(salary_clean.replace(' ', '').replace(',', ''))
+    except (ValueError, TypeError, AttributeError):
+        return invalid
+    
+    if SALARY_MIN_VALID <= avg_sal <= SALARY_MAX_VALID:
+        return min_sal, max_sal, avg_sal
+    return invalid
+
+
+def _parse_unique_salaries(salaries):
+    """Parse distinct salary strings with vectorized string operations.
+
+    Plain "11 000 - 16 000 PLN" / "12000 zł" strings are parsed with regex
+    checks and integer conversion; anything unusual goes through
+    _parse_salary_string so results stay identical to float() parsing.
+    """
+    clean = pd.Series(salaries, dtype=object).str.replace('PLN', '', regex=False) \
+        .str.replace('zł', '', regex=False).str.strip()
+    parts = clean.str.split('-')
+    n_parts = parts.str.len()
+    
+    def number(part):
+        digits = part.str.replace(' ', '', regex=False).str.replace(',', '', regex=False)
+        is_plain = digits.str.fullmatch(r'[0-9]{1,15}').fillna(False).astype(bool)
+        return pd.to_numeric(digits.where(is_plain), errors='coerce').astype(float), is_plain
+    
+    left, left_plain = number(parts.str[0])
+    right, right_plain = number(parts.str[1].fillna(''))
+    is_range = (n_parts == 2) & left_plain & right_plain
+    is_single = (n_parts == 1) & left_plain
+    
+    min_sal = left.to_numpy()
+    max_sal = np.where(is_range, right.to_numpy(), min_sal)
+    avg_sal = (min_sal + max_sal) / 2
+    valid = (avg_sal >= SALARY_MIN_VALID) & (avg_sal <= SALARY_MAX_VALID)
+    
+    result = np.full((len(clean), 3), np.nan)
+    fast = (is_range | is_single).to_numpy()
+    ok = fast & valid
+    result[ok] = np.column_stack([min_sal, max_sal, avg_sal])[ok]
+    
+    for i in np.flatnonzero(~fast):
+        result[i] = _parse_salary_string(salaries[i])
+    
+    return [tuple(row) for row in result.tolist()]
+
 
 class DataProcessor:
     def __init__(self):
         pass
     
+    def _group_codes(self, df, column, default):
+        """Factorize a grouping column; missing values form one group, a missing column maps to default"""
+        if column not in df.columns:
+            return np.zeros(len(df), dtype=np.int64), [default]
+        codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+        return codes, list(uniques)
+    
     def process_skills_data(self, df):
         """Process skills data for analysis"""
-        skills_counter = Counter()
-        skills_levels = {}
-        skills_by_seniority = {}
-        
-        for _, row in df.iterrows():
-            if isinstance(row['skills'], dict):
-                for skill, level in row['skills'].items():
-                    skills_counter[skill] += 1
-                    
-                    # Track skill levels
-                    if skill not in skills_levels:
-                        skills_levels[skill] = Counter()
-                    skills_levels[skill][level] += 1
-                    
-                    # Track skills by seniority
-                    seniority = row.get('seniority', 'Unknown')
-                    if seniority not in skills_by_seniority:
-                        skills_by_seniority[seniority] = Counter()
-                    skills_by_seniority[seniority][skill] += 1
+        # A whole dataset version has its counters maintained by DatasetStore
+        dataset_aggregates = aggregates.for_frame(df)
+        if dataset_aggregates is not None:
+            return dataset_aggregates.skills_data()
+        
+        matrix = skill_matrix.for_frame(df)
+        skills = matrix.skills
+        
+        # Counters keep the order in which skills first appear, like the row-by-row version did
+        skill_counts = matrix.skill_counts()
+        skills_counter = Counter({skills[i]: int(skill_counts[i]) for i in first_seen_order(matrix.indices)})
+        
+        # Track skill levels
+        level_names = [None] + list(matrix.levels)
+        skills_levels = {
+            skills[skill]: Counter({level_names[level]: count for level, count in levels})
+            for skill, levels in grouped_counts(matrix.indices, matrix.data, len(level_names))
+        }
+        
+        # Track skills by seniority
+        seniority_codes, seniorities = self._group_codes(df, 'seniority', 'Unknown')
+        skills_by_seniority = {
+            seniorities[seniority]: Counter({skills[skill]: count for skill, count in seniority_skills})
+            for seniority, seniority_skills in grouped_counts(
+                seniority_codes[matrix.entry_rows], matrix.indices, len(skills))
+        }
         
         return skills_counter, skills_levels, skills_by_seniority
     
@@ -56,99 +160,145 @@ class DataProcessor:
         
         return skill_weights
     
-    def get_skill_combinations(self, df, top_n=15):
-        """Get most common skill combinations"""
-        combinations = Counter()
+    def get_skill_combinations(self, df, top_n=15, min_support=0.01, max_size=3):
+        """Get most common skill combinations (frequent itemsets of 2 to max_size skills).
+        
+        Support is the share of offers with skills requiring the whole
+        combination. Confidence and lift describe its strongest rule
+        (antecedent -> consequent), the one with the highest confidence.
+        """
+        matrix = skill_matrix.for_frame(df)
+        transactions = int((matrix.row_counts() > 0).sum())
+        if transactions == 0:
+            return []
         
-        for _, row in df.iterrows():
-            if isinstance(row['skills'], dict):
-                skills = sorted(row['skills'].keys())
-                if len(skills) > 1:
-                    # Create combinations of 2-3 skills
-                    for i in range(len(skills)):
-                        for j in range(i+1, min(i+4, len(skills))):
-                            combo = tuple(skills[i:j+1])
-                            combinations[combo] += 1
+        min_count = max(2, int(np.ceil(min_support * transactions)))
+        itemsets = matrix.frequent_itemsets(min_count, max_size)
         
-        return combinations.most_common(top_n)
+        combinations = []
+        for itemset, count in itemsets.items():
+            if len(itemset) < 2:
+                continue
+            
+            # Subsets of a frequent itemset are frequent too, so their counts are known
+            confidence, consequent = max(
+                (count / itemsets[itemset[:i] + itemset[i + 1:]], itemset[i])
+                for i in range(len(itemset))
+            )
+            combinations.append({
+                'skills': tuple(sorted(matrix.skills[skill] for skill in itemset)),
+                'count': count,
+                'support': count / transactions,
+                'confidence': confidence,
+                'lift': confidence / (itemsets[(consequent,)] / transactions),
+                'antecedent': tuple(sorted(matrix.skills[skill] for skill in itemset if skill != consequent)),
+                'consequent': matrix.skills[consequent]
+            })
+        
+        combinations.sort(key=lambda x: (-x['count'], x['skills']))
+        return combinations[:top_n]
+    
+    def enrich(self, df):
+        """Copy of an offers DataFrame with the DERIVED_COLUMNS added.
+        
+        Run once when offers are added to a dataset; the columns are saved
+        with it, so views read parsed salaries, publication dates and skill
+        counts instead of deriving them again on every render.
+        """
+        enriched = self._parse_salary_data(df)
+        enriched['skillsCount'] = self._count_skills(enriched)
+        enriched['published_at'] = self._parse_published_dates(enriched)
+        return enriched
+    
+    @staticmethod
+    def is_enriched(df):
+        return all(column in df.columns for column in DERIVED_COLUMNS)
+    
+    def _count_skills(self, df):
+        """Number of skills of every offer, as uploaded in skillsCount when its skills are missing, else NaN"""
+        if 'skillsCount' in df.columns:
+            counts = pd.to_numeric(df['skillsCount'], errors='coerce').to_numpy(dtype=float, copy=True)
+        else:
+            counts = np.full(len(df), np.nan)
+        if 'skills' in df.columns:
+            skills = df['skills'].to_numpy(dtype=object)
+            has_skills = np.fromiter((isinstance(value, dict) for value in skills), dtype=bool, count=len(skills))
+            counts[has_skills] = [len(value) for value in skills[has_skills]]
+        return counts
+    
+    def _parse_published_dates(self, df):
+        if 'published_date' not in df.columns:
+            return pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+        return pd.to_datetime(df['published_date'], errors='coerce', dayfirst=True)
+    
+    def skills_counts(self, df):
+        """Number of skills per offer (NaN where unknown) - the skillsCount column of enriched frames"""
+        if self.is_enriched(df):
+            return df['skillsCount']
+        return pd.Series(self._count_skills(df), index=df.index)
+    
+    def published_dates(self, df):
+        """Parsed publication date per offer - the published_at column of enriched frames"""
+        if self.is_enriched(df):
+            return df['published_at']
+        return self._parse_published_dates(df)
     
     def _parse_salary_data(self, df):
         """Parse salary data from string format like '11 000 - 16 000 PLN'"""
-        df_copy = df.copy()
+        if self.is_enriched(df):
+            # Parsed when the offers were added to the dataset
+            return df.copy()
         
-        # Parse salary string into min, max, avg
-        salary_min_list = []
-        salary_max_list = []
-        salary_avg_list = []
+        df_copy = df.copy()
         
-        for _, row in df_copy.iterrows():
-            salary_str = row.get('salary', '')
-            salary_min = row.get('salary_min', None)
-            salary_max = row.get('salary_max', None)
-            salary_avg = row.get('salary_avg', None)
-            
-            # Try to parse from string if numeric values are not available
-            if pd.isna(salary_avg) and salary_str and isinstance(salary_str, str):
-                try:
-                    # Remove 'PLN' and other text
-                    salary_clean = salary_str.replace('PLN', '').replace('zł', '').strip()
-                    
-                    # Handle range format like "11 000 - 16 000"
-                    if '-' in salary_clean:
-                        parts = salary_clean.split('-')
-                        if len(parts) == 2:
-                            min_sal = float(parts[0].replace(' ', '').replace(',', ''))
-                            max_sal = float(parts[1].replace(' ', '').replace(',', ''))
-                            avg_sal = (min_sal + max_sal) / 2
-                            
-                            # Filter out unrealistic salary values (below 4k or above 60k PLN)
-                            if 4000 <= avg_sal <= 60000:
-                                salary_min_list.append(min_sal)
-                                salary_max_list.append(max_sal)
-                                salary_avg_list.append(avg_sal)
-                            else:
-                                salary_min_list.append(None)
-                                salary_max_list.append(None)
-                                salary_avg_list.append(None)
-                        else:
-                            salary_min_list.append(None)
-                            salary_max_list.append(None)
-                            salary_avg_list.append(None)
-                    else:
-                        # Single value
-                        try:
-                            single_val = float(salary_clean.replace(' ', '').replace(',', ''))
-                            
-                            # Filter out unrealistic salary values (below 4k or above 60k PLN)
-                            if 4000 <= single_val <= 60000:
-                                salary_min_list.append(single_val)
-                                salary_max_list.append(single_val)
-                                salary_avg_list.append(single_val)
-                            else:
-                                salary_min_list.append(None)
-                                salary_max_list.append(None)
-                                salary_avg_list.append(None)
-                        except:
-                            salary_min_list.append(None)
-                            salary_max_list.append(None)
-                            salary_avg_list.append(None)
-                except:
-                    salary_min_list.append(None)
-                    salary_max_list.append(None)
-                    salary_avg_list.append(None)
+        if 'salary' in df_copy.columns:
+            # Every distinct salary string is parsed once; rows pick their result by code
+            codes, uniques = pd.factorize(df_copy['salary'])
+            uniques = np.asarray(uniques, dtype=object)
+        else:
+            codes, uniques = np.full(len(df_copy), -1), np.empty(0, dtype=object)
+        
+        unique_is_text = np.array([isinstance(value, str) and value != '' for value in uniques], dtype=bool)
+        # Trailing row of NaN is picked by code -1 (missing salary)
+        parsed = np.full((len(uniques) + 1, 3), np.nan)
+        parsed[:-1][unique_is_text] = self._parse_salary_strings(uniques[unique_is_text])
+        parsed = parsed[codes]
+        
+        # Try to parse from string if numeric values are not available
+        if 'salary_avg' in df_copy.columns:
+            avg_missing = df_copy['salary_avg'].isna().to_numpy()
+        else:
+            avg_missing = np.ones(len(df_copy), dtype=bool)
+        to_parse = avg_missing & np.append(unique_is_text, False)[codes]
+        
+        # Update dataframe - parsed rows take parsed values, the rest keep existing ones
+        for i, name in enumerate(['salary_min', 'salary_max', 'salary_avg']):
+            if name not in df_copy.columns:
+                df_copy[name] = np.where(to_parse, parsed[:, i], np.nan)
+            elif pd.api.types.is_numeric_dtype(df_copy[name]):
+                df_copy[name] = np.where(to_parse, parsed[:, i], df_copy[name].to_numpy(dtype=float))
             else:
-                # Use existing values
-                salary_min_list.append(salary_min)
-                salary_max_list.append(salary_max)
-                salary_avg_list.append(salary_avg)
-        
-        # Update dataframe
-        df_copy['salary_min'] = salary_min_list
-        df_copy['salary_max'] = salary_max_list
-        df_copy['salary_avg'] = salary_avg_list
+                values = df_copy[name].to_numpy(dtype=object, copy=True)
+                values[to_parse] = parsed[to_parse, i]
+                df_copy[name] = pd.Series(values, index=df_copy.index).infer_objects()
         
         return df_copy
     
+    def _parse_salary_strings(self, salaries):
+        """Parse distinct salary strings into an (n, 3) array of min, max, avg using the shared cache"""
+        if len(salaries) == 0:
+            return np.empty((0, 3))
+        
+        # Tab renders parse in several threads; a clear() must not hit another thread's lookups
+        with _salary_cache_lock:
+            missing = [value for value in salaries if value not in _salary_cache]
+            if missing:
+                if len(_salary_cache) + len(missing) > SALARY_CACHE_SIZE:
+                    _salary_cache.clear()
+                _salary_cache.update(zip(missing, _parse_unique_salaries(missing)))
+            
+            return np.array([_salary_cache[value] for value in salaries], dtype=float).reshape(-1, 3)
+    
     def process_salary_data(self, df):
         """Process salary data for analysis"""
         # First parse salary strings
@@ -163,86 +313,156 @@ class DataProcessor:
     
     def get_salary_by_skill(self, df):
         """Calculate average salary by skill"""
-        skill_salaries = {}
-        salary_df = self.process_salary_data(df)
-        
-        for _, row in salary_df.iterrows():
-            if isinstance(row['skills'], dict) and pd.notna(row['salary_avg']):
-                for skill in row['skills'].keys():
-                    if skill not in skill_salaries:
-                        skill_salaries[skill] = []
-                    skill_salaries[skill].append(row['salary_avg'])
+        dataset_aggregates = aggregates.for_frame(df)
+        if dataset_aggregates is not None:
+            # Sketches maintained per dataset version by DatasetStore
+            sketches = dataset_aggregates.skill_salaries
+        else:
+            salary_df = self.process_salary_data(df)
+            if 'salary_avg' not in salary_df.columns or salary_df.empty:
+                return {}
+            
+            matrix = skill_matrix.for_frame(salary_df)
+            salaries = salary_df['salary_avg'].to_numpy(dtype=float)[matrix.entry_rows]
+            sketches = {
+                matrix.skills[skill]: sketch
+                for skill, sketch in grouped_sketches(matrix.indices, salaries).items()
+            }
         
         # Calculate statistics
         skill_salary_stats = {}
-        for skill, salaries in skill_salaries.items():
-            if len(salaries) >= 3:  # Minimum samples for reliable statistics
+        for skill, sketch in sketches.items():
+            if sketch.count >= 3:  # Minimum samples for reliable statistics
                 skill_salary_stats[skill] = {
-                    'mean': np.mean(salaries),
-                    'median': np.median(salaries),
-                    'min': np.min(salaries),
-                    'max': np.max(salaries),
-                    'count': len(salaries),
-                    'std': np.std(salaries)
+                    'mean': sketch.mean(),
+                    'median': sketch.median(),
+                    'min': sketch.min,
+                    'max': sketch.max,
+                    'count': sketch.count,
+                    'std': sketch.std(),
+                    **sketch.percentiles()
                 }
         
         return skill_salary_stats
     
-    def process_time_series(self, df):
-        """Process time series data for trend analysis"""
-        if 'published_date' not in df.columns:
+    def get_salary_by_seniority(self, df):
+        """Salary mean, count and percentiles per seniority level, levels in first-seen order"""
+        dataset_aggregates = aggregates.for_frame(df)
+        if dataset_aggregates is not None:
+            sketches = dataset_aggregates.seniority_salaries
+        else:
+            salary_df = self.process_salary_data(df)
+            if 'seniority' not in salary_df.columns or 'salary_avg' not in salary_df.columns:
+                return {}
+            codes, seniorities = pd.factorize(salary_df['seniority'])
+            sketches = {
+                seniorities[seniority]: sketch
+                for seniority, sketch in grouped_sketches(codes, salary_df['salary_avg'].to_numpy(dtype=float)).items()
+            }
+        
+        return {seniority: sketch.summary() for seniority, sketch in sketches.items()}
+    
+    def _date_buckets(self, dates, freq='D'):
+        """Factorize dates into day, week or month buckets; returns (codes, bucket start dates)"""
+        buckets = pd.Series(dates).dt.to_period(TREND_FREQUENCIES[freq][0]).dt.start_time
+        codes, bucket_values = pd.factorize(buckets)
+        return codes, pd.to_datetime(np.asarray(bucket_values))
+    
+    def _published_date_buckets(self, df, freq='D'):
+        return self._date_buckets(self.published_dates(df), freq)
+    
+    def _fill_periods(self, result_df, freq, rolling):
+        """Add empty periods between the first and last date, then smooth with a rolling mean"""
+        periods = pd.date_range(result_df['date'].min(), result_df['date'].max(), freq=TREND_FREQUENCIES[freq][1])
+        result_df = result_df.set_index('date').reindex(periods, fill_value=0)
+        result_df = result_df.rolling(rolling, min_periods=1).mean()
+        return result_df.rename_axis('date').reset_index()
+    
+    def process_time_series(self, df, freq='D', rolling=None, cube=None):
+        """Process time series data for trend analysis.
+        
+        freq buckets offers by day ('D'), week ('W') or month ('M'); with
+        rolling, counts are averaged over that many buckets, gaps counting as 0.
+        With a CubeSlice of df the counts come from the rollup cube and df may be None.
+        """
+        if 'published_date' not in (cube.cube.columns if cube is not None else df.columns):
             return pd.DataFrame()
         
-        df_time = df.copy()
-        df_time['published_date'] = pd.to_datetime(df_time['published_date'], errors='coerce', dayfirst=True)
-        df_time = df_time.dropna(subset=['published_date'])
-        df_time['date'] = df_time['published_date'].dt.date
+        if cube is not None:
+            # Day counts of the cube summed into buckets
+            day_buckets, bucket_values = self._date_buckets(cube.cube.days, freq)
+            counts = np.bincount(day_buckets, weights=cube.day_counts(),
+                                 minlength=len(bucket_values)).astype(np.int64)
+        else:
+            codes, bucket_values = self._published_date_buckets(df, freq)
+            counts = np.bincount(codes[codes >= 0], minlength=len(bucket_values))
         
         # Group by date
-        daily_counts = df_time.groupby('date').size().reset_index(name='count')
-        daily_counts['date'] = pd.to_datetime(daily_counts['date'])
+        has_jobs = counts > 0
+        if not has_jobs.any():
+            return pd.DataFrame()
+        daily_counts = pd.DataFrame({'date': bucket_values[has_jobs], 'count': counts[has_jobs]})
+        daily_counts = daily_counts.sort_values('date').reset_index(drop=True)
         
+        if rolling:
+            daily_counts = self._fill_periods(daily_counts, freq, rolling)
         return daily_counts
     
-    def get_skill_trends(self, df, top_skills=5):
-        """Get trends for top skills over time"""
-        if 'published_date' not in df.columns:
+    def get_skill_trends(self, df, top_skills=5, freq='D', rolling=None, cube=None):
+        """Get trends for top skills over time.
+        
+        Builds the date x skill count matrix for the top_skills skills in a
+        single pass over the skill matrix entries, or from the rollup cube
+        when given a CubeSlice (df may then be None); freq and rolling work
+        like in process_time_series.
+        """
+        if 'published_date' not in (cube.cube.columns if cube is not None else df.columns):
             return pd.DataFrame()
         
-        # Get top skills
-        skills_counter, _, _ = self.process_skills_data(df)
-        top_skill_names = [skill for skill, _ in skills_counter.most_common(top_skills)]
-        
-        if not top_skill_names:
-            return pd.DataFrame()
-        
-        df_time = df.copy()
-        df_time['published_date'] = pd.to_datetime(df_time['published_date'], errors='coerce', dayfirst=True)
-        df_time = df_time.dropna(subset=['published_date'])
-        df_time['date'] = df_time['published_date'].dt.date
-        
-        result_df = None
-        
-        for skill in top_skill_names:
-            skill_df = df_time[df_time['skills'].apply(
-                lambda x: isinstance(x, dict) and skill in x
-            )]
+        if cube is not None:
+            skills = cube.cube.skills
+            top_skill_ids = cube.most_common_skill_ids(top_skills)
+            if len(top_skill_ids) == 0:
+                return pd.DataFrame()
             
-            if not skill_df.empty:
-                daily_counts = skill_df.groupby('date').size().reset_index(name=skill)
-                daily_counts['date'] = pd.to_datetime(daily_counts['date'])
-                
-                if result_df is None:
-                    result_df = daily_counts
-                else:
-                    result_df = result_df.merge(daily_counts, on='date', how='outer')
+            # Day x top skill counts of the cube summed into buckets
+            day_buckets, date_values = self._date_buckets(cube.cube.days, freq)
+            counts = np.zeros((len(date_values), len(top_skill_ids)), dtype=np.int64)
+            np.add.at(counts, day_buckets, cube.day_skill_counts(top_skill_ids))
+        else:
+            # Get top skills
+            matrix = skill_matrix.for_frame(df)
+            skills = matrix.skills
+            top_skill_ids = matrix.most_common_ids(top_skills)
+            if len(top_skill_ids) == 0:
+                return pd.DataFrame()
+            
+            date_codes, date_values = self._published_date_buckets(df, freq)
+            
+            # Date x top skill counts from the entries of the top skills on dated jobs
+            columns = np.full(len(skills), -1, dtype=np.int64)
+            columns[top_skill_ids] = np.arange(len(top_skill_ids))
+            entry_columns = columns[matrix.indices]
+            entry_dates = date_codes[matrix.entry_rows]
+            keep = (entry_columns >= 0) & (entry_dates >= 0)
+            
+            counts = np.bincount(
+                entry_dates[keep] * len(top_skill_ids) + entry_columns[keep],
+                minlength=len(date_values) * len(top_skill_ids)
+            ).reshape(len(date_values), len(top_skill_ids))
+        
+        # Only dates on which at least one of the top skills was requested
+        has_counts = counts.sum(axis=1) > 0
+        if not has_counts.any():
+            return pd.DataFrame()
         
-        if result_df is not None and not result_df.empty:
-            result_df = result_df.fillna(0)
-            result_df = result_df.sort_values('date')
-            return result_df
+        result_df = pd.DataFrame(counts[has_counts], columns=[skills[i] for i in top_skill_ids])
+        result_df.insert(0, 'date', date_values[has_counts])
+        result_df = result_df.sort_values('date').reset_index(drop=True)
         
-        return pd.DataFrame()
+        if rolling:
+            result_df = self._fill_periods(result_df, freq, rolling)
+        return result_df
     
     def calculate_correlation_matrix(self, df):
         """Calculate correlation matrix for salary analysis"""
@@ -251,15 +471,8 @@ class DataProcessor:
         if 'salary_avg' not in df_with_parsed_salary.columns or df_with_parsed_salary['salary_avg'].isna().all():
             return pd.DataFrame()
         
-        # Calculate skills count
-        skills_counts = []
-        for _, row in df_with_parsed_salary.iterrows():
-            if isinstance(row.get('skills'), dict):
-                skills_counts.append(len(row['skills']))
-            else:
-                skills_counts.append(0)
-        
-        df_with_parsed_salary['skillsCount'] = skills_counts
+        # Skills count, 0 for offers without skills data
+        df_with_parsed_salary['skillsCount'] = self.skills_counts(df_with_parsed_salary).fillna(0)
         
         # Prepare data for correlation
         corr_data = df_with_parsed_salary[['salary_avg', 'skillsCount']].copy()
@@ -275,129 +488,207 @@ class DataProcessor:
         
         return corr_data.corr()
     
-    def get_location_stats(self, df):
-        """Get statistics by location"""
-        if 'city' not in df.columns:
+    def _grouped_stats(self, df, column, top_n):
+        """Job counts, top skills, salary stats and remote ratio of every value of a column in one pass.
+        
+        Returns (codes, groups, stats) - groups in order of first appearance,
+        codes with -1 for rows without a value, stats a list of dicts per group.
+        """
+        codes, groups = pd.factorize(df[column])
+        n_groups = len(groups)
+        total_jobs = np.bincount(codes[codes >= 0], minlength=n_groups)
+        
+        # Skills analysis for every group - (group, skill) counts in first-seen order,
+        # so ties rank like Counter.most_common on the group's rows
+        matrix = skill_matrix.for_frame(df)
+        entry_groups = codes[matrix.entry_rows]
+        has_group = entry_groups >= 0
+        top_skills = [[] for _ in range(n_groups)]
+        for group, group_skills in grouped_counts(
+                entry_groups[has_group], matrix.indices[has_group], len(matrix.skills)):
+            ranked = sorted(group_skills, key=lambda x: x[1], reverse=True)[:top_n]
+            top_skills[group] = [(matrix.skills[skill], count) for skill, count in ranked]
+        
+        # Salary stats
+        salary_stats = [{} for _ in range(n_groups)]
+        if 'salary_avg' in df.columns:
+            salaries = pd.to_numeric(df['salary_avg'], errors='coerce').to_numpy(dtype=float)
+            for group, sketch in grouped_sketches(codes, salaries).items():
+                salary_stats[group] = sketch.summary()
+        
+        remote_ratio = [0] * n_groups
+        if 'remote' in df.columns:
+            remote = pd.to_numeric(df['remote'], errors='coerce').astype(float).to_numpy()
+            has_row = codes >= 0
+            remote_ratio = pd.Series(remote[has_row]).groupby(codes[has_row]).mean().reindex(range(n_groups)).tolist()
+        
+        stats = [
+            {
+                'total_jobs': int(total_jobs[group]),
+                'top_skills': top_skills[group],
+                'salary_stats': salary_stats[group],
+                'remote_ratio': remote_ratio[group]
+            }
+            for group in range(n_groups)
+        ]
+        return codes, list(groups), stats
+    
+    def _grouped_nunique(self, df, codes, n_groups, column):
+        """Number of distinct non-missing values of a column within every group"""
+        if column not in df.columns:
+            return np.zeros(n_groups, dtype=np.int64)
+        value_codes, values = pd.factorize(df[column])
+        valid = (codes >= 0) & (value_codes >= 0)
+        pairs = np.unique(codes[valid].astype(np.int64) * len(values) + value_codes[valid])
+        return np.bincount(pairs // max(len(values), 1), minlength=n_groups)
+    
+    def get_location_stats(self, df, cube=None):
+        """Get statistics by location; with a CubeSlice of df they come from the rollup cube
+        (salary stats then hold the count and mean only) and df may be None"""
+        if 'city' not in (cube.cube.columns if cube is not None else df.columns):
             return {}
         
-        location_stats = {}
+        if cube is not None:
+            return cube.grouped_stats('city', 5)
+        
+        dataset_aggregates = aggregates.for_frame(df)
+        if dataset_aggregates is not None:
+            locations = dataset_aggregates.locations
+            return {
+                city: {
+                    'total_jobs': total_jobs,
+                    'top_skills': locations.top_skills(city, 5),
+                    'salary_stats': locations.salary_stats(city),
+                    'companies': len(locations.paired.get(city, ())),
+                    'remote_ratio': locations.remote_ratio(city)
+                }
+                for city, total_jobs in locations.jobs.items()
+            }
         
-        for city in df['city'].dropna().unique():
-            city_df = df[df['city'] == city]
-            
-            # Skills analysis for this city
-            skills_counter, _, _ = self.process_skills_data(city_df)
-            top_skills = skills_counter.most_common(5)
-            
-            # Salary stats
-            salary_stats = {}
-            if 'salary_avg' in df.columns:
-                city_salaries = city_df['salary_avg'].dropna()
-                if len(city_salaries) > 0:
-                    salary_stats = {
-                        'mean': city_salaries.mean(),
-                        'median': city_salaries.median(),
-                        'count': len(city_salaries)
-                    }
-            
+        codes, cities, stats = self._grouped_stats(df, 'city', top_n=5)
+        companies = self._grouped_nunique(df, codes, len(cities), 'company')
+        
+        location_stats = {}
+        for group, city in enumerate(cities):
+            city_stats = stats[group]
             location_stats[city] = {
-                'total_jobs': len(city_df),
-                'top_skills': top_skills,
-                'salary_stats': salary_stats,
-                'companies': city_df['company'].nunique(),
-                'remote_ratio': city_df['remote'].mean() if 'remote' in city_df.columns else 0
+                'total_jobs': city_stats['total_jobs'],
+                'top_skills': city_stats['top_skills'],
+                'salary_stats': city_stats['salary_stats'],
+                'companies': int(companies[group]),
+                'remote_ratio': city_stats['remote_ratio']
             }
         
         return location_stats
     
+    def get_salary_summary(self, df, cube=None):
+        """Count, mean and standard deviation of the parsed salaries (see CubeSlice.salary_stats), {} without salaries;
+        from the rollup cube's salary sums when given a CubeSlice of df (df may then be None)"""
+        if cube is not None:
+            return cube.salary_stats()
+        
+        if 'salary_avg' not in df.columns and 'salary' not in df.columns:
+            return {}
+        salaries = pd.to_numeric(self._parse_salary_data(df)['salary_avg'], errors='coerce').dropna()
+        if salaries.empty:
+            return {}
+        return {'count': len(salaries), 'mean': salaries.mean(), 'std': salaries.std() if len(salaries) > 1 else None}
+    
     def get_company_stats(self, df):
         """Get statistics by company"""
         if 'company' not in df.columns:
             return {}
         
+        dataset_aggregates = aggregates.for_frame(df)
+        if dataset_aggregates is not None:
+            companies = dataset_aggregates.companies
+            return {
+                company: {
+                    'total_jobs': total_jobs,
+                    'top_skills': companies.top_skills(company, 3),
+                    'salary_stats': companies.salary_stats(company),
+                    'cities': len(companies.paired.get(company, ())),
+                    'remote_ratio': companies.remote_ratio(company),
+                    'seniority_distribution': companies.seniority_distribution(company)
+                }
+                for company, total_jobs in companies.jobs.items()
+            }
+        
         # First parse salary data for the entire dataframe
         df_with_salary = self._parse_salary_data(df)
         
-        company_stats = {}
+        codes, companies, stats = self._grouped_stats(df_with_salary, 'company', top_n=3)
+        cities = self._grouped_nunique(df_with_salary, codes, len(companies), 'city')
+        
+        # Seniority distribution - counts in descending order, ties in first-seen order like value_counts
+        seniority_distribution = [{} for _ in companies]
+        if 'seniority' in df_with_salary.columns:
+            seniority_codes, seniorities = pd.factorize(df_with_salary['seniority'])
+            valid = (codes >= 0) & (seniority_codes >= 0)
+            for group, counts in grouped_counts(codes[valid], seniority_codes[valid], len(seniorities)):
+                seniority_distribution[group] = {
+                    seniorities[seniority]: count
+                    for seniority, count in sorted(counts, key=lambda x: x[1], reverse=True)
+                }
         
-        for company in df_with_salary['company'].dropna().unique():
-            company_df = df_with_salary[df_with_salary['company'] == company]
-            
-            # Skills analysis for this company
-            skills_counter, _, _ = self.process_skills_data(company_df)
-            top_skills = skills_counter.most_common(3)
-            
-            # Salary stats - now using parsed salary data
-            salary_stats = {}
-            if 'salary_avg' in company_df.columns:
-                company_salaries = company_df['salary_avg'].dropna()
-                if len(company_salaries) > 0:
-                    salary_stats = {
-                        'mean': company_salaries.mean(),
-                        'median': company_salaries.median(),
-                        'count': len(company_salaries)
-                    }
-            
+        company_stats = {}
+        for group, company in enumerate(companies):
+            company_group_stats = stats[group]
             company_stats[company] = {
-                'total_jobs': len(company_df),
-                'top_skills': top_skills,
-                'salary_stats': salary_stats,
-                'cities': company_df['city'].nunique(),
-                'remote_ratio': company_df['remote'].mean() if 'remote' in company_df.columns else 0,
-                'seniority_distribution': company_df['seniority'].value_counts().to_dict()
+                'total_jobs': company_group_stats['total_jobs'],
+                'top_skills': company_group_stats['top_skills'],
+                'salary_stats': company_group_stats['salary_stats'],
+                'cities': int(cities[group]),
+                'remote_ratio': company_group_stats['remote_ratio'],
+                'seniority_distribution': seniority_distribution[group]
             }
         
         return company_stats
     
     def calculate_skills_salary_correlation(self, df):
-        """Calculate correlation between individual skills and salary - simplified version"""
+        """Point-biserial correlation between having each skill and salary, over all offers with skills and salary"""
         try:
             df_with_parsed_salary = self._parse_salary_data(df)
             
             if 'salary_avg' not in df_with_parsed_salary.columns or df_with_parsed_salary['salary_avg'].isna().all():
                 return {}
             
-            # Get salary data as lists for faster processing
-            salaries = df_with_parsed_salary['salary_avg'].dropna().tolist()
-            skills_data = df_with_parsed_salary['skills'].dropna().tolist()
+            # Offers with both a skills dict and a salary, kept row-aligned with the skill matrix
+            matrix = skill_matrix.for_frame(df_with_parsed_salary)
+            salaries = pd.to_numeric(df_with_parsed_salary['salary_avg'], errors='coerce').to_numpy(dtype=float)
+            rows = np.flatnonzero(matrix.present & ~np.isnan(salaries))
             
-            if len(salaries) < 10:
+            if len(rows) < 10:
                 return {}
             
-            # Get unique skills from limited sample to avoid timeout
-            all_skills = set()
-            for skills_dict in skills_data[:200]:  # Limit to first 200 records (increased)
-                if isinstance(skills_dict, dict):
-                    all_skills.update(skills_dict.keys())
+            salaries = salaries[rows]
+            incidence = matrix.take(rows).incidence()
             
-            # Limit to top 100 most common skills (increased from 50)
-            all_skills = list(all_skills)[:100]
+            # One sparse pass: per skill count and salary sum of the offers requiring it
+            count_with = np.asarray(incidence.sum(axis=0)).ravel()
+            sum_with = incidence.T @ salaries
+            count_without = len(rows) - count_with
+            sum_without = salaries.sum() - sum_with
+            std = salaries.std()
             
             skill_correlations = {}
-            
-            for skill in all_skills:
-                with_skill_salaries = []
-                without_skill_salaries = []
-                
-                # Simplified data collection
-                for i, skills_dict in enumerate(skills_data):
-                    if i < len(salaries) and isinstance(skills_dict, dict):
-                        if skill in skills_dict:
-                            with_skill_salaries.append(salaries[i])
-                        else:
-                            without_skill_salaries.append(salaries[i])
+            for skill in first_seen_order(incidence.indices).tolist():
+                n_with, n_without = int(count_with[skill]), int(count_without[skill])
                 
                 # Only calculate if we have enough samples
-                if len(with_skill_salaries) >= 3 and len(without_skill_salaries) >= 3:
-                    avg_with = np.mean(with_skill_salaries)
-                    avg_without = np.mean(without_skill_salaries)
+                if n_with >= 3 and n_without >= 3:
+                    avg_with = sum_with[skill] / n_with
+                    avg_without = sum_without[skill] / n_without
+                    correlation = 0.0
+                    if std > 0:
+                        correlation = (avg_with - avg_without) / std * np.sqrt(n_with * n_without) / len(rows)
                     
-                    skill_correlations[skill] = {
-                        'correlation': (avg_with - avg_without) / max(float(avg_with), float(avg_without), 1.0),  # Simplified correlation
+                    skill_correlations[matrix.skills[skill]] = {
+                        'correlation': float(correlation),
                         'avg_with_skill': avg_with,
                         'avg_without_skill': avg_without,
-                        'count_with_skill': len(with_skill_salaries),
-                        'count_without_skill': len(without_skill_salaries)
+                        'count_with_skill': n_with,
+                        'count_without_skill': n_without
                     }
             
             return skill_correlations
@@ -409,29 +700,18 @@ class DataProcessor:
     def get_skills_by_category(self, df):
         """Get skills analysis by category"""
         try:
-            skills_by_category = {}
-            category_skill_counts = {}
+            matrix = skill_matrix.for_frame(df)
+            category_codes, categories = self._group_codes(df, 'category', 'Nieokreślona')
             
-            for _, row in df.iterrows():
-                skills = row.get('skills', {})
-                category = row.get('category', 'Nieokreślona')
-                
-                if isinstance(skills, dict):
-                    for skill in skills.keys():
-                        if skill not in skills_by_category:
-                            skills_by_category[skill] = {}
-                        
-                        if category not in skills_by_category[skill]:
-                            skills_by_category[skill][category] = 0
-                        
-                        skills_by_category[skill][category] += 1
-                        
-                        # Count total occurrences for pie chart
-                        if skill not in category_skill_counts:
-                            category_skill_counts[skill] = {}
-                        if category not in category_skill_counts[skill]:
-                            category_skill_counts[skill][category] = 0
-                        category_skill_counts[skill][category] += 1
+            # Skill x category counts, in first-seen order
+            skills_by_category = {
+                matrix.skills[skill]: {categories[category]: count for category, count in skill_categories}
+                for skill, skill_categories in grouped_counts(
+                    matrix.indices, category_codes[matrix.entry_rows], len(categories))
+            }
+            
+            # Count total occurrences for pie chart
+            category_skill_counts = {skill: dict(counts) for skill, counts in skills_by_category.items()}
             
             # Find most common category for each skill
             skill_main_categories = {}
@@ -454,28 +734,22 @@ class DataProcessor:
     def get_top_skills_by_category(self, df):
         """Get top 3 skills for each category"""
         try:
-            category_skills = {}
+            matrix = skill_matrix.for_frame(df)
+            category_codes, categories = self._group_codes(df, 'category', 'Nieokreślona')
             
-            for _, row in df.iterrows():
-                skills = row.get('skills', {})
-                category = row.get('category', 'Nieokreślona')
-                
-                if isinstance(skills, dict):
-                    if category not in category_skills:
-                        category_skills[category] = {}
-                    
-                    for skill in skills.keys():
-                        if skill not in category_skills[category]:
-                            category_skills[category][skill] = 0
-                        category_skills[category][skill] += 1
+            category_skills = dict(grouped_counts(
+                category_codes[matrix.entry_rows], matrix.indices, len(matrix.skills)))
             
-            # Get top 3 skills for each category
+            # Get top 3 skills for each category, categories in order of their first job with skills data
             top_skills_by_category = {}
-            for category, skills in category_skills.items():
+            for category in first_seen_order(category_codes[matrix.present]).tolist():
+                skills = category_skills.get(category)
                 if skills:
                     # Sort skills by count and get top 3
-                    sorted_skills = sorted(skills.items(), key=lambda x: x[1], reverse=True)[:3]
-                    top_skills_by_category[category] = sorted_skills
+                    sorted_skills = sorted(skills, key=lambda x: x[1], reverse=True)[:3]
+                    top_skills_by_category[categories[category]] = [
+                        (matrix.skills[skill], count) for skill, count in sorted_skills
+                    ]
             
             return top_skills_by_category
             
@@ -483,33 +757,26 @@ class DataProcessor:
             print(f"Error in get_top_skills_by_category: {e}")
             return {}
     
-    def get_cooccurring_skills(self, df, selected_skills):
-        """Get skills that most frequently co-occur with selected skills"""
+    def get_cooccurring_skills(self, df, selected_skills, mode='any', top_n=5):
+        """Get skills that most frequently co-occur with selected skills.
+        
+        mode 'any' counts jobs having at least one of the selected skills,
+        'all' only jobs having every one of them.
+        """
         try:
             if not selected_skills:
                 return []
             
-            skill_cooccurrences = {}
-            
-            for _, row in df.iterrows():
-                skills = row.get('skills', {})
-                if isinstance(skills, dict):
-                    skill_list = list(skills.keys())
-                    
-                    # Check if any of the selected skills are in this job's skills
-                    has_selected_skill = any(skill in skill_list for skill in selected_skills)
-                    
-                    if has_selected_skill:
-                        # Count co-occurrences for all other skills
-                        for skill in skill_list:
-                            if skill not in selected_skills:
-                                if skill not in skill_cooccurrences:
-                                    skill_cooccurrences[skill] = 0
-                                skill_cooccurrences[skill] += 1
+            matrix = skill_matrix.for_frame(df)
+            counts = matrix.cooccurrence_counts(selected_skills, mode)
+            counts[matrix.column_ids(selected_skills)] = 0
             
-            # Sort by frequency and return top 5
-            sorted_skills = sorted(skill_cooccurrences.items(), key=lambda x: x[1], reverse=True)[:5]
-            return sorted_skills
+            # Sort by frequency, ties in order of first appearance among the matching jobs, and return top n
+            mask = matrix.rows_matching(selected_skills, mode)
+            order = first_seen_order(matrix.indices[mask[matrix.entry_rows]])
+            order = order[counts[order] > 0]
+            ranked = order[np.argsort(-counts[order], kind='stable')][:top_n]
+            return [(matrix.skills[skill], int(counts[skill])) for skill in ranked]
             
         except Exception as e:
             print(f"Error in get_cooccurring_skills: {e}")
@@ -0,0 +1,630 @@
+import os
+import json
+import uuid
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import aggregates
+import columnar
+import partitioned
+import skill_matrix
+from aggregates import DatasetAggregates
+from bitmap_index import BitmapIndex
+from columnar import SkillsBlock
+from data_processor import DataProcessor
+from ingest import offer_digest
+from rollup_cube import RollupCube
+from shared_cache import create_shared_cache, namespace
+from skill_matrix import SkillMatrix
+
+UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
+
+# Pointer to the most recently uploaded dataset, shared by all workers
+CURRENT_FILE = 'current.json'
+
+# Filter keys accepted in a filtered-data-store handle, in the order they are applied
+FILTER_COLUMNS = ['city', 'seniority', 'company', 'remote', 'category', 'skills']
+
+# Offer digests (see ingest.offer_digest) of a dataset version: an array appended to its
+# column store, or a file in format 1 directories
+DIGESTS_ARRAY = 'digests'
+DIGESTS_FILE = 'digests.npy'
+
+
+class StaleVersionError(Exception):
+    """Raised when an upload's base is not the latest saved version of its dataset"""
+
+
+class DatasetStore:
+    """Server-side registry of uploaded job offer datasets.
+
+    Browser stores only hold a small handle like
+    {'dataset_id': 'a1b2c3', 'version': 2, 'rows': 1234, 'filters': {...}}
+    and every callback resolves it back to a DataFrame kept in process
+    or, for handles created by another worker or before a restart,
+    memory-mapped from its columnar directory in the uploads folder.
+    Aggregates and rollup cubes built by one worker are put in the shared
+    cache under the dataset version, so the other workers load them
+    instead of rebuilding them.
+    """
+
+    def __init__(self, storage_dir=None, max_datasets=4, max_filtered=32, keep_versions=3, shared_cache=None):
+        self.storage_dir = storage_dir or UPLOAD_FOLDER
+        self.shared_cache = shared_cache if shared_cache is not None else create_shared_cache(self.storage_dir)
+        self.max_datasets = max_datasets
+        self.max_filtered = max_filtered
+        self.keep_versions = keep_versions
+        self._datasets = OrderedDict()
+        self._filtered = OrderedDict()
+        self._sketches = OrderedDict()
+        self._indexes = {}
+        self._cubes = {}
+        self._digests = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def dataset_key(handle):
+        """Return the (dataset_id, version) registry key of a handle"""
+        if not isinstance(handle, dict) or 'dataset_id' not in handle:
+            return None
+        return handle['dataset_id'], int(handle.get('version', 1))
+
+    @classmethod
+    def cache_namespace(cls, handle):
+        """Shared cache namespace of a handle's dataset version, or None"""
+        key = cls.dataset_key(handle)
+        return namespace(key) if key else None
+
+    def create(self, records, digests=None):
+        """Register a new dataset (list of offers or DataFrame) and return its handle.
+
+        digests are the offer digests of the records if the caller already
+        computed them while deduplicating.
+        """
+        dataset_id, version = uuid.uuid4().hex[:12], 1
+
+        if isinstance(records, pd.DataFrame):
+            df = records.reset_index(drop=True)
+        else:
+            df = pd.DataFrame(records)
+        # Derived columns are computed once here and saved with the version
+        df = DataProcessor().enrich(df)
+        key = (dataset_id, version)
+        df.attrs['dataset_key'] = key
+
+        # The skill incidence matrix is encoded once per dataset version and
+        # shared by every DataProcessor call on this dataset or its filters
+        skills_block = SkillsBlock.from_series(df['skills']) if 'skills' in df.columns else None
+
+        self._remember(key, df, skills_block, digests=digests)
+
+        return self._publish(key, df, skills_block)
+
+    def append(self, base_handle, records, digests=None):
+        """Register base_handle's dataset followed by new offers as its next version.
+
+        The skill matrix, dataset aggregates and rollup cube of the new
+        offers are built on their own and merged onto the base version's,
+        so an upload does not recount the whole history, and only the new
+        rows are written. digests are the offer digests of both the base
+        dataset and the new offers. Without new offers the base handle is
+        returned and no version is published.
+
+        Raises StaleVersionError if the base version is gone (pruned, or an
+        unknown handle) or another upload already published a newer one.
+        """
+        base_df = self.get(base_handle)
+        base_key = self.dataset_key(base_handle)
+        if base_df is None:
+            raise StaleVersionError(f"Dataset version {base_key} is no longer available")
+        if len(records) == 0:
+            return {'dataset_id': base_key[0], 'version': base_key[1], 'rows': len(base_df)}
+
+        # Versions are numbered under a per-dataset lock shared by all workers, so two
+        # uploads against the same base cannot both publish its next version
+        with self._dataset_lock(base_key[0]):
+            if self._latest_version(base_key[0]) > base_key[1]:
+                raise StaleVersionError(f"Dataset version {base_key} was already followed by another upload")
+            return self._append(base_key, base_df, records, digests)
+
+    def _append(self, base_key, base_df, records, digests):
+        """Build and publish the next version of base_key's dataset, with its dataset lock held"""
+        if isinstance(records, pd.DataFrame):
+            delta_df = records.reset_index(drop=True)
+        else:
+            delta_df = pd.DataFrame(records)
+        delta_df = DataProcessor().enrich(delta_df)
+        key = (base_key[0], base_key[1] + 1)
+
+        df = pd.concat([base_df, delta_df], ignore_index=True)
+        df.attrs['dataset_key'] = key
+
+        base_matrix = skill_matrix.for_frame(base_df)
+        delta_matrix = SkillMatrix.from_series(
+            delta_df['skills'] if 'skills' in delta_df.columns else pd.Series([None] * len(delta_df)))
+        skills_block = None
+        if 'skills' in df.columns:
+            skills_block = base_matrix.to_block().append(delta_matrix.to_block())
+
+        with self._lock:
+            base_aggregates = aggregates.get(base_key)
+            base_cube = self._cubes.get(base_key)
+            base_index = self._indexes.get(base_key)
+            base_digests = self._digests.get(base_key)
+        delta_salaries = self.parsed_salaries(delta_df)
+        base_salaries = None
+        if base_aggregates is None or base_cube is None:
+            base_salaries = self.parsed_salaries(base_df)
+        dataset_aggregates = cube = None
+        try:
+            if base_aggregates is None:
+                base_aggregates = DatasetAggregates.from_frame(base_df, base_matrix, base_salaries)
+            dataset_aggregates = base_aggregates.merge(
+                DatasetAggregates.from_frame(delta_df, delta_matrix, delta_salaries))
+        except (TypeError, ValueError) as e:
+            print(f"Error merging dataset aggregates {key}: {e}")
+        try:
+            if base_cube is None:
+                base_cube = RollupCube.build(base_df, base_matrix, base_salaries)
+            cube = base_cube.merge(RollupCube.build(delta_df, delta_matrix, delta_salaries))
+        except (TypeError, ValueError) as e:
+            print(f"Error merging rollup cube {key}: {e}")
+
+        index = None
+        if base_index is not None:
+            index = base_index.append(
+                BitmapIndex.from_frame(delta_df, delta_matrix if skills_block is not None else None))
+
+        self._remember(key, df, skills_block, dataset_aggregates=dataset_aggregates, cube=cube,
+                       index=index, digests=digests)
+
+        delta_digests = None
+        if digests is not None and base_digests is not None:
+            delta_digests = digests - base_digests
+        return self._publish(key, df, skills_block,
+                             delta=(base_key, delta_df, delta_matrix.to_block(), delta_digests))
+
+    def digests(self, handle):
+        """Set of offer digests of a dataset, to deduplicate a new upload against it.
+
+        The set is shared with the store; callers must not modify it.
+        """
+        key = self.dataset_key(handle)
+        if key is None:
+            return set()
+        with self._lock:
+            digests = self._digests.get(key)
+        if digests is not None:
+            return digests
+
+        digests = self._load_digests(key)
+        if digests is None:
+            df = self.get(handle)
+            if df is None:
+                return set()
+            digests = {offer_digest(item) for item in df.to_dict('records')}
+        with self._lock:
+            if key in self._datasets:
+                self._digests[key] = digests
+        return digests
+
+    @staticmethod
+    def parsed_salaries(df):
+        """salary_avg of a DataFrame after DataProcessor salary parsing, as floats"""
+        if 'salary_avg' not in df.columns and 'salary' not in df.columns:
+            return np.full(len(df), np.nan)
+        return pd.to_numeric(DataProcessor()._parse_salary_data(df)['salary_avg'],
+                             errors='coerce').to_numpy(dtype=float)
+
+    def current_handle(self):
+        """Handle of the most recently uploaded dataset, or None if nothing was uploaded"""
+        try:
+            with open(os.path.join(self.storage_dir, CURRENT_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load_current(self):
+        """Map the current dataset into this process, e.g. at worker startup"""
+        handle = self.current_handle()
+        if handle is not None and self.get(handle) is None:
+            return None
+        return handle
+
+    def get(self, handle):
+        """Resolve a handle to the full (unfiltered) dataset"""
+        key = self.dataset_key(handle)
+        if key is None:
+            return None
+
+        with self._lock:
+            if key in self._datasets:
+                self._datasets.move_to_end(key)
+                return self._datasets[key]
+
+        df, skills_block = self._load(key)
+        if df is not None:
+            # Another worker registered this version: reuse what it built
+            dataset_aggregates = self.shared_cache.get(namespace(key), 'aggregates')
+            cube = self.shared_cache.get(namespace(key), 'cube')
+            if cube is not None and not cube.has_salaries():
+                # Pickled before the cube kept salary measures; rebuilt by _remember
+                cube = None
+            self._remember(key, df, skills_block, dataset_aggregates=dataset_aggregates, cube=cube)
+        return df
+
+    def resolve(self, handle):
+        """Resolve a handle to a DataFrame, applying its filters if present"""
+        df = self.get(handle)
+        if df is None:
+            return None
+
+        filters = handle.get('filters')
+        if not filters:
+            return df
+
+        cache_key = (self.dataset_key(handle), self.filters_key(filters))
+        with self._lock:
+            if cache_key in self._filtered:
+                self._filtered.move_to_end(cache_key)
+                return self._filtered[cache_key]
+
+        filtered_df = self.apply_filters(df, filters, self._index(self.dataset_key(handle), df))
+        with self._lock:
+            self._filtered[cache_key] = filtered_df
+            while len(self._filtered) > self.max_filtered:
+                self._filtered.popitem(last=False)
+        return filtered_df
+
+    def cube_slice(self, handle):
+        """Rollup cube of a handle's dataset sliced by its filters, or None if the
+        filters restrict something the cube does not hold (company, skills)"""
+        if self.get(handle) is None:
+            return None
+        with self._lock:
+            cube = self._cubes.get(self.dataset_key(handle))
+        filters = handle.get('filters') or {}
+        if cube is None or not cube.supports(filters):
+            return None
+        return cube.slice(filters)
+
+    def sketches(self, handle):
+        """Approximate FrameSketches of a handle's rows, or None if its filters
+        restrict something the sketch cells do not hold (company, skills).
+
+        The whole dataset uses the version's sketches; a filter selection merges
+        the sketches of the cells it selects and is kept like filtered frames.
+        """
+        if self.get(handle) is None:
+            return None
+        key = self.dataset_key(handle)
+        dataset_aggregates = aggregates.get(key)
+        if dataset_aggregates is None:
+            return None
+        filters = handle.get('filters')
+        if not filters:
+            return dataset_aggregates.sketches
+        cell_sketches = getattr(dataset_aggregates, 'cell_sketches', None)
+        if cell_sketches is None:
+            return None
+
+        cache_key = (key, self.filters_key(filters))
+        with self._lock:
+            if cache_key in self._sketches:
+                self._sketches.move_to_end(cache_key)
+                return self._sketches[cache_key]
+
+        sketches = cell_sketches.select(filters)
+        if sketches is not None:
+            with self._lock:
+                self._sketches[cache_key] = sketches
+                while len(self._sketches) > self.max_filtered:
+                    self._sketches.popitem(last=False)
+        return sketches
+
+    def filtered_handle(self, handle, filters, approximate=False):
+        """Build a filtered-data-store handle for a dataset handle and filter values.
+
+        approximate marks the handle for approximate analytics (see sketches()).
+        """
+        filters = self.normalize_filters(filters)
+        result = {'dataset_id': handle['dataset_id'], 'version': handle.get('version', 1)}
+        if filters:
+            result['filters'] = filters
+        if approximate:
+            result['approximate'] = True
+        # Counted from the bitmap index; the filtered rows are only materialized by views that need them
+        df = self.get(result)
+        if df is None:
+            result['rows'] = 0
+        elif filters:
+            result['rows'] = len(self._index(self.dataset_key(result), df).row_ids(filters))
+        else:
+            result['rows'] = len(df)
+        return result
+
+    @staticmethod
+    def normalize_filters(filters):
+        """Drop unset filters and sort values so equal selections compare equal"""
+        normalized = {}
+        for column in FILTER_COLUMNS:
+            values = filters.get(column)
+            if values is None:
+                continue
+            if column != 'remote' and not values:
+                continue
+            normalized[column] = sorted(values, key=str)
+        return normalized
+
+    @staticmethod
+    def filters_key(filters):
+        """Hashable form of normalized filters"""
+        return tuple((column, tuple(filters[column])) for column in FILTER_COLUMNS if column in filters)
+
+    @staticmethod
+    def apply_filters(df, filters, index=None):
+        """Apply normalized filters to a DataFrame using its bitmap index"""
+        if index is None:
+            index = BitmapIndex.from_frame(df, skill_matrix.for_frame(df) if 'skills' in filters else None)
+        return df.iloc[index.row_ids(filters)]
+
+    def _index(self, key, df):
+        with self._lock:
+            index = self._indexes.get(key)
+        if index is None:
+            # The dataset was evicted between get() and this lookup
+            index = BitmapIndex.from_frame(df, skill_matrix.for_frame(df))
+            with self._lock:
+                if key in self._datasets:
+                    self._indexes[key] = index
+        return index
+
+    def _remember(self, key, df, skills_block=None, dataset_aggregates=None, cube=None, index=None, digests=None):
+        """Build the per-version structures of a dataset and register them; digests are kept, not copied.
+
+        Called without the lock held: building may fork a process pool
+        (see partitioned), which must not happen while other threads can
+        be waiting on the lock. Only registering takes it.
+        """
+        matrix = SkillMatrix.from_block(skills_block) if skills_block is not None else None
+        if matrix is not None:
+            skill_matrix.register(key, matrix)
+        matrix = matrix or skill_matrix.for_frame(df)
+
+        # Filter bitmaps, aggregates and the rollup cube are built once per dataset
+        # version, at upload or load; append() passes them merged from the previous
+        # version instead
+        if index is None:
+            index = BitmapIndex.from_frame(df, matrix if skills_block is not None else None)
+        salaries = None
+        if dataset_aggregates is None or cube is None:
+            salaries = self.parsed_salaries(df)
+        if dataset_aggregates is None and cube is None:
+            # Large datasets are aggregated per row range on all cores and merged
+            dataset_aggregates, cube = partitioned.build(df, matrix, salaries)
+        try:
+            if dataset_aggregates is None:
+                dataset_aggregates = DatasetAggregates.from_frame(df, matrix, salaries)
+            else:
+                matrix.set_cooccurrence(dataset_aggregates.cooccurrence)
+            aggregates.register(key, dataset_aggregates)
+        except (TypeError, ValueError) as e:
+            print(f"Error building dataset aggregates {key}: {e}")
+        try:
+            cube = cube or RollupCube.build(df, matrix, salaries)
+        except (TypeError, ValueError) as e:
+            print(f"Error building rollup cube {key}: {e}")
+            cube = None
+
+        with self._lock:
+            self._indexes[key] = index
+            if cube is not None:
+                self._cubes[key] = cube
+            if digests is not None:
+                self._digests[key] = digests
+            self._datasets[key] = df
+            self._datasets.move_to_end(key)
+
+            while len(self._datasets) > self.max_datasets:
+                old_key, _ = self._datasets.popitem(last=False)
+                skill_matrix.unregister(old_key)
+                aggregates.unregister(old_key)
+                self._indexes.pop(old_key, None)
+                self._cubes.pop(old_key, None)
+                self._digests.pop(old_key, None)
+                for cache_key in [k for k in self._filtered if k[0] == old_key]:
+                    del self._filtered[cache_key]
+                for cache_key in [k for k in self._sketches if k[0] == old_key]:
+                    del self._sketches[cache_key]
+
+    @contextmanager
+    def _dataset_lock(self, dataset_id):
+        """Hold an exclusive lock on publishing versions of a dataset, across processes"""
+        os.makedirs(self.storage_dir, exist_ok=True)
+        with open(os.path.join(self.storage_dir, f"{dataset_id}.lock"), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _latest_version(self, dataset_id):
+        """Newest version of a dataset saved in the storage folder, or 0"""
+        prefix = f"{dataset_id}-v"
+        latest = 0
+        try:
+            entries = list(os.scandir(self.storage_dir))
+        except OSError:
+            return latest
+        for entry in entries:
+            version = entry.name[len(prefix):]
+            if not entry.name.startswith(prefix) or not version.isdigit() or int(version) <= latest:
+                continue
+            try:
+                if columnar.read_meta(entry.path) is not None:
+                    latest = int(version)
+            except (OSError, ValueError):
+                continue
+        return latest
+
+    def _path(self, key):
+        dataset_id, version = key
+        return os.path.join(self.storage_dir, f"{dataset_id}-v{version}")
+
+    def _publish(self, key, df, skills_block=None, delta=None):
+        """Save a registered dataset version, make it current and return its handle.
+
+        delta is (base key, new rows, their SkillsBlock, their digests) for a
+        version appended to base key's, so only the new rows are written.
+        """
+        handle = {'dataset_id': key[0], 'version': key[1], 'rows': len(df)}
+        if self._save(key, df, skills_block, delta):
+            self._share(key)
+            self._attach(key, df)
+            self._set_current(handle)
+            self._prune()
+        if key[1] > 1:
+            # Results of the previous version are no longer shown after an upload
+            self.shared_cache.invalidate(namespace((key[0], key[1] - 1)))
+        return handle
+
+    def _share(self, key):
+        """Put the aggregates and rollup cube of a dataset version in the shared cache"""
+        dataset_aggregates = aggregates.get(key)
+        with self._lock:
+            cube = self._cubes.get(key)
+        if dataset_aggregates is not None:
+            self.shared_cache.set(namespace(key), 'aggregates', dataset_aggregates)
+        if cube is not None:
+            self.shared_cache.set(namespace(key), 'cube', cube)
+
+    def _attach(self, key, df=None):
+        """Swap the in-process copy of a saved dataset version for its memory-mapped columns.
+
+        Numeric columns and the skill incidence arrays behind the SkillMatrix
+        are then the same page-cache pages in every worker. String columns
+        and the skills dicts are Python objects decoded by each worker; only
+        the dataset loaded before gunicorn forks shares them, copy-on-write.
+        Filter bitmaps, aggregates and the cube are kept. df is the
+        registered copy; its decoded object columns are reused.
+        """
+        df, skills_block = self._load(key, decoded=df)
+        if df is None:
+            return
+        matrix = SkillMatrix.from_block(skills_block) if skills_block is not None else None
+        dataset_aggregates = aggregates.get(key)
+        if matrix is not None and dataset_aggregates is not None:
+            matrix.set_cooccurrence(dataset_aggregates.cooccurrence)
+        with self._lock:
+            if key not in self._datasets:
+                return
+            self._datasets[key] = df
+            if matrix is not None:
+                skill_matrix.register(key, matrix)
+
+    def _save(self, key, df, skills_block=None, delta=None):
+        meta = {'dataset_id': key[0], 'version': key[1]}
+        try:
+            os.makedirs(self.storage_dir, exist_ok=True)
+            if delta is not None:
+                base_key, delta_df, delta_block, delta_digests = delta
+                arrays = {DIGESTS_ARRAY: self._digest_array(delta_digests)} if delta_digests is not None else None
+                if columnar.append_dataset(self._path(key), self._path(base_key), delta_df, meta=meta,
+                                           skills_block=delta_block, arrays=arrays):
+                    return True
+
+            # A new column store; later versions append their rows to it
+            with self._lock:
+                digests = self._digests.get(key)
+            arrays = {DIGESTS_ARRAY: self._digest_array(digests)} if digests is not None else None
+            store_path = os.path.join(self.storage_dir, f"{key[0]}-s{uuid.uuid4().hex[:12]}")
+            columnar.write_dataset(self._path(key), store_path, df, meta=meta,
+                                   skills_block=skills_block, arrays=arrays)
+            return True
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error saving dataset {key}: {e}")
+            return False
+
+    @staticmethod
+    def _digest_array(digests):
+        return np.frombuffer(b''.join(sorted(digests)), dtype=np.uint8).reshape(-1, 16)
+
+    def _load(self, key, decoded=None):
+        dataset_id, _ = key
+        # Ids are generated by create(); anything else must not reach the filesystem
+        if not dataset_id.isalnum():
+            return None, None
+        path = self._path(key)
+        if not os.path.isdir(path):
+            return None, None
+        try:
+            df, skills_block = columnar.read_dataset(path, decoded=decoded)
+        except Exception as e:
+            print(f"Error loading dataset {key}: {e}")
+            return None, None
+        if df is None:
+            return None, None
+        if not DataProcessor.is_enriched(df):
+            # Saved before derived columns were added at upload
+            df = DataProcessor().enrich(df)
+        df.attrs['dataset_key'] = key
+        return df, skills_block
+
+    def _load_digests(self, key):
+        dataset_id, _ = key
+        if not dataset_id.isalnum():
+            return None
+        try:
+            digests = columnar.read_array(self._path(key), DIGESTS_ARRAY)
+            if digests is None:
+                digests = np.load(os.path.join(self._path(key), DIGESTS_FILE))
+        except (OSError, ValueError):
+            return None
+        return {row.tobytes() for row in digests}
+
+    def _set_current(self, handle):
+        path = os.path.join(self.storage_dir, CURRENT_FILE)
+        tmp_path = path + f".{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(handle, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error updating current dataset: {e}")
+
+    def _prune(self):
+        """Remove all but the newest keep_versions dataset directories, and column stores no version reads"""
+        try:
+            entries = [entry for entry in os.scandir(self.storage_dir) if entry.is_dir()]
+        except OSError:
+            return
+        versions = []
+        stores = []
+        for entry in entries:
+            meta = columnar.read_meta(entry.path)
+            if meta is not None:
+                versions.append((entry, meta))
+            elif os.path.exists(os.path.join(entry.path, columnar.STORE_FILE)):
+                stores.append(entry)
+        versions.sort(key=lambda version: version[0].stat().st_mtime, reverse=True)
+        for entry, _ in versions[self.keep_versions:]:
+            # Workers that already mapped these files keep reading them until they let go
+            shutil.rmtree(entry.path, ignore_errors=True)
+            self.shared_cache.invalidate(entry.name)
+
+        kept = versions[:self.keep_versions]
+        if not kept:
+            return
+        used = {columnar.store_name(meta) for _, meta in kept}
+        # A store newer than the oldest kept version may belong to a version still being written
+        oldest = min(entry.stat().st_mtime for entry, _ in kept)
+        for entry in stores:
+            if entry.name not in used and entry.stat().st_mtime < oldest:
+                shutil.rmtree(entry.path, ignore_errors=True)
@@ -0,0 +1,31 @@
+import gc
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', '2'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+
+# Import the app - and map the current dataset - once in the master; workers are
+# forked from it and share its pages (the memory-mapped columns are page cache
+# anyway, the decoded string and skills columns stay shared until written)
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def pre_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+
+    # SQLite connections of the background job cache must not cross a fork
+    from app import background_manager, server as flask_server
+    if background_manager is not None:
+        background_manager.handle.close()
+
+    # Neither may the database connection opened by db.create_all() at import;
+    # each worker opens its own pool
+    from models import db
+    with flask_server.app_context():
+        db.engine.dispose()
+
+    # Objects loaded so far are never freed; keeping them out of the collector
+    # stops it writing to (and so copying) the pages shared with the workers
+    gc.freeze()
@@ -0,0 +1,189 @@
+import json
+import base64
+import codecs
+import hashlib
+import pandas as pd
+
+# Base64 characters decoded per step - must be a multiple of 4
+BASE64_CHUNK_SIZE = 4 * 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',]'
+
+
+def iter_base64_text(content_string, chunk_size=BASE64_CHUNK_SIZE):
+    """Decode a base64 upload into UTF-8 text one chunk at a time"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    for start in range(0, len(content_string), chunk_size):
+        raw = base64.b64decode(content_string[start:start + chunk_size])
+        text = decoder.decode(raw)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def iter_json_values(text_chunks):
+    """Yield the elements of a top-level JSON array without loading the whole document.
+
+    A top-level object (or any other value) is yielded as a single item.
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(text_chunks)
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or not fill():
+                return
+
+    skip_whitespace()
+    if pos >= len(buffer):
+        return
+
+    if buffer[pos] != '[':
+        # Single document - nothing to stream, decode it whole
+        while fill():
+            pass
+        value, end = decoder.raw_decode(buffer, pos)
+        if buffer[end:].strip():
+            raise ValueError("Nieoczekiwane dane po dokumencie JSON")
+        yield value
+        return
+
+    pos += 1
+    expect_value = True
+    after_comma = False
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError("Niekompletny plik JSON - brak zamknięcia tablicy")
+
+        if buffer[pos] == ']':
+            if expect_value and after_comma:
+                raise ValueError("Nieoczekiwany przecinek przed ']'")
+            pos += 1
+            skip_whitespace()
+            if pos < len(buffer):
+                raise ValueError("Nieoczekiwane dane po tablicy JSON")
+            return
+
+        if not expect_value:
+            if buffer[pos] != ',':
+                raise ValueError(f"Oczekiwano ',' lub ']' zamiast '{buffer[pos]}'")
+            pos += 1
+            expect_value = after_comma = True
+            continue
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The value is most likely cut by the chunk boundary
+            if not fill():
+                raise
+            continue
+
+        if (end >= len(buffer) or buffer[end] not in _DELIMITERS) and not eof:
+            # A number may continue in the next chunk, e.g. "1" + ".5"
+            if fill():
+                continue
+
+        pos = end
+        expect_value = False
+        yield value
+
+
+def iter_json_offers(content_string):
+    """Yield offers from a base64-encoded JSON upload one at a time"""
+    return iter_json_values(iter_base64_text(content_string))
+
+
+def offer_key(item):
+    """Key fields identifying duplicate offers: role, category, city, company, salary, published_date, skills"""
+    def value(field):
+        # Rows read back from the dataset store have NaN where the JSON had no value
+        field_value = item.get(field, '')
+        if field_value is None or field_value != field_value:
+            return ''
+        if isinstance(field_value, float) and field_value.is_integer():
+            # Integer columns with gaps come back from pandas as floats
+            return int(field_value)
+        return field_value
+
+    skills = item.get('skills')
+    return (
+        value('role'),
+        value('category'),
+        value('city'),
+        value('company'),
+        value('salary'),
+        value('published_date'),
+        str(sorted(skills.items())) if isinstance(skills, dict) and skills else ''
+    )
+
+
+def offer_digest(item):
+    """Fixed-size digest of offer_key, so the set of seen offers stays small"""
+    return hashlib.blake2b(repr(offer_key(item)).encode('utf-8'), digest_size=16).digest()
+
+
+class OfferIngestor:
+    """Accumulates uploaded offers column by column, skipping duplicates as they arrive"""
+
+    def __init__(self, existing_df=None, seen=None):
+        self.columns = {}
+        self.rows = 0
+        self.duplicates = 0
+        self.invalid = 0
+        # Digests of offers already stored (e.g. DatasetStore.digests) spare hashing existing_df
+        self.seen = set(seen) if seen is not None else set()
+
+        if existing_df is not None:
+            for item in existing_df.to_dict('records'):
+                self.seen.add(offer_digest(item))
+
+    def add(self, offer):
+        """Add a single offer; returns False if it was skipped"""
+        if not isinstance(offer, dict):
+            self.invalid += 1
+            return False
+
+        digest = offer_digest(offer)
+        if digest in self.seen:
+            self.duplicates += 1
+            return False
+        self.seen.add(digest)
+
+        for name, values in self.columns.items():
+            values.append(offer.get(name))
+        for name, value in offer.items():
+            if name not in self.columns:
+                # Column first seen in this offer - earlier rows have no value
+                self.columns[name] = [None] * self.rows + [value]
+
+        self.rows += 1
+        return True
+
+    def add_all(self, offers):
+        for offer in offers:
+            self.add(offer)
+
+    def to_frame(self):
+        """Accepted offers as a DataFrame"""
+        return pd.DataFrame(self.columns, index=pd.RangeIndex(self.rows))
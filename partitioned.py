@@ -0,0 +1,72 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from aggregates import DatasetAggregates
+from rollup_cube import RollupCube
+
+# Datasets are split into row ranges of at least this many offers; smaller ones are built in one process
+PARTITION_MIN_ROWS = int(os.environ.get('PARTITION_MIN_ROWS', '250000'))
+
+# Processes building partitions at the same time
+PARTITION_WORKERS = int(os.environ.get('PARTITION_WORKERS', str(os.cpu_count() or 1)))
+
+_build_lock = threading.Lock()
+
+
+def partition_bounds(rows, workers=None, min_rows=None):
+    """Contiguous (start, stop) row ranges, one per worker, none smaller than min_rows"""
+    workers = workers or PARTITION_WORKERS
+    min_rows = min_rows or PARTITION_MIN_ROWS
+    partitions = max(1, min(workers, rows // max(min_rows, 1)))
+    edges = np.linspace(0, rows, partitions + 1).astype(np.int64)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+def _build_partition(part, part_matrix, part_salaries):
+    return (DatasetAggregates.from_frame(part, part_matrix, part_salaries),
+            RollupCube.build(part, part_matrix, part_salaries))
+
+
+def build(df, matrix, salaries):
+    """DatasetAggregates and RollupCube of df built as partials in a process pool and merged.
+
+    Partitions are contiguous row ranges merged in row order, so first-seen
+    orderings, cube first rows and every count come out as if built in
+    one pass. Each worker receives its rows, skill matrix block and
+    salaries pickled; the skills column itself is not sent, the matrix
+    holds it. Returns (None, None) when the dataset is too small to split
+    or the pool cannot run; the caller then builds them in process.
+    """
+    bounds = partition_bounds(len(df))
+    # Pool workers import the main script again; one loading a dataset builds it in process
+    if len(bounds) < 2 or multiprocessing.parent_process() is not None:
+        return None, None
+    salaries = np.asarray(salaries, dtype=float)
+
+    # One build at a time, so concurrent uploads do not oversubscribe the cores
+    with _build_lock:
+        try:
+            # Spawned workers are fresh interpreters: forking a web worker that runs other
+            # threads can deadlock on their locks, and a forkserver started in the preloaded
+            # gunicorn master could not be reached from the workers forked from it
+            with ProcessPoolExecutor(max_workers=len(bounds), mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = []
+                for start, stop in bounds:
+                    part = df.iloc[start:stop].reset_index(drop=True)
+                    if 'skills' in part.columns:
+                        part = part.assign(skills=None)
+                    futures.append(pool.submit(_build_partition, part, matrix.take(np.arange(start, stop)),
+                                               salaries[start:stop]))
+                partials = [future.result() for future in futures]
+            dataset_aggregates, cube = partials[0]
+            for part_aggregates, part_cube in partials[1:]:
+                dataset_aggregates = dataset_aggregates.merge(part_aggregates)
+                cube = cube.merge(part_cube)
+        except Exception as e:
+            # Any failure of the pool, a partition or the merge falls back to the in-process build
+            print(f"Error building partitioned aggregates: {e}")
+            return None, None
+    return dataset_aggregates, cube
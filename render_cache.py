@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from plotly.utils import PlotlyJSONEncoder
+
+from single_flight import SingleFlight, SINGLE_FLIGHT_LEASE, SINGLE_FLIGHT_TIMEOUT, SINGLE_FLIGHT_POLL
+
+# Memory budget of rendered tab contents, measured as their JSON size
+RENDER_CACHE_MB = int(os.environ.get('RENDER_CACHE_MB', '64'))
+
+
+class RenderCache:
+    """LRU cache of rendered Dash components with a memory budget.
+
+    Keys are built by the caller, e.g. (dataset key, filters key, tab,
+    role); a new dataset version or filter selection simply misses and the
+    stale entries age out. With a shared cache (see shared_cache), a local
+    miss is looked up in the caller's namespace before rendering, so a
+    figure rendered by one worker is reused by the others.
+
+    Concurrent misses of one key render it once: threads of this process
+    wait for the render in flight, and with a shared cache other workers
+    and background jobs wait for the one holding the key's lease.
+    """
+
+    def __init__(self, max_bytes=None, shared=None):
+        self.max_bytes = max_bytes if max_bytes is not None else RENDER_CACHE_MB * 1024 * 1024
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared_hits = 0
+        self.flights = SingleFlight()
+
+    def get(self, key, namespace=None):
+        """Cached component for key, from this process or the shared cache, or None.
+
+        namespace is the shared cache namespace of the component's data;
+        without it the component is only cached in this process.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        if self.shared is None or namespace is None:
+            return None
+        return self._from_shared(key, namespace)
+
+    def get_or_render(self, key, render, namespace=None):
+        """Cached component for key, or render() it and keep it within the budget"""
+        component = self.get(key, namespace)
+        if component is not None:
+            return component
+        return self.flights.do(key, lambda: self._render(key, render, namespace))
+
+    def _render(self, key, render, namespace):
+        # A render that landed between the lookup and joining the flight
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key][0]
+
+        shared = self.shared if namespace is not None else None
+        leased = shared is not None and shared.acquire(namespace, key, SINGLE_FLIGHT_LEASE)
+        if shared is not None and not leased:
+            component = self._wait_shared(key, namespace)
+            if component is not None:
+                return component
+
+        try:
+            if leased:
+                # Another worker may have published it and let go of the lease since the lookup
+                component = self._from_shared(key, namespace)
+                if component is not None:
+                    return component
+
+            component = render()
+            try:
+                payload = json.dumps(component, cls=PlotlyJSONEncoder)
+            except (TypeError, ValueError) as e:
+                print(f"Error serializing rendered component {key}: {e}")
+                return component
+            if shared is not None:
+                shared.set(namespace, key, payload)
+            self._keep(key, component, len(payload))
+            return component
+        finally:
+            if leased:
+                shared.release(namespace, key)
+
+    def _wait_shared(self, key, namespace):
+        """Component another worker is rendering under its lease, or None if it gave up or timed out"""
+        deadline = time.monotonic() + SINGLE_FLIGHT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(SINGLE_FLIGHT_POLL)
+            component = self._from_shared(key, namespace)
+            if component is not None:
+                return component
+            if not self.shared.held(namespace, key):
+                # Published just before the lease was released, or not at all
+                return self._from_shared(key, namespace)
+        return None
+
+    def _from_shared(self, key, namespace):
+        payload = self.shared.get(namespace, key)
+        if payload is None:
+            return None
+        # Serialized components are valid Dash children as they are
+        component = json.loads(payload)
+        with self._lock:
+            self.shared_hits += 1
+        self._keep(key, component, len(payload))
+        return component
+
+    def _keep(self, key, component, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (component, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit/miss counters and memory use"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'shared_hits': self.shared_hits,
+                'coalesced': self.flights.coalesced,
+                'hit_ratio': self.hits / lookups if lookups else 0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
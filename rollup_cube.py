@@ -0,0 +1,437 @@
+import numpy as np
+import pandas as pd
+
+from data_processor import DataProcessor
+
+# Dimensions of a cube cell besides the publication day
+CUBE_DIMENSIONS = ['city', 'seniority', 'category', 'remote']
+
+
+def _encode(df, column):
+    """Factorize a dimension column (-1 for missing values); a missing column is all -1"""
+    if column not in df.columns:
+        return np.full(len(df), -1, dtype=np.int64), []
+    codes, uniques = pd.factorize(df[column])
+    return codes.astype(np.int64), list(uniques)
+
+
+def _unique_rows(columns):
+    """np.unique over rows of several code columns; returns (first index, inverse)"""
+    radices = [int(column.max(initial=-1)) + 2 for column in columns]
+    if np.prod(np.asarray(radices, dtype=float)) < 2 ** 62:
+        keys = np.zeros(len(columns[0]), dtype=np.int64)
+        for column, radix in zip(columns, radices):
+            keys = keys * radix + (column + 1)
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    else:
+        _, first, inverse = np.unique(np.stack(columns, axis=1), axis=0, return_index=True, return_inverse=True)
+    return first, inverse.ravel()
+
+
+class RollupCube:
+    """Pre-aggregated dataset version: counts and salary sums per (day, city, seniority, category, remote).
+
+    Offer cells hold job counts, jobs with skills data, skill entries,
+    remote jobs and salary count/sum/sum of squares; skill cells hold job
+    counts per (cell, skill). Every cell also keeps the position of its first
+    row, so aggregates sliced from the cube order ties like pandas and
+    Counter do on the raw rows. Distinct companies are kept as
+    (cell, company) pairs.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = set()
+        self.dimensions = {}
+        self.values = {}
+        self.value_ids = {}
+        self.days = None
+        self.cell = {}
+        self.skill_cell = {}
+        self.company_pairs = None
+        self.skills = []
+
+    @classmethod
+    def build(cls, df, matrix, salaries=None):
+        """Cube of df and its skill matrix; salaries are its parsed salary_avg values if the caller already has them"""
+        cube = cls()
+        cube.rows = len(df)
+        cube.columns = set(df.columns)
+        cube.skills = matrix.skills
+
+        if 'published_date' in df.columns:
+            dates = DataProcessor().published_dates(df).dt.normalize()
+            day_codes, days = pd.factorize(dates)
+            day_codes = day_codes.astype(np.int64)
+            cube.days = pd.to_datetime(np.asarray(days))
+        else:
+            day_codes = np.full(len(df), -1, dtype=np.int64)
+            cube.days = pd.to_datetime(np.asarray([], dtype='datetime64[ns]'))
+
+        row_codes = {'day': day_codes}
+        for column in CUBE_DIMENSIONS:
+            row_codes[column], cube.values[column] = _encode(df, column)
+            cube.value_ids[column] = {value: code for code, value in enumerate(cube.values[column])}
+        names = ['day'] + CUBE_DIMENSIONS
+
+        first_row, row_cells = _unique_rows([row_codes[name] for name in names])
+        n_cells = len(first_row)
+        for name in names:
+            cube.dimensions[name] = row_codes[name][first_row]
+
+        if salaries is not None:
+            salaries = np.asarray(salaries, dtype=float)
+        elif 'salary_avg' not in df.columns and 'salary' not in df.columns:
+            salaries = np.full(len(df), np.nan)
+        else:
+            salaries = pd.to_numeric(
+                DataProcessor()._parse_salary_data(df)['salary_avg'], errors='coerce'
+            ).to_numpy(dtype=float)
+        has_salary = ~np.isnan(salaries)
+        salary_values = np.where(has_salary, salaries, 0.0)
+
+        remote = np.zeros(len(df))
+        if 'remote' in df.columns:
+            remote = pd.to_numeric(df['remote'], errors='coerce').astype(float).fillna(0).to_numpy()
+
+        def cell_sum(cells, weights=None):
+            return np.bincount(cells, weights=weights, minlength=n_cells)
+
+        cube.cell = {
+            'jobs': cell_sum(row_cells).astype(np.int64),
+            'first_row': first_row,
+            'skills_jobs': cell_sum(row_cells, matrix.present).astype(np.int64),
+            'skill_entries': cell_sum(row_cells, matrix.row_counts()).astype(np.int64),
+            'remote_jobs': cell_sum(row_cells, remote),
+            'salary_count': cell_sum(row_cells, has_salary).astype(np.int64),
+            'salary_sum': cell_sum(row_cells, salary_values),
+            'salary_sumsq': cell_sum(row_cells, salary_values ** 2)
+        }
+
+        # Distinct companies of every cell
+        company_codes, cube.values['company'] = _encode(df, 'company')
+        has_company = company_codes >= 0
+        pairs = np.unique(row_cells[has_company].astype(np.int64) * (len(cube.values['company']) + 1)
+                          + company_codes[has_company])
+        cube.company_pairs = np.stack(np.divmod(pairs, len(cube.values['company']) + 1), axis=1)
+
+        # Skill cells: (cell, skill) counts of the skill matrix entries
+        entry_rows = matrix.entry_rows
+        if len(entry_rows):
+            first_entry, entry_cells = _unique_rows([row_cells[entry_rows], matrix.indices.astype(np.int64)])
+            n_skill_cells = len(first_entry)
+
+            def skill_cell_sum(weights=None):
+                return np.bincount(entry_cells, weights=weights, minlength=n_skill_cells)
+
+            cube.skill_cell = {
+                'cell': row_cells[entry_rows][first_entry],
+                'skill': matrix.indices[first_entry].astype(np.int64),
+                'jobs': skill_cell_sum().astype(np.int64),
+                'first_entry': first_entry
+            }
+        else:
+            cube.skill_cell = {
+                name: np.zeros(0, dtype=np.int64)
+                for name in ['cell', 'skill', 'jobs', 'first_entry']
+            }
+
+        return cube
+
+    def merge(self, other):
+        """Cube of this dataset followed by the rows other was built from.
+
+        Values, days and skills new to other are appended after this cube's
+        ones, like building the cube on the concatenated rows would; cells
+        present in both are added up.
+        """
+        cube = RollupCube()
+        cube.rows = self.rows + other.rows
+        cube.columns = self.columns | other.columns
+
+        def remap(values, other_values):
+            """Merged values and an array mapping other's codes (and -1) to merged codes"""
+            ids = {value: code for code, value in enumerate(values)}
+            merged = list(values) + [value for value in other_values if value not in ids]
+            ids.update((value, code) for code, value in enumerate(merged))
+            return merged, np.array([ids[value] for value in other_values] + [-1], dtype=np.int64)
+
+        days, mappings = remap(list(self.days), list(other.days))
+        cube.days = pd.DatetimeIndex(days)
+        mappings = {'day': mappings}
+        for column in CUBE_DIMENSIONS + ['company']:
+            cube.values[column], mappings[column] = remap(self.values[column], other.values[column])
+        for column in CUBE_DIMENSIONS:
+            cube.value_ids[column] = {value: code for code, value in enumerate(cube.values[column])}
+        cube.skills, skill_map = remap(self.skills, other.skills)
+
+        names = ['day'] + CUBE_DIMENSIONS
+        codes = [np.concatenate([self.dimensions[name], mappings[name][other.dimensions[name]]]) for name in names]
+        first, cells = _unique_rows(codes)
+        n_cells = len(first)
+        for name, name_codes in zip(names, codes):
+            cube.dimensions[name] = name_codes[first]
+
+        def merge_measures(measures, other_measures, cells, n, first_name, offset):
+            merged = {}
+            for measure, values in measures.items():
+                if measure not in other_measures:
+                    # Measure of a cube pickled by an older version (shared cache)
+                    continue
+                other_values = other_measures[measure]
+                if measure == first_name:
+                    merged[measure] = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)
+                    np.minimum.at(merged[measure], cells, np.concatenate([values, other_values + offset]))
+                else:
+                    merged[measure] = np.bincount(
+                        cells, weights=np.concatenate([values, other_values]), minlength=n
+                    ).astype(values.dtype)
+            return merged
+
+        cube.cell = merge_measures(self.cell, other.cell, cells, n_cells, 'first_row', self.rows)
+        self_cells, other_cells = cells[:len(self.cell['jobs'])], cells[len(self.cell['jobs']):]
+
+        base = len(cube.values['company']) + 1
+        pairs = np.unique(np.concatenate([
+            self_cells[self.company_pairs[:, 0]] * base + self.company_pairs[:, 1],
+            other_cells[other.company_pairs[:, 0]] * base + mappings['company'][other.company_pairs[:, 1]]
+        ]))
+        cube.company_pairs = np.stack(np.divmod(pairs, base), axis=1)
+
+        skill_cell, other_skill_cell = self.skill_cell, other.skill_cell
+        skill_cells = np.concatenate([self_cells[skill_cell['cell']], other_cells[other_skill_cell['cell']]])
+        skills = np.concatenate([skill_cell['skill'], skill_map[other_skill_cell['skill']]])
+        if len(skill_cells):
+            first_entry, entry_cells = _unique_rows([skill_cells, skills])
+            measures = {name: values for name, values in skill_cell.items() if name not in ('cell', 'skill')}
+            other_measures = {name: other_skill_cell[name] for name in measures if name in other_skill_cell}
+            cube.skill_cell = {
+                'cell': skill_cells[first_entry],
+                'skill': skills[first_entry],
+                **merge_measures(measures, other_measures, entry_cells, len(first_entry),
+                                 'first_entry', int(self.cell['skill_entries'].sum()))
+            }
+        else:
+            cube.skill_cell = dict(skill_cell)
+
+        return cube
+
+    def has_salaries(self):
+        """Whether the cells hold salary measures (cubes pickled by an older version do not)"""
+        return 'salary_count' in self.cell
+
+    def supports(self, filters):
+        """Whether a filter selection only restricts cube dimensions"""
+        return all(column in CUBE_DIMENSIONS for column in (filters or {}))
+
+    def slice(self, filters=None):
+        """CubeSlice of the cells passing normalized filters (see DatasetStore.normalize_filters)"""
+        mask = np.ones(len(self.cell['jobs']), dtype=bool)
+        for column, values in (filters or {}).items():
+            if column not in CUBE_DIMENSIONS:
+                raise ValueError(f"Cube cannot be sliced by {column}")
+            codes = []
+            for value in values:
+                try:
+                    if value in self.value_ids[column]:
+                        codes.append(self.value_ids[column][value])
+                except TypeError:
+                    continue
+            mask &= np.isin(self.dimensions[column], codes)
+        return CubeSlice(self, mask)
+
+
+class CubeSlice:
+    """Aggregates of the cube cells selected by a filter"""
+
+    def __init__(self, cube, mask):
+        self.cube = cube
+        self.mask = mask
+        self.skill_mask = mask[cube.skill_cell['cell']]
+
+    def total(self, measure):
+        return self.cube.cell[measure][self.mask].sum()
+
+    def total_jobs(self):
+        return int(self.total('jobs'))
+
+    def avg_skills(self):
+        """Average number of skills of jobs with skills data"""
+        skills_jobs = self.total('skills_jobs')
+        return self.total('skill_entries') / skills_jobs if skills_jobs else 0
+
+    def remote_jobs(self):
+        if 'remote' not in self.cube.columns:
+            return 0
+        return int(self.total('remote_jobs'))
+
+    def salary_stats(self):
+        """Count, mean and standard deviation (ddof=1, None for a single salary) of the parsed salaries,
+        {} without salaries"""
+        count = int(self.total('salary_count'))
+        if count == 0:
+            return {}
+        total = self.total('salary_sum')
+        mean = float(total / count)
+        std = None
+        if count > 1:
+            std = float(np.sqrt(max(self.total('salary_sumsq') - total * mean, 0.0) / (count - 1)))
+        return {'count': count, 'mean': mean, 'std': std}
+
+    def nunique(self, column):
+        """Number of distinct non-missing values of a dimension or of company"""
+        if column == 'company':
+            pairs = self.cube.company_pairs
+            return len(np.unique(pairs[self.mask[pairs[:, 0]], 1]))
+        codes = self.cube.dimensions[column][self.mask]
+        return len(np.unique(codes[codes >= 0]))
+
+    def value_counts(self, column):
+        """Job counts per value of a dimension, like Series.value_counts (missing values dropped)"""
+        codes = self.cube.dimensions[column][self.mask]
+        jobs = self.cube.cell['jobs'][self.mask]
+        first_rows = self.cube.cell['first_row'][self.mask]
+        keep = codes >= 0
+        n_values = len(self.cube.values[column])
+
+        counts = np.bincount(codes[keep], weights=jobs[keep], minlength=n_values).astype(np.int64)
+        first = np.full(n_values, self.cube.rows, dtype=np.int64)
+        np.minimum.at(first, codes[keep], first_rows[keep])
+
+        present = np.flatnonzero(counts > 0)
+        order = present[np.lexsort((first[present], -counts[present]))]
+        values = [self.cube.values[column][code] for code in order]
+        return pd.Series(counts[order], index=pd.Index(values, name=column), name='count')
+
+    def most_common_skill_ids(self, n=None):
+        """Skill ids ranked like SkillMatrix.most_common_ids on the sliced rows"""
+        skill_cell = self.cube.skill_cell
+        skills = skill_cell['skill'][self.skill_mask]
+        counts = np.bincount(skills, weights=skill_cell['jobs'][self.skill_mask],
+                             minlength=len(self.cube.skills)).astype(np.int64)
+        first = np.full(len(self.cube.skills), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first, skills, skill_cell['first_entry'][self.skill_mask])
+
+        present = np.flatnonzero(counts > 0)
+        ranked = present[np.lexsort((first[present], -counts[present]))]
+        return ranked if n is None else ranked[:n]
+
+    def skill_counts_by(self, column, skill_ids):
+        """{dimension value: {skill: count}} for the given skills.
+
+        Jobs without a value are grouped under NaN, or 'Unknown' when the
+        dataset has no such column, like DataProcessor.process_skills_data.
+        """
+        skill_cell = self.cube.skill_cell
+        selected = np.full(len(self.cube.skills), -1, dtype=np.int64)
+        selected[skill_ids] = np.arange(len(skill_ids))
+        columns = selected[skill_cell['skill']]
+        keep = self.skill_mask & (columns >= 0)
+        codes = self.cube.dimensions[column][skill_cell['cell'][keep]]
+
+        result = {}
+        missing = np.nan if column in self.cube.columns else 'Unknown'
+        for code, skill_column, jobs in zip(codes.tolist(), columns[keep].tolist(), skill_cell['jobs'][keep].tolist()):
+            value = self.cube.values[column][code] if code >= 0 else missing
+            counts = result.setdefault(value, {})
+            skill = self.cube.skills[skill_ids[skill_column]]
+            counts[skill] = counts.get(skill, 0) + jobs
+        return result
+
+    def day_counts(self):
+        """Job counts of every dated day, indexed by day code (see RollupCube.days)"""
+        days = self.cube.dimensions['day'][self.mask]
+        keep = days >= 0
+        counts = np.bincount(days[keep], weights=self.cube.cell['jobs'][self.mask][keep],
+                             minlength=len(self.cube.days)).astype(np.int64)
+        return counts
+
+    def grouped_stats(self, column, top_n):
+        """Statistics of every value of a dimension, in first-seen order, like DataProcessor.get_location_stats.
+
+        {value: {'total_jobs', 'top_skills', 'salary_stats', 'companies', 'remote_ratio'}};
+        salary_stats hold the count and mean only, and top skills rank ties
+        in first-seen order like Counter.most_common on the value's rows.
+        """
+        cube = self.cube
+        n_values = len(cube.values[column])
+        codes = cube.dimensions[column]
+        keep = self.mask & (codes >= 0)
+        cell_codes = codes[keep]
+
+        def value_sum(measure):
+            return np.bincount(cell_codes, weights=cube.cell[measure][keep], minlength=n_values)
+
+        jobs = value_sum('jobs').astype(np.int64)
+        first = np.full(n_values, cube.rows, dtype=np.int64)
+        np.minimum.at(first, cell_codes, cube.cell['first_row'][keep])
+        present = np.flatnonzero(jobs > 0)
+        order = present[np.argsort(first[present], kind='stable')]
+
+        # (value, skill) counts ranked by count, then by first entry
+        top_skills = {}
+        skill_cell = cube.skill_cell
+        skill_codes = codes[skill_cell['cell']]
+        skill_keep = self.skill_mask & (skill_codes >= 0)
+        if skill_keep.any():
+            n_skills = max(len(cube.skills), 1)
+            pairs, pair_ids = np.unique(skill_codes[skill_keep] * n_skills + skill_cell['skill'][skill_keep],
+                                        return_inverse=True)
+            pair_ids = pair_ids.ravel()
+            pair_jobs = np.bincount(pair_ids, weights=skill_cell['jobs'][skill_keep], minlength=len(pairs))
+            pair_first = np.full(len(pairs), np.iinfo(np.int64).max, dtype=np.int64)
+            np.minimum.at(pair_first, pair_ids, skill_cell['first_entry'][skill_keep])
+            pair_values, pair_skills = np.divmod(pairs, n_skills)
+            ranked = np.lexsort((pair_first, -pair_jobs, pair_values))
+            for code, skill, count in zip(pair_values[ranked].tolist(), pair_skills[ranked].tolist(),
+                                          pair_jobs[ranked].astype(np.int64).tolist()):
+                value_skills = top_skills.setdefault(code, [])
+                if len(value_skills) < top_n:
+                    value_skills.append((cube.skills[skill], count))
+
+        salary_count = value_sum('salary_count')
+        salary_sum = value_sum('salary_sum')
+
+        pairs = cube.company_pairs
+        company_keep = keep[pairs[:, 0]]
+        company_pairs = np.unique(codes[pairs[company_keep, 0]] * (len(cube.values['company']) + 1)
+                                  + pairs[company_keep, 1])
+        companies = np.bincount(company_pairs // (len(cube.values['company']) + 1), minlength=n_values)
+
+        remote_ratio = np.zeros(n_values)
+        if 'remote' in cube.columns:
+            # Jobs with a remote value, like the mean of the column on the value's rows
+            has_remote = cube.dimensions['remote'][keep] >= 0
+            remote_jobs = np.bincount(cell_codes, weights=cube.cell['remote_jobs'][keep], minlength=n_values)
+            remote_known = np.bincount(cell_codes, weights=cube.cell['jobs'][keep] * has_remote, minlength=n_values)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                remote_ratio = remote_jobs / remote_known
+
+        stats = {}
+        for code in order.tolist():
+            salary_stats = {}
+            if salary_count[code]:
+                salary_stats = {'count': int(salary_count[code]), 'mean': salary_sum[code] / salary_count[code]}
+            stats[cube.values[column][code]] = {
+                'total_jobs': int(jobs[code]),
+                'top_skills': top_skills.get(code, []),
+                'salary_stats': salary_stats,
+                'companies': int(companies[code]),
+                'remote_ratio': float(remote_ratio[code])
+            }
+        return stats
+
+    def day_skill_counts(self, skill_ids):
+        """Day x skill matrix of job counts for the given skills"""
+        skill_cell = self.cube.skill_cell
+        selected = np.full(len(self.cube.skills), -1, dtype=np.int64)
+        selected[skill_ids] = np.arange(len(skill_ids))
+        columns = selected[skill_cell['skill']]
+        days = self.cube.dimensions['day'][skill_cell['cell']]
+        keep = self.skill_mask & (columns >= 0) & (days >= 0)
+
+        return np.bincount(
+            days[keep] * len(skill_ids) + columns[keep],
+            weights=skill_cell['jobs'][keep],
+            minlength=len(self.cube.days) * len(skill_ids)
+        ).astype(np.int64).reshape(len(self.cube.days), len(skill_ids))
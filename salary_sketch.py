@@ -0,0 +1,122 @@
+import numpy as np
+
+from skill_matrix import first_seen_order
+
+# Centroids kept per sketch; a quantile is off by at most about 2 * count / SKETCH_CAPACITY ranks
+SKETCH_CAPACITY = 512
+
+# Percentiles reported by SalarySketch.percentiles
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+class SalarySketch:
+    """Mergeable quantile sketch of salaries.
+
+    Keeps sorted (value, weight) centroids: every distinct salary is its own
+    centroid, which makes quantiles exact, until there are more than
+    SKETCH_CAPACITY of them. Then runs of neighbouring centroids are merged
+    into their weighted mean, each run holding about count / SKETCH_CAPACITY
+    salaries, which bounds the rank error of a quantile. Count, sum, sum of
+    squares, min and max are always exact.
+    """
+
+    def __init__(self, values=None, weights=None):
+        self.values = np.zeros(0) if values is None else np.asarray(values, dtype=float)
+        self.weights = np.zeros(0, dtype=np.int64) if weights is None else np.asarray(weights, dtype=np.int64)
+        self.count = int(self.weights.sum())
+        self.total = float(self.values @ self.weights) if self.count else 0.0
+        self.total_sq = float((self.values ** 2) @ self.weights) if self.count else 0.0
+        self.min = float(self.values[0]) if self.count else np.nan
+        self.max = float(self.values[-1]) if self.count else np.nan
+        self._compress()
+
+    @classmethod
+    def from_values(cls, values):
+        """Sketch of an array of salaries; NaN values are ignored"""
+        values = np.asarray(values, dtype=float)
+        values, weights = np.unique(values[~np.isnan(values)], return_counts=True)
+        return cls(values, weights)
+
+    def merge(self, other):
+        """Sketch of the salaries of both sketches"""
+        values, inverse = np.unique(np.concatenate([self.values, other.values]), return_inverse=True)
+        weights = np.bincount(inverse.ravel(), weights=np.concatenate([self.weights, other.weights]),
+                              minlength=len(values))
+        merged = SalarySketch(values, weights.astype(np.int64))
+        # Exact totals survive compression of the inputs
+        merged.count = self.count + other.count
+        merged.total = self.total + other.total
+        merged.total_sq = self.total_sq + other.total_sq
+        merged.min = np.nanmin([self.min, other.min]) if merged.count else np.nan
+        merged.max = np.nanmax([self.max, other.max]) if merged.count else np.nan
+        return merged
+
+    def _compress(self):
+        if len(self.values) <= SKETCH_CAPACITY:
+            return
+        # Centroids starting in the same count / capacity slice of ranks are merged
+        starts = np.cumsum(self.weights) - self.weights
+        runs = (starts * SKETCH_CAPACITY // self.count).astype(np.int64)
+        _, runs = np.unique(runs, return_inverse=True)
+        weights = np.bincount(runs, weights=self.weights)
+        self.values = np.bincount(runs, weights=self.values * self.weights) / weights
+        self.weights = weights.astype(np.int64)
+
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    def std(self, ddof=0):
+        if self.count <= ddof:
+            return np.nan
+        variance = (self.total_sq - self.total * self.mean()) / (self.count - ddof)
+        return float(np.sqrt(max(variance, 0.0)))
+
+    def quantile(self, q):
+        """Quantile with linear interpolation between ranks, like np.quantile"""
+        if not self.count:
+            return np.nan
+        position = q * (self.count - 1)
+        ranks = np.cumsum(self.weights)
+        lower = self.values[np.searchsorted(ranks, np.floor(position), side='right')]
+        upper = self.values[np.searchsorted(ranks, np.ceil(position), side='right')]
+        value = lower + (upper - lower) * (position - np.floor(position))
+        return float(min(max(value, self.min), self.max))
+
+    def median(self):
+        return self.quantile(0.5)
+
+    def percentiles(self):
+        """{'p10': ..., 'p25': ..., 'p50': ..., 'p75': ..., 'p90': ...}"""
+        return {f"p{percentile}": self.quantile(percentile / 100) for percentile in PERCENTILES}
+
+    def summary(self):
+        """Mean, median, count and percentiles, the salary_stats of location and company stats"""
+        return {'mean': self.mean(), 'median': self.median(), 'count': self.count, **self.percentiles()}
+
+
+def grouped_sketches(codes, values):
+    """One SalarySketch per group code of the non-NaN values; returns {code: sketch} in first-seen order"""
+    codes = np.asarray(codes, dtype=np.int64)
+    values = np.asarray(values, dtype=float)
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    if len(codes) == 0:
+        return {}
+    group_order = first_seen_order(codes).tolist()
+
+    # Distinct (group, salary) pairs with their counts, sorted by group then salary
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+    new_pair = np.ones(len(codes), dtype=bool)
+    new_pair[1:] = (codes[1:] != codes[:-1]) | (values[1:] != values[:-1])
+    starts = np.flatnonzero(new_pair)
+    weights = np.diff(np.append(starts, len(codes)))
+    codes, values = codes[starts], values[starts]
+
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    sketches = {
+        int(group_codes[0]): SalarySketch(group_values, group_weights)
+        for group_codes, group_values, group_weights in zip(
+            np.split(codes, bounds), np.split(values, bounds), np.split(weights, bounds))
+    }
+    return {group: sketches[group] for group in group_order}
@@ -0,0 +1,238 @@
+import os
+import time
+import shutil
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# redis://host:port/db for the Redis service, 'memory' for a process-local cache;
+# anything else caches to files in the uploads folder, shared by workers on one host
+CACHE_URL = os.environ.get('CACHE_URL', os.environ.get('REDIS_URL', ''))
+
+# Seconds a cached result is kept
+CACHE_TTL = int(os.environ.get('CACHE_TTL', '86400'))
+
+REDIS_PREFIX = 'jobdataviz:'
+
+
+def _digest(name):
+    """Fixed-size key for any hashable cache key (tuples of filters, tabs, ...)"""
+    return hashlib.blake2b(repr(name).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class SharedCache:
+    """Cache of pickled results shared by all workers.
+
+    Entries live in a namespace - the dataset version they were computed
+    from, e.g. 'a1b2c3-v2' - so an upload invalidates the previous
+    version's results with a single invalidate(namespace) call.
+    Backend errors are reported and treated as misses.
+    """
+
+    def get(self, namespace, name):
+        try:
+            data = self._get(namespace, _digest(name))
+        except Exception as e:
+            print(f"Error reading shared cache {namespace}: {e}")
+            return None
+        return pickle.loads(data) if data is not None else None
+
+    def set(self, namespace, name, value):
+        try:
+            self._set(namespace, _digest(name), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception as e:
+            print(f"Error writing shared cache {namespace}: {e}")
+
+    def invalidate(self, namespace):
+        try:
+            self._invalidate(namespace)
+        except Exception as e:
+            print(f"Error invalidating shared cache {namespace}: {e}")
+
+    def acquire(self, namespace, name, ttl):
+        """Take the lease on name for ttl seconds; False while another worker holds it.
+
+        Leases let one worker compute a result the others are waiting for
+        in the cache. When the backend fails the lease is granted, so the
+        caller computes the result itself.
+        """
+        try:
+            return self._acquire(namespace, _digest(('lease', name)), ttl)
+        except Exception as e:
+            print(f"Error acquiring shared cache lease {namespace}: {e}")
+            return True
+
+    def held(self, namespace, name):
+        try:
+            return self._held(namespace, _digest(('lease', name)))
+        except Exception as e:
+            print(f"Error reading shared cache lease {namespace}: {e}")
+            return False
+
+    def release(self, namespace, name):
+        try:
+            self._release(namespace, _digest(('lease', name)))
+        except Exception as e:
+            print(f"Error releasing shared cache lease {namespace}: {e}")
+
+
+class MemoryCache(SharedCache):
+    """Process-local stand-in for the shared cache (tests, single worker)"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def _get(self, namespace, key):
+        with self._lock:
+            data = self._entries.get((namespace, key))
+            if data is not None:
+                self._entries.move_to_end((namespace, key))
+            return data
+
+    def _set(self, namespace, key, data):
+        with self._lock:
+            self._entries[(namespace, key)] = data
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _invalidate(self, namespace):
+        with self._lock:
+            for entry in [entry for entry in self._entries if entry[0] == namespace]:
+                del self._entries[entry]
+            for lease in [lease for lease in self._leases if lease[0] == namespace]:
+                del self._leases[lease]
+
+    def _acquire(self, namespace, key, ttl):
+        with self._lock:
+            if self._leases.get((namespace, key), 0) > time.time():
+                return False
+            self._leases[(namespace, key)] = time.time() + ttl
+            return True
+
+    def _held(self, namespace, key):
+        with self._lock:
+            return self._leases.get((namespace, key), 0) > time.time()
+
+    def _release(self, namespace, key):
+        with self._lock:
+            self._leases.pop((namespace, key), None)
+
+
+class FileCache(SharedCache):
+    """Cache shared by the workers of one host: one file per entry, one directory per namespace"""
+
+    def __init__(self, path, ttl=CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+
+    def _file(self, namespace, key):
+        return os.path.join(self.path, namespace, key)
+
+    def _get(self, namespace, key):
+        path = self._file(namespace, key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _set(self, namespace, key, data):
+        path = self._file(namespace, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + f".{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _invalidate(self, namespace):
+        shutil.rmtree(os.path.join(self.path, namespace), ignore_errors=True)
+
+    def _acquire(self, namespace, key, ttl):
+        # The lease file holds its expiry time; linking it into place is the atomic test-and-set
+        path = self._file(namespace, key) + '.lease'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(str(time.time() + ttl))
+        try:
+            for _ in range(2):
+                try:
+                    os.link(tmp_path, path)
+                    return True
+                except FileExistsError:
+                    if self._held(namespace, key):
+                        return False
+                    # Expired lease of a worker that died while computing
+                    self._release(namespace, key)
+            return False
+        finally:
+            os.remove(tmp_path)
+
+    def _held(self, namespace, key):
+        try:
+            with open(self._file(namespace, key) + '.lease', 'r') as f:
+                return float(f.read()) > time.time()
+        except FileNotFoundError:
+            return False
+
+    def _release(self, namespace, key):
+        try:
+            os.remove(self._file(namespace, key) + '.lease')
+        except FileNotFoundError:
+            pass
+
+
+class RedisCache(SharedCache):
+    """Cache in the Redis service of docker-compose"""
+
+    def __init__(self, url, ttl=CACHE_TTL):
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def _get(self, namespace, key):
+        return self.client.get(f"{REDIS_PREFIX}{namespace}:{key}")
+
+    def _set(self, namespace, key, data):
+        self.client.set(f"{REDIS_PREFIX}{namespace}:{key}", data, ex=self.ttl)
+
+    def _invalidate(self, namespace):
+        keys = list(self.client.scan_iter(match=f"{REDIS_PREFIX}{namespace}:*", count=1000))
+        if keys:
+            self.client.delete(*keys)
+
+    def _acquire(self, namespace, key, ttl):
+        return bool(self.client.set(f"{REDIS_PREFIX}{namespace}:{key}", b'1', ex=ttl, nx=True))
+
+    def _held(self, namespace, key):
+        return bool(self.client.exists(f"{REDIS_PREFIX}{namespace}:{key}"))
+
+    def _release(self, namespace, key):
+        self.client.delete(f"{REDIS_PREFIX}{namespace}:{key}")
+
+
+def create_shared_cache(storage_dir, url=CACHE_URL):
+    """Shared cache backend selected by CACHE_URL / REDIS_URL"""
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        if redis is not None:
+            return RedisCache(url)
+        print("Error creating Redis cache: the redis package is not installed, using files")
+    elif url == 'memory':
+        return MemoryCache()
+    return FileCache(os.path.join(storage_dir, 'cache'))
+
+
+def namespace(dataset_key):
+    """Cache namespace of a (dataset_id, version) dataset key"""
+    dataset_id, version = dataset_key
+    return f"{dataset_id}-v{version}"
@@ -0,0 +1,70 @@
+import os
+import threading
+
+# Seconds before gunicorn kills a busy worker (see gunicorn.conf.py); a render never holds its lease longer
+WORKER_TIMEOUT = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+SINGLE_FLIGHT_LEASE = WORKER_TIMEOUT
+
+# Seconds a worker waits for another worker's identical render before rendering it itself;
+# well inside the worker timeout, so a request that gives up waiting still has time to render
+SINGLE_FLIGHT_TIMEOUT = min(int(os.environ.get('SINGLE_FLIGHT_TIMEOUT', str(WORKER_TIMEOUT // 4))),
+                            WORKER_TIMEOUT // 2)
+
+# Seconds between looks at the shared cache while another worker renders
+SINGLE_FLIGHT_POLL = float(os.environ.get('SINGLE_FLIGHT_POLL', '0.2'))
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent identical computations within one process.
+
+    The first caller of a key runs the computation; callers arriving while
+    it is in flight wait and get the same result (or exception) instead of
+    computing it again. Nothing is kept once it lands - caching the result
+    is up to the caller.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, compute):
+        if self._pid != os.getpid():
+            # Flights of the parent never land in a forked child (background jobs)
+            self._reset()
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
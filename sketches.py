@@ -0,0 +1,334 @@
+import os
+import numpy as np
+import pandas as pd
+
+from skill_matrix import grouped_counts
+
+# HyperLogLog registers are 2**HLL_PRECISION bytes; relative standard error 1.04 / sqrt(2**HLL_PRECISION)
+HLL_PRECISION = 12
+
+# Count-Min table size: an estimate exceeds the true count by at most e / CMS_WIDTH of the
+# total with probability 1 - exp(-CMS_DEPTH)
+CMS_WIDTH = 2048
+CMS_DEPTH = 4
+
+# Heavy hitters tracked by Space-Saving
+TOP_K_CAPACITY = 200
+
+# Rows hashed per step when sketching a DataFrame, so memory does not grow with the data
+SKETCH_CHUNK_ROWS = 50000
+
+# Dimensions of a sketch cell - the rollup cube cell without the publication day
+CELL_DIMENSIONS = ['city', 'seniority', 'category', 'remote']
+
+# Per-cell sketch sizes: two 1 KB HyperLogLogs, an 8 KB Count-Min table, 64 top skills
+CELL_HLL_PRECISION = 10
+CELL_CMS_WIDTH = 256
+CELL_TOP_K_CAPACITY = 64
+
+# In-memory size of one cell, about 27 KB (Space-Saving counters take about 256 bytes each
+# in Python dicts); pickled for the shared cache a cell is about 11 KB
+CELL_SKETCH_BYTES = 2 * (1 << CELL_HLL_PRECISION) + CMS_DEPTH * CELL_CMS_WIDTH * 8 + CELL_TOP_K_CAPACITY * 256
+
+# Memory budget for the sketch cells of a dataset version; past it filtered selections are not sketched
+SKETCH_BUDGET_MB = int(os.environ.get('SKETCH_BUDGET_MB', '64'))
+SKETCH_MAX_CELLS = SKETCH_BUDGET_MB * 1024 * 1024 // CELL_SKETCH_BYTES
+
+
+def value_hashes(values):
+    """64-bit hashes of the non-missing values, stable across processes and restarts"""
+    values = pd.Series(values, dtype=object).dropna()
+    if values.empty:
+        return np.zeros(0, dtype=np.uint64)
+    return pd.util.hash_pandas_object(values.astype(str), index=False).to_numpy(dtype=np.uint64)
+
+
+class HyperLogLog:
+    """Approximate distinct count in 2**precision one-byte registers"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(hashes) == 0:
+            return
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rest = hashes << np.uint64(self.precision)
+
+        # Leading zeros of the remaining bits by binary search over shifts
+        zeros = np.zeros(len(rest), dtype=np.int64)
+        for shift in (32, 16, 8, 4, 2, 1):
+            small = rest < (np.uint64(1) << np.uint64(64 - shift))
+            zeros[small] += shift
+            rest[small] <<= np.uint64(shift)
+        rank = np.minimum(zeros + 1, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def add(self, values):
+        self.add_hashes(value_hashes(values))
+
+    def merge(self, other):
+        """HyperLogLog of the union of both sets"""
+        merged = HyperLogLog(self.precision)
+        merged.registers = np.maximum(self.registers, other.registers)
+        return merged
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and empty:
+            # Linear counting is more accurate for small sets
+            return int(round(m * np.log(m / empty)))
+        return int(round(raw))
+
+    def relative_error(self):
+        """Relative standard error of estimate()"""
+        return 1.04 / np.sqrt(len(self.registers))
+
+
+class CountMinSketch:
+    """Approximate frequencies that never undercount"""
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH):
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    def _columns(self, hashes):
+        # Kirsch-Mitzenmacher: row i uses h1 + i * h2
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        low = (hashes & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        high = (hashes >> np.uint64(32)).astype(np.int64)
+        width = self.table.shape[1]
+        return [(low + i * high) % width for i in range(self.table.shape[0])]
+
+    def add_hashes(self, hashes, counts):
+        counts = np.asarray(counts, dtype=np.int64)
+        for row, columns in enumerate(self._columns(hashes)):
+            np.add.at(self.table[row], columns, counts)
+        self.total += int(counts.sum())
+
+    def estimate_hashes(self, hashes):
+        if len(hashes) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.min([self.table[row][columns] for row, columns in enumerate(self._columns(hashes))], axis=0)
+
+    def merge(self, other):
+        merged = CountMinSketch(self.table.shape[1], self.table.shape[0])
+        merged.table = self.table + other.table
+        merged.total = self.total + other.total
+        return merged
+
+    def error_bound(self):
+        """Overcount that an estimate exceeds with probability at most exp(-depth)"""
+        return np.e / self.table.shape[1] * self.total
+
+
+class SpaceSaving:
+    """Top-k heavy hitters in a fixed number of counters.
+
+    Every tracked count overestimates the true one by at most its error;
+    an untracked item occurs at most min_count() times.
+    """
+
+    def __init__(self, capacity=TOP_K_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+
+    @classmethod
+    def from_counts(cls, items, counts, capacity=TOP_K_CAPACITY):
+        """Summary of exact counts: the capacity largest are kept without error, ties in given order"""
+        summary = cls(capacity)
+        for item, count in sorted(zip(items, counts), key=lambda x: x[1], reverse=True)[:capacity]:
+            summary.counts[item] = count
+            summary.errors[item] = 0
+        return summary
+
+    def add_counts(self, items, counts):
+        """Add a batch of (item, count) pairs, e.g. per-chunk totals"""
+        for item, count in zip(items, counts):
+            if item in self.counts:
+                self.counts[item] += count
+            elif len(self.counts) < self.capacity:
+                self.counts[item] = count
+                self.errors[item] = 0
+            else:
+                # Replace the smallest counter; its count becomes the new item's error
+                smallest = min(self.counts, key=self.counts.get)
+                floor = self.counts.pop(smallest)
+                del self.errors[smallest]
+                self.counts[item] = floor + count
+                self.errors[item] = floor
+
+    def min_count(self):
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def merge(self, other):
+        """Mergeable summary: items missing on one side get that side's min_count as count and error"""
+        merged = SpaceSaving(self.capacity)
+        self_floor, other_floor = self.min_count(), other.min_count()
+        counts, errors = {}, {}
+        for item in list(self.counts) + [item for item in other.counts if item not in self.counts]:
+            counts[item] = self.counts.get(item, self_floor) + other.counts.get(item, other_floor)
+            errors[item] = self.errors.get(item, self_floor) + other.errors.get(item, other_floor)
+        for item in sorted(counts, key=counts.get, reverse=True)[:self.capacity]:
+            merged.counts[item] = counts[item]
+            merged.errors[item] = errors[item]
+        return merged
+
+    def top(self, n):
+        """[(item, count, error), ...] for the n largest counts"""
+        items = sorted(self.counts, key=self.counts.get, reverse=True)[:n]
+        return [(item, self.counts[item], self.errors[item]) for item in items]
+
+
+class FrameSketches:
+    """Approximate summary of job offers: distinct companies and cities, skill frequencies and top skills.
+
+    Built chunk by chunk and mergeable, so it can be kept per dataset
+    version, merged on upload and combined across partitions.
+    """
+
+    def __init__(self, precision=HLL_PRECISION, width=CMS_WIDTH, capacity=TOP_K_CAPACITY):
+        self.companies = HyperLogLog(precision)
+        self.cities = HyperLogLog(precision)
+        self.skill_frequencies = CountMinSketch(width)
+        self.top_skills = SpaceSaving(capacity)
+
+    @classmethod
+    def from_frame(cls, df, matrix):
+        sketches = cls()
+        for start in range(0, len(df), SKETCH_CHUNK_ROWS):
+            stop = min(start + SKETCH_CHUNK_ROWS, len(df))
+            if 'company' in df.columns:
+                sketches.companies.add(df['company'].iloc[start:stop])
+            if 'city' in df.columns:
+                sketches.cities.add(df['city'].iloc[start:stop])
+
+            entries = slice(matrix.matrix.indptr[start], matrix.matrix.indptr[stop])
+            skill_ids, counts = np.unique(matrix.indices[entries], return_counts=True)
+            skills = [matrix.skills[skill] for skill in skill_ids.tolist()]
+            sketches.skill_frequencies.add_hashes(value_hashes(skills), counts)
+            sketches.top_skills.add_counts(skills, counts.tolist())
+        return sketches
+
+    def merge(self, other):
+        merged = FrameSketches(self.companies.precision, self.skill_frequencies.table.shape[1],
+                               self.top_skills.capacity)
+        merged.companies = self.companies.merge(other.companies)
+        merged.cities = self.cities.merge(other.cities)
+        merged.skill_frequencies = self.skill_frequencies.merge(other.skill_frequencies)
+        merged.top_skills = self.top_skills.merge(other.top_skills)
+        return merged
+
+    def top_skill_estimates(self, n):
+        """[(skill, estimate, max overcount), ...] - the tighter of Space-Saving and Count-Min"""
+        top = self.top_skills.top(n)
+        if not top:
+            return []
+        estimates = self.skill_frequencies.estimate_hashes(value_hashes([skill for skill, _, _ in top]))
+        cms_error = self.skill_frequencies.error_bound()
+        return [
+            (skill, int(min(count, estimate)), float(min(error, cms_error)))
+            for (skill, count, error), estimate in zip(top, estimates.tolist())
+        ]
+
+
+def _row_hashes(df, column):
+    """value_hashes of a column aligned with the rows, and which rows have a value"""
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=np.uint64), np.zeros(len(df), dtype=bool)
+    valid = df[column].notna().to_numpy()
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    hashes[valid] = value_hashes(df[column][valid])
+    return hashes, valid
+
+
+class CellSketches:
+    """Compact FrameSketches per (city, seniority, category, remote) cell of a dataset version.
+
+    Kept with the version's aggregates and merged on upload; a filter
+    selection on these dimensions is answered by merging the sketches of the
+    cells it selects, without touching the rows. cells is None when the
+    version has more than SKETCH_MAX_CELLS cells.
+    """
+
+    def __init__(self):
+        self.cells = {}
+
+    @staticmethod
+    def _new_sketches():
+        return FrameSketches(CELL_HLL_PRECISION, CELL_CMS_WIDTH, CELL_TOP_K_CAPACITY)
+
+    @classmethod
+    def from_frame(cls, df, matrix):
+        cell_sketches = cls()
+        codes, values = [], []
+        for column in CELL_DIMENSIONS:
+            if column in df.columns:
+                column_codes, uniques = pd.factorize(df[column])
+            else:
+                column_codes, uniques = np.full(len(df), -1, dtype=np.int64), []
+            codes.append(column_codes.astype(np.int64))
+            values.append(list(uniques) + [None])
+        if len(df) == 0:
+            return cell_sketches
+
+        keys, first, row_cells = np.unique(np.stack(codes, axis=1), axis=0, return_index=True, return_inverse=True)
+        row_cells = row_cells.ravel()
+        if len(keys) > SKETCH_MAX_CELLS:
+            cell_sketches.cells = None
+            return cell_sketches
+
+        # Cells in first-seen order; -1 codes index the trailing None of every value list
+        order = np.argsort(first, kind='stable')
+        cell_keys = [tuple(values[i][code] for i, code in enumerate(keys[cell].tolist())) for cell in order]
+        sketches = {cell: cls._new_sketches() for cell in order.tolist()}
+
+        company_hashes, has_company = _row_hashes(df, 'company')
+        city_hashes, has_city = _row_hashes(df, 'city')
+        rows = np.argsort(row_cells, kind='stable')
+        bounds = np.searchsorted(row_cells[rows], np.arange(len(keys) + 1))
+        for cell, cell_sketch in sketches.items():
+            cell_rows = rows[bounds[cell]:bounds[cell + 1]]
+            cell_sketch.companies.add_hashes(company_hashes[cell_rows][has_company[cell_rows]])
+            cell_sketch.cities.add_hashes(city_hashes[cell_rows][has_city[cell_rows]])
+
+        skill_hashes = value_hashes(matrix.skills)
+        for cell, pairs in grouped_counts(row_cells[matrix.entry_rows], matrix.indices, max(len(matrix.skills), 1)):
+            skill_ids = np.array([skill for skill, _ in pairs], dtype=np.int64)
+            counts = [count for _, count in pairs]
+            sketches[cell].skill_frequencies.add_hashes(skill_hashes[skill_ids], counts)
+            sketches[cell].top_skills = SpaceSaving.from_counts(
+                [matrix.skills[skill] for skill in skill_ids.tolist()], counts, CELL_TOP_K_CAPACITY)
+
+        cell_sketches.cells = {key: sketches[cell] for key, cell in zip(cell_keys, order.tolist())}
+        return cell_sketches
+
+    def merge(self, other):
+        merged = CellSketches()
+        if self.cells is None or other.cells is None:
+            merged.cells = None
+            return merged
+        merged.cells = dict(self.cells)
+        for key, sketches in other.cells.items():
+            merged.cells[key] = merged.cells[key].merge(sketches) if key in merged.cells else sketches
+        if len(merged.cells) > SKETCH_MAX_CELLS:
+            merged.cells = None
+        return merged
+
+    def select(self, filters):
+        """FrameSketches of the cells passing normalized filters (see DatasetStore.normalize_filters),
+        or None if a filter is not a cell dimension or the cells were not kept"""
+        if self.cells is None or any(column not in CELL_DIMENSIONS for column in filters):
+            return None
+        selected = self._new_sketches()
+        positions = [(CELL_DIMENSIONS.index(column), values) for column, values in filters.items()]
+        for key, sketches in self.cells.items():
+            if all(key[position] in values for position, values in positions):
+                selected = selected.merge(sketches)
+        return selected
@@ -0,0 +1,312 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from columnar import SkillsBlock
+
+# Full-dataset matrices keyed by DatasetStore dataset key (dataset_id, version)
+_registry = {}
+_registry_lock = threading.Lock()
+
+# Row subsets (filtered frames) of registered matrices, so per-filter
+# caches such as the co-occurrence matrix survive between callbacks
+MAX_SLICES = 32
+_slices = OrderedDict()
+
+
+class SkillMatrix:
+    """Jobs x skills incidence matrix in CSR layout.
+
+    The value of an entry is the 1-based id of the skill level, so
+    levels[value - 1] is the level name. Entries keep the order of the
+    original skills dicts, which lets callers reproduce first-seen
+    ordering of the old row-by-row loops.
+    """
+
+    def __init__(self, matrix, skills, levels, present):
+        self.matrix = matrix
+        self.skills = skills
+        self.levels = levels
+        self.present = np.asarray(present, dtype=bool)
+        self._skill_ids = None
+        self._entry_rows = None
+        self._first_seen = None
+        self._csc = None
+        self._cooccurrence = None
+
+    @classmethod
+    def from_block(cls, block):
+        matrix = sp.csr_matrix(
+            (block.data, block.indices, block.indptr),
+            shape=(len(block.present), len(block.skills))
+        )
+        return cls(matrix, block.skills, block.levels, block.present)
+
+    @classmethod
+    def from_series(cls, series):
+        return cls.from_block(SkillsBlock.from_series(series))
+
+    def to_block(self):
+        """SkillsBlock with the same rows, e.g. to append new rows to it"""
+        return SkillsBlock(self.matrix.indptr, self.matrix.indices, self.matrix.data,
+                           self.present, self.skills, self.levels)
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    @property
+    def skill_ids(self):
+        """Mapping of skill name to column id"""
+        if self._skill_ids is None:
+            self._skill_ids = {skill: i for i, skill in enumerate(self.skills)}
+        return self._skill_ids
+
+    @property
+    def indices(self):
+        """Skill id of every entry, row by row"""
+        return self.matrix.indices
+
+    @property
+    def data(self):
+        """1-based level id of every entry"""
+        return self.matrix.data
+
+    @property
+    def entry_rows(self):
+        """Row position of every entry"""
+        if self._entry_rows is None:
+            self._entry_rows = np.repeat(np.arange(self.shape[0]), np.diff(self.matrix.indptr))
+        return self._entry_rows
+
+    def take(self, rows):
+        """Matrix restricted to the given row positions"""
+        rows = np.asarray(rows, dtype=np.int64)
+        return SkillMatrix(self.matrix[rows], self.skills, self.levels, self.present[rows])
+
+    def skill_counts(self):
+        """Number of jobs requiring each skill"""
+        return np.bincount(self.indices, minlength=self.shape[1])
+
+    def most_common_ids(self, n=None):
+        """Ids of the n most requested skills; ties keep first-seen order like Counter.most_common"""
+        order = first_seen_order(self.indices)
+        counts = self.skill_counts()[order]
+        ranked = order[np.argsort(-counts, kind='stable')]
+        return ranked if n is None else ranked[:n]
+
+    def row_counts(self):
+        """Number of skills of each job"""
+        return np.diff(self.matrix.indptr)
+
+    def incidence(self):
+        """Binary (0/1) version of the matrix"""
+        binary = self.matrix.copy()
+        binary.data = np.ones(len(binary.data), dtype=np.int32)
+        return binary
+
+    def column_ids(self, skills):
+        """Column ids of the known skills among the given names"""
+        return [self.skill_ids[skill] for skill in skills if skill in self.skill_ids]
+
+    def rows_with_any(self, skills):
+        """Boolean mask of jobs requiring at least one of the skills"""
+        return self.rows_matching(skills, 'any')
+
+    def rows_matching(self, skills, mode='any'):
+        """Boolean mask of jobs requiring any ('any') or all ('all') of the skills.
+
+        Unknown skills never match, so with 'all' they empty the selection.
+        """
+        ids = self.column_ids(skills)
+        if mode == 'all' and len(set(ids)) < len(set(skills)):
+            return np.zeros(self.shape[0], dtype=bool)
+        if not ids:
+            return np.zeros(self.shape[0], dtype=bool)
+
+        # Intersect or union the row sets (CSC columns) of the skills
+        csc = self.csc()
+        mask = np.zeros(self.shape[0], dtype=bool)
+        if mode == 'all':
+            mask[csc.indices[csc.indptr[ids[0]]:csc.indptr[ids[0] + 1]]] = True
+            for skill in ids[1:]:
+                skill_mask = np.zeros(self.shape[0], dtype=bool)
+                skill_mask[csc.indices[csc.indptr[skill]:csc.indptr[skill + 1]]] = True
+                mask &= skill_mask
+        else:
+            for skill in ids:
+                mask[csc.indices[csc.indptr[skill]:csc.indptr[skill + 1]]] = True
+        return mask
+
+    def csc(self):
+        """Column-major copy of the matrix: the rows of every skill"""
+        if self._csc is None:
+            csc = self.matrix.tocsc()
+            csc.sort_indices()
+            self._csc = csc
+        return self._csc
+
+    def first_seen_ids(self):
+        """Skill ids in order of first appearance"""
+        if self._first_seen is None:
+            self._first_seen = first_seen_order(self.indices)
+        return self._first_seen
+
+    def cooccurrence(self):
+        """Skills x skills matrix of the number of jobs requiring both skills; the diagonal holds skill counts"""
+        if self._cooccurrence is None:
+            incidence = self.incidence()
+            self._cooccurrence = (incidence.T @ incidence).tocsr()
+        return self._cooccurrence
+
+    def set_cooccurrence(self, cooccurrence):
+        """Use a co-occurrence matrix maintained elsewhere (e.g. merged from aggregates)"""
+        self._cooccurrence = cooccurrence.tocsr()
+
+    def cooccurrence_counts(self, skills, mode='any'):
+        """Number of jobs matching the selection (see rows_matching) that require each skill"""
+        ids = self.column_ids(skills)
+        if len(set(skills)) == 1 and ids:
+            # A single skill is a row lookup in the precomputed co-occurrence matrix
+            return self.cooccurrence()[ids[0]].toarray().ravel()
+        mask = self.rows_matching(skills, mode)
+        return np.bincount(self.indices[mask[self.entry_rows]], minlength=self.shape[1])
+
+    def frequent_itemsets(self, min_count, max_size=3):
+        """Sets of skills required together by at least min_count jobs.
+
+        Level-wise (Apriori) search on the incidence data: pairs come from the
+        co-occurrence of frequent skills, and every frequent itemset is then
+        extended by all later skills at once with one sparse column sum over
+        the jobs it covers. Returns {tuple of sorted skill ids: job count}.
+        """
+        counts = self.skill_counts()
+        frequent = np.flatnonzero(counts >= min_count)
+        itemsets = {(int(skill),): int(counts[skill]) for skill in frequent}
+        if max_size < 2 or len(frequent) < 2:
+            return itemsets
+
+        # Work on the frequent columns only, re-indexed 0..k-1 in skill id order
+        incidence = self.incidence()[:, frequent].tocsr()
+        csc = incidence.tocsc()
+        csc.sort_indices()
+
+        pairs = (incidence.T @ incidence).tocoo()
+        keep = (pairs.row < pairs.col) & (pairs.data >= min_count)
+        level = {
+            (int(first), int(second)): int(count)
+            for first, second, count in zip(pairs.row[keep], pairs.col[keep], pairs.data[keep])
+        }
+
+        all_levels = dict(level)
+        for _ in range(3, max_size + 1):
+            next_level = {}
+            for itemset in sorted(level):
+                # Jobs covering the itemset: intersection of its skills' row sets
+                rows = csc.indices[csc.indptr[itemset[0]]:csc.indptr[itemset[0] + 1]]
+                for skill in itemset[1:]:
+                    rows = np.intersect1d(rows, csc.indices[csc.indptr[skill]:csc.indptr[skill + 1]],
+                                          assume_unique=True)
+
+                extension_counts = np.asarray(incidence[rows].sum(axis=0)).ravel()
+                for skill in np.flatnonzero(extension_counts >= min_count):
+                    if skill <= itemset[-1]:
+                        continue
+                    candidate = itemset + (int(skill),)
+                    # Every subset of a frequent itemset must be frequent
+                    if all(candidate[:i] + candidate[i + 1:] in level for i in range(len(itemset))):
+                        next_level[candidate] = int(extension_counts[skill])
+            if not next_level:
+                break
+            all_levels.update(next_level)
+            level = next_level
+
+        itemsets.update(
+            (tuple(int(frequent[local]) for local in itemset), count)
+            for itemset, count in all_levels.items()
+        )
+        return itemsets
+
+
+def first_seen_order(codes):
+    """Unique codes ordered by their first appearance"""
+    codes = np.asarray(codes)
+    if len(codes) == 0:
+        return codes
+    uniques, first = np.unique(codes, return_index=True)
+    return uniques[np.argsort(first, kind='stable')]
+
+
+def grouped_counts(group_codes, item_codes, n_items):
+    """Count (group, item) pairs keeping first-seen order of groups and of items within a group.
+
+    Returns a list of (group_code, [(item_code, count), ...]).
+    """
+    pair_codes = np.asarray(group_codes, dtype=np.int64) * n_items + np.asarray(item_codes, dtype=np.int64)
+    if len(pair_codes) == 0:
+        return []
+    uniques, first, counts = np.unique(pair_codes, return_index=True, return_counts=True)
+    order = np.argsort(first, kind='stable')
+
+    groups = {}
+    for pair, count in zip(uniques[order].tolist(), counts[order].tolist()):
+        group, item = divmod(pair, n_items)
+        groups.setdefault(group, []).append((item, count))
+    return list(groups.items())
+
+
+def register(key, matrix):
+    with _registry_lock:
+        _registry[key] = matrix
+
+
+def unregister(key):
+    with _registry_lock:
+        _registry.pop(key, None)
+        for slice_key in [k for k in _slices if k[0] == key]:
+            del _slices[slice_key]
+
+
+def _slice(key, matrix, rows):
+    """Row subset of a registered matrix, reused while the same rows are asked for"""
+    rows = np.ascontiguousarray(rows, dtype=np.int64)
+    slice_key = (key, hashlib.blake2b(rows.tobytes(), digest_size=16).digest())
+    with _registry_lock:
+        if slice_key in _slices:
+            _slices.move_to_end(slice_key)
+            return _slices[slice_key]
+
+    sliced = matrix.take(rows)
+    with _registry_lock:
+        if _registry.get(key) is matrix:
+            _slices[slice_key] = sliced
+            while len(_slices) > MAX_SLICES:
+                _slices.popitem(last=False)
+    return sliced
+
+
+def for_frame(df):
+    """Skill matrix for the rows of a DataFrame.
+
+    Frames served by DatasetStore carry their dataset key in df.attrs and
+    keep the dataset row positions as index, so the matrix built once per
+    dataset version is just sliced; recent slices are kept, one per filter
+    selection. Any other frame is encoded on the spot.
+    """
+    key = df.attrs.get('dataset_key')
+    with _registry_lock:
+        matrix = _registry.get(key)
+
+    if matrix is not None and pd.api.types.is_integer_dtype(df.index.dtype):
+        if df.index.equals(pd.RangeIndex(matrix.shape[0])):
+            return matrix
+        rows = df.index.to_numpy()
+        if len(rows) == 0 or (rows.min() >= 0 and rows.max() < matrix.shape[0]):
+            return _slice(key, matrix, rows)
+
+    if 'skills' not in df.columns:
+        return SkillMatrix.from_series(pd.Series([None] * len(df)))
+    return SkillMatrix.from_series(df['skills'])
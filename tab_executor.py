@@ -0,0 +1,43 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads shared by all tab renders for their independent aggregations; 1 runs them in sequence
+TAB_EXECUTOR_THREADS = int(os.environ.get('TAB_EXECUTOR_THREADS', '4'))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # Pool threads do not survive a fork (background jobs); the child starts its own pool
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=TAB_EXECUTOR_THREADS, thread_name_prefix='tab-render')
+        return _executor
+
+
+def run_parallel(*calls):
+    """Run independent zero-argument calls concurrently and return their results in order.
+
+    The first call runs in the calling thread and the rest in the shared
+    pool, so a render waits for the slowest call instead of their sum.
+    Threads rather than processes: the heavy numpy/pandas work releases the
+    GIL and the DataFrame and skill matrix are shared instead of copied.
+    """
+    if len(calls) < 2 or TAB_EXECUTOR_THREADS <= 1:
+        return [call() for call in calls]
+    futures = [_get_executor().submit(call) for call in calls[1:]]
+    results = [calls[0]()]
+    results.extend(future.result() for future in futures)
+    return results
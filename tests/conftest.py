@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+
+from data_processor import DataProcessor
+from sketches import SpaceSaving
+from skill_matrix import SkillMatrix
+
+CITIES = ['Warszawa', 'Kraków', 'Wrocław', 'Gdańsk', 'Poznań']
+SENIORITIES = ['Junior', 'Mid', 'Senior', 'Expert']
+CATEGORIES = ['Backend', 'Frontend', 'DevOps', 'Data']
+LEVELS = ['Nice to have', 'Junior', 'Regular', 'Senior', 'Expert']
+
+
+def make_offers(n, seed, skills=30, cities=CITIES, start='2025-01-01'):
+    """Job offers like an uploaded JSON file, with some missing fields"""
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(start, periods=60)
+    offers = []
+    for i in range(n):
+        low = int(rng.integers(5, 30)) * 1000
+        offer = {
+            'role': f"Dev {seed}-{i}",
+            'category': CATEGORIES[rng.integers(len(CATEGORIES))],
+            'city': cities[rng.integers(len(cities))],
+            'company': f"Co{rng.integers(n // 4 + 1)}",
+            'salary': f"{low} - {low + 5000} PLN" if rng.random() < 0.7 else None,
+            'published_date': days[rng.integers(len(days))].strftime('%d.%m.%Y'),
+            'skills': {
+                f"Skill{skill}": LEVELS[rng.integers(len(LEVELS))]
+                for skill in rng.choice(skills, size=rng.integers(1, 6), replace=False)
+            },
+            'seniority': SENIORITIES[rng.integers(len(SENIORITIES))],
+            'remote': bool(rng.random() < 0.3)
+        }
+        if i % 17 == 0:
+            offer['city'] = None
+        if i % 23 == 0:
+            offer['skills'] = None
+        offers.append(offer)
+    return offers
+
+
+def offers_frame(offers):
+    return DataProcessor().enrich(pd.DataFrame(offers))
+
+
+@pytest.fixture
+def base_frame():
+    return offers_frame(make_offers(400, seed=1))
+
+
+@pytest.fixture
+def delta_frame():
+    # New cities, skills and days that the base frame does not have
+    return offers_frame(make_offers(150, seed=2, skills=40, cities=CITIES + ['Łódź', 'Lublin'], start='2025-02-15'))
+
+
+def skill_matrix_of(df):
+    return SkillMatrix.from_series(df['skills'])
+
+
+def parsed_salaries(df):
+    return pd.to_numeric(DataProcessor()._parse_salary_data(df)['salary_avg'], errors='coerce').to_numpy(dtype=float)
+
+
+def assert_equivalent(actual, expected, path=''):
+    """Recursive equality of aggregates: dict key order, arrays, sparse matrices, floats up to rounding.
+
+    Space-Saving counters are compared without their order, which depends
+    on how ties were met.
+    """
+    if isinstance(expected, SpaceSaving):
+        assert actual.capacity == expected.capacity, path
+        assert actual.counts == expected.counts and actual.errors == expected.errors, path
+    elif isinstance(expected, dict):
+        assert isinstance(actual, dict) and list(actual) == list(expected), path
+        for key in expected:
+            assert_equivalent(actual[key], expected[key], f"{path}/{key}")
+    elif isinstance(expected, (list, tuple)):
+        assert len(actual) == len(expected), path
+        for i, (a, b) in enumerate(zip(actual, expected)):
+            assert_equivalent(a, b, f"{path}[{i}]")
+    elif sp.issparse(expected):
+        assert actual.shape == expected.shape and (actual != expected).nnz == 0, path
+    elif isinstance(expected, pd.Index):
+        assert actual.equals(expected), path
+    elif isinstance(expected, np.ndarray) and expected.dtype.kind == 'f':
+        np.testing.assert_allclose(actual, expected, rtol=1e-9, err_msg=path)
+    elif isinstance(expected, np.ndarray):
+        np.testing.assert_array_equal(actual, expected, err_msg=path)
+    elif isinstance(expected, (float, np.floating)):
+        assert (np.isnan(actual) and np.isnan(expected)) or np.isclose(actual, expected, rtol=1e-9), path
+    elif hasattr(expected, '__dict__'):
+        assert type(actual) is type(expected), path
+        assert_equivalent(vars(actual), vars(expected), path)
+    else:
+        assert actual == expected, path
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from aggregates import DatasetAggregates
+from conftest import assert_equivalent, parsed_salaries, skill_matrix_of
+
+
+def build(df):
+    return DatasetAggregates.from_frame(df, skill_matrix_of(df), parsed_salaries(df))
+
+
+def test_merge_matches_build_of_concatenated_rows(base_frame, delta_frame):
+    full = pd.concat([base_frame, delta_frame], ignore_index=True)
+    merged = build(base_frame).merge(build(delta_frame))
+    assert_equivalent(merged, build(full))
+
+
+def test_merge_of_partitions_matches_single_build(base_frame):
+    parts = [base_frame.iloc[start:start + 100].reset_index(drop=True) for start in range(0, len(base_frame), 100)]
+    merged = build(parts[0])
+    for part in parts[1:]:
+        merged = merged.merge(build(part))
+    assert_equivalent(merged, build(base_frame))
+
+
+def test_merge_with_empty_delta(base_frame):
+    assert_equivalent(build(base_frame).merge(build(base_frame.iloc[:0])), build(base_frame))
@@ -0,0 +1,80 @@
+import os
+import numpy as np
+import pandas as pd
+
+import columnar
+from columnar import SkillsBlock
+
+
+def write(tmp_path, name, df, store='store', version=1, arrays=None):
+    path = str(tmp_path / name)
+    columnar.write_dataset(path, str(tmp_path / store), df, meta={'dataset_id': 'test', 'version': version},
+                           skills_block=SkillsBlock.from_series(df['skills']), arrays=arrays)
+    return path
+
+
+def append(tmp_path, name, base_path, df, version=2, arrays=None):
+    return columnar.append_dataset(str(tmp_path / name), base_path, df, meta={'dataset_id': 'test', 'version': version},
+                                   skills_block=SkillsBlock.from_series(df['skills']), arrays=arrays)
+
+
+def read(path):
+    df, skills_block = columnar.read_dataset(path, mmap_mode=None)
+    return df, skills_block.to_dicts()
+
+
+def test_append_matches_full_write(tmp_path, base_frame, delta_frame):
+    full = pd.concat([base_frame, delta_frame], ignore_index=True)
+    base_path = write(tmp_path, 'v1', base_frame, arrays={'digests': np.arange(len(base_frame) * 2).reshape(-1, 2)})
+    assert append(tmp_path, 'v2', base_path, delta_frame,
+                  arrays={'digests': np.arange(len(delta_frame) * 2).reshape(-1, 2) + 10 ** 6})
+    full_path = write(tmp_path, 'full', full, store='full-store')
+
+    appended, appended_skills = read(str(tmp_path / 'v2'))
+    written, written_skills = read(full_path)
+    pd.testing.assert_frame_equal(appended, written)
+    assert appended_skills == written_skills
+    assert appended_skills == list(full['skills'])
+    assert columnar.read_meta(str(tmp_path / 'v2'))['store'] == 'store'
+
+    digests = columnar.read_array(str(tmp_path / 'v2'), 'digests', mmap_mode=None)
+    assert len(digests) == len(full)
+    assert digests[len(base_frame)].tolist() == [10 ** 6, 10 ** 6 + 1]
+
+
+def test_append_keeps_base_version(tmp_path, base_frame, delta_frame):
+    base_path = write(tmp_path, 'v1', base_frame)
+    before, before_skills = read(base_path)
+    assert append(tmp_path, 'v2', base_path, delta_frame)
+
+    after, after_skills = read(base_path)
+    pd.testing.assert_frame_equal(after, before)
+    assert after_skills == before_skills
+
+
+def test_append_refuses_second_append_to_same_base(tmp_path, base_frame, delta_frame):
+    base_path = write(tmp_path, 'v1', base_frame)
+    assert append(tmp_path, 'v2', base_path, delta_frame)
+    assert not append(tmp_path, 'v2b', base_path, delta_frame.iloc[:10].reset_index(drop=True))
+    assert not os.path.exists(tmp_path / 'v2b')
+
+
+def test_append_refuses_other_columns(tmp_path, base_frame, delta_frame):
+    base_path = write(tmp_path, 'v1', base_frame)
+    assert not append(tmp_path, 'v2', base_path, delta_frame.assign(extra=1))
+    assert not os.path.exists(tmp_path / 'v2')
+
+
+def test_append_drops_bytes_of_failed_append(tmp_path, base_frame, delta_frame):
+    base_path = write(tmp_path, 'v1', base_frame)
+    # An append that wrote its rows but never committed them
+    for name in os.listdir(tmp_path / 'store'):
+        if name.endswith('.bin'):
+            with open(tmp_path / 'store' / name, 'ab') as f:
+                f.write(b'\0' * 100)
+    assert append(tmp_path, 'v2', base_path, delta_frame)
+
+    appended, _ = read(str(tmp_path / 'v2'))
+    written, _ = read(write(tmp_path, 'full', pd.concat([base_frame, delta_frame], ignore_index=True),
+                            store='full-store'))
+    pd.testing.assert_frame_equal(appended, written)
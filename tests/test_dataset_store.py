@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+from conftest import make_offers
+from dataset_store import DatasetStore, StaleVersionError
+from shared_cache import MemoryCache
+
+
+def new_store(path):
+    return DatasetStore(storage_dir=str(path), shared_cache=MemoryCache())
+
+
+def test_appended_version_reads_back_from_disk(tmp_path):
+    store = new_store(tmp_path)
+    base = store.create(make_offers(300, seed=1))
+    handle = store.append(base, make_offers(100, seed=2))
+    assert handle == {'dataset_id': base['dataset_id'], 'version': 2, 'rows': 400}
+
+    pd.testing.assert_frame_equal(new_store(tmp_path).get(handle), store.get(handle))
+    assert new_store(tmp_path).current_handle() == handle
+
+
+def test_append_to_stale_base_is_rejected(tmp_path):
+    store, other = new_store(tmp_path), new_store(tmp_path)
+    base = store.create(make_offers(300, seed=1))
+    first = other.append(base, make_offers(100, seed=2))
+
+    with pytest.raises(StaleVersionError):
+        store.append(base, make_offers(50, seed=3))
+    assert store.current_handle() == first
+    assert len(new_store(tmp_path).get(first)) == 400
+
+
+def test_append_to_missing_base_is_rejected(tmp_path):
+    store = new_store(tmp_path)
+    base = store.create(make_offers(300, seed=1))
+    with pytest.raises(StaleVersionError):
+        store.append(dict(base, version=7), make_offers(50, seed=3))
+    assert store.current_handle() == base
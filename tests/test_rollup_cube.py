@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from conftest import assert_equivalent, parsed_salaries, skill_matrix_of
+from data_processor import DataProcessor
+from rollup_cube import RollupCube
+
+
+def build(df):
+    return RollupCube.build(df, skill_matrix_of(df), parsed_salaries(df))
+
+
+def test_merge_matches_build_of_concatenated_rows(base_frame, delta_frame):
+    full = pd.concat([base_frame, delta_frame], ignore_index=True)
+    assert_equivalent(build(base_frame).merge(build(delta_frame)), build(full))
+
+
+def test_merged_slices_match_rows(base_frame, delta_frame):
+    full = pd.concat([base_frame, delta_frame], ignore_index=True)
+    cube = build(base_frame).merge(build(delta_frame))
+    for filters in [{}, {'city': ['Kraków', 'Łódź']}, {'seniority': ['Senior'], 'remote': [True]}]:
+        rows = full
+        for column, values in filters.items():
+            rows = rows[rows[column].isin(values)]
+        cube_slice = cube.slice(filters)
+
+        assert cube_slice.total_jobs() == len(rows)
+        assert cube_slice.nunique('company') == rows['company'].nunique()
+        pd.testing.assert_series_equal(cube_slice.value_counts('city'), rows['city'].value_counts(),
+                                       check_index_type=False)
+        salaries = parsed_salaries(rows)
+        salaries = salaries[~np.isnan(salaries)]
+        stats = cube_slice.salary_stats()
+        assert stats['count'] == len(salaries)
+        assert np.isclose(stats['mean'], salaries.mean()) and np.isclose(stats['std'], salaries.std(ddof=1))
+
+
+def test_day_counts_follow_cube_days(base_frame):
+    cube = build(base_frame)
+    counts = cube.slice().day_counts()
+    days = DataProcessor().published_dates(base_frame).dt.normalize().value_counts()
+    assert dict(zip(cube.days, counts.tolist())) == days.to_dict()
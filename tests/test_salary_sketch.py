@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from salary_sketch import SKETCH_CAPACITY, SalarySketch, grouped_sketches
+
+
+def rank_error(sorted_values, estimate, q):
+    """Distance in ranks between an estimated quantile and the rank np.quantile interpolates at"""
+    target = q * (len(sorted_values) - 1)
+    low = np.searchsorted(sorted_values, estimate, side='left')
+    high = np.searchsorted(sorted_values, estimate, side='right')
+    return 0 if low <= target <= high else min(abs(low - target), abs(high - target))
+
+
+def test_merge_of_exact_sketches_is_exact():
+    rng = np.random.default_rng(1)
+    left = rng.integers(5, 40, size=300) * 1000.0
+    right = rng.integers(20, 60, size=200) * 1000.0
+    values = np.concatenate([left, right])
+
+    merged = SalarySketch.from_values(left).merge(SalarySketch.from_values(right))
+    assert merged.count == len(values)
+    assert merged.mean() == pytest.approx(values.mean())
+    assert merged.std(ddof=1) == pytest.approx(values.std(ddof=1))
+    assert (merged.min, merged.max) == (values.min(), values.max())
+    for q in np.linspace(0, 1, 21):
+        assert merged.quantile(q) == pytest.approx(np.quantile(values, q))
+
+
+def test_merged_quantiles_stay_within_rank_bound():
+    rng = np.random.default_rng(2)
+    left = rng.lognormal(9.7, 0.4, size=20000).round(-1)
+    right = rng.lognormal(9.9, 0.3, size=30000).round(-1)
+    values = np.sort(np.concatenate([left, right]))
+
+    merged = SalarySketch.from_values(left).merge(SalarySketch.from_values(right))
+    assert len(merged.values) <= SKETCH_CAPACITY
+    assert merged.count == len(values)
+    assert merged.mean() == pytest.approx(values.mean())
+    assert merged.std() == pytest.approx(values.std())
+    bound = 2 * len(values) / SKETCH_CAPACITY
+    for q in np.linspace(0, 1, 101):
+        assert rank_error(values, merged.quantile(q), q) <= bound
+
+
+def test_merge_order_does_not_change_totals():
+    rng = np.random.default_rng(3)
+    parts = [rng.normal(15000, 4000, size=size).round() for size in (3000, 500, 7000)]
+    forward = SalarySketch.from_values(parts[0]).merge(SalarySketch.from_values(parts[1])).merge(
+        SalarySketch.from_values(parts[2]))
+    backward = SalarySketch.from_values(parts[2]).merge(SalarySketch.from_values(parts[1])).merge(
+        SalarySketch.from_values(parts[0]))
+    assert forward.count == backward.count
+    assert forward.mean() == pytest.approx(backward.mean())
+    assert forward.median() == pytest.approx(backward.median(), rel=0.01)
+
+
+def test_grouped_sketches_skip_missing_values():
+    codes = np.array([0, 1, -1, 0, 1, 1])
+    values = np.array([10.0, np.nan, 30.0, 20.0, 40.0, 50.0])
+    sketches = grouped_sketches(codes, values)
+    assert list(sketches) == [0, 1]
+    assert sketches[0].count == 2 and sketches[0].median() == 15.0
+    assert sketches[1].count == 2 and sketches[1].mean() == 45.0
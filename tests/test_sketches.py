@@ -0,0 +1,101 @@
+from collections import Counter
+
+import numpy as np
+
+from conftest import skill_matrix_of
+from sketches import CellSketches, CountMinSketch, HyperLogLog, SpaceSaving, value_hashes
+
+
+def zipf_counts(n_items, seed):
+    rng = np.random.default_rng(seed)
+    return Counter({f"item{i}": int(count) for i, count in enumerate(rng.zipf(1.3, size=n_items).clip(max=5000))})
+
+
+def test_hyperloglog_within_three_standard_errors():
+    for precision, distinct in [(10, 500), (10, 50000), (12, 200000)]:
+        sketch = HyperLogLog(precision)
+        sketch.add([f"company{i}" for i in range(distinct)])
+        assert abs(sketch.estimate() - distinct) <= 3 * sketch.relative_error() * distinct
+
+
+def test_hyperloglog_merge_is_union():
+    left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    left.add([f"city{i}" for i in range(0, 3000)])
+    right.add([f"city{i}" for i in range(2000, 6000)])
+    union.add([f"city{i}" for i in range(0, 6000)])
+    np.testing.assert_array_equal(left.merge(right).registers, union.registers)
+
+
+def test_count_min_never_undercounts_and_respects_error_bound():
+    counts = zipf_counts(2000, seed=1)
+    sketch = CountMinSketch(width=128)
+    items = list(counts)
+    sketch.add_hashes(value_hashes(items), [counts[item] for item in items])
+
+    estimates = sketch.estimate_hashes(value_hashes(items))
+    true = np.array([counts[item] for item in items])
+    assert (estimates >= true).all()
+    # An estimate exceeds the bound with probability at most exp(-depth) per item
+    over = np.mean(estimates - true > sketch.error_bound())
+    assert over <= np.exp(-sketch.table.shape[0])
+
+
+def test_count_min_merge_adds_tables():
+    counts = zipf_counts(500, seed=2)
+    items = list(counts)
+    left, right, whole = CountMinSketch(256), CountMinSketch(256), CountMinSketch(256)
+    left.add_hashes(value_hashes(items[:300]), [counts[item] for item in items[:300]])
+    right.add_hashes(value_hashes(items[300:]), [counts[item] for item in items[300:]])
+    whole.add_hashes(value_hashes(items), [counts[item] for item in items])
+    merged = left.merge(right)
+    np.testing.assert_array_equal(merged.table, whole.table)
+    assert merged.total == whole.total
+
+
+def assert_space_saving_bounds(summary, counts):
+    for item, count in summary.counts.items():
+        assert counts[item] <= count <= counts[item] + summary.errors[item]
+    floor = summary.min_count()
+    for item, count in counts.items():
+        if item not in summary.counts:
+            assert count <= floor
+    # Every item above total / capacity is tracked
+    total = sum(counts.values())
+    assert all(item in summary.counts for item, count in counts.items() if count > total / summary.capacity)
+
+
+def test_space_saving_bounds_on_batches():
+    counts = zipf_counts(3000, seed=3)
+    items = list(counts)
+    rng = np.random.default_rng(4)
+    rng.shuffle(items)
+    summary = SpaceSaving(capacity=50)
+    for start in range(0, len(items), 200):
+        batch = items[start:start + 200]
+        summary.add_counts(batch, [counts[item] for item in batch])
+    assert_space_saving_bounds(summary, counts)
+
+
+def test_space_saving_merge_keeps_bounds():
+    counts = zipf_counts(3000, seed=5)
+    items = list(counts)
+    left, right = SpaceSaving(capacity=50), SpaceSaving(capacity=50)
+    left.add_counts(items[:1500], [counts[item] for item in items[:1500]])
+    right.add_counts(items[1500:], [counts[item] for item in items[1500:]])
+    assert_space_saving_bounds(left.merge(right), counts)
+
+
+def test_cell_sketches_select_bounds_filtered_rows(base_frame):
+    cells = CellSketches.from_frame(base_frame, skill_matrix_of(base_frame))
+    for filters in [{}, {'city': ['Kraków', 'Gdańsk']}, {'seniority': ['Junior'], 'remote': [False]}]:
+        rows = base_frame
+        for column, values in filters.items():
+            rows = rows[rows[column].isin(values)]
+        sketches = cells.select(filters)
+
+        companies = rows['company'].nunique()
+        assert abs(sketches.companies.estimate() - companies) <= 3 * sketches.companies.relative_error() * companies
+        skill_counts = Counter(skill for skills in rows['skills'] if isinstance(skills, dict) for skill in skills)
+        for skill, estimate, error in sketches.top_skill_estimates(10):
+            assert skill_counts[skill] <= estimate <= skill_counts[skill] + error
+    assert cells.select({'company': ['Co1']}) is None
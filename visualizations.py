@@ -5,27 +5,181 @@ from plotly.subplots import make_subplots
 import dash_bootstrap_components as dbc
 from dash import html, dcc, dash_table
 import numpy as np
+import aggregates
 from data_processor import DataProcessor
+from salary_sketch import SalarySketch, grouped_sketches
+from tab_executor import run_parallel
+
+def nice_bin_edges(values, nbins):
+    """Edges of about nbins equal bins with a round width (1, 2, 2.5 or 5 times a power of ten)
+    covering values; small-range integer data, like skill counts, gets one bin per integer"""
+    values = np.asarray(values, dtype=float)
+    low, high = float(values.min()), float(values.max())
+    raw = (high - low) / max(nbins, 1)
+    if raw <= 1 and np.all(values == np.round(values)):
+        step, start = 1.0, low - 0.5
+    else:
+        magnitude = 10 ** np.floor(np.log10(raw)) if raw > 0 else 1.0
+        step = next(factor * magnitude for factor in (1, 2, 2.5, 5, 10) if factor * magnitude >= raw)
+        start = np.floor(low / step) * step
+    return start + step * np.arange(int(np.floor((high - start) / step)) + 2)
 
 class ChartGenerator:
     def __init__(self):
         self.data_processor = DataProcessor()
         self.color_palette = px.colors.qualitative.Set3
     
+    def _histogram_figure(self, values, nbins, title, x_label):
+        """Histogram binned on the server - the figure holds bin counts, not every value"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        fig = go.Figure()
+        if len(values) > 0:
+            edges = nice_bin_edges(values, nbins)
+            counts, _ = np.histogram(values, bins=edges)
+            fig.add_trace(go.Bar(
+                x=(edges[:-1] + edges[1:]) / 2,
+                y=counts,
+                width=edges[1] - edges[0],
+                customdata=np.column_stack([edges[:-1], edges[1:]]),
+                hovertemplate='%{customdata[0]:,.0f} - %{customdata[1]:,.0f}<br>Liczba ofert: %{y}<extra></extra>'
+            ))
+        fig.update_layout(title=title, xaxis_title=x_label, yaxis_title='Liczba ofert', bargap=0)
+        return fig
+    
+    def _binned_scatter_figure(self, x, y, title, x_label, y_label, nbins=40):
+        """Scatter of x against y as a 2D histogram with a least-squares trendline.
+        
+        Only bin counts and the two ends of the line are sent to the browser,
+        however many points there are.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        x, y = x[valid], y[valid]
+        fig = go.Figure()
+        if len(x) > 0:
+            x_edges, y_edges = nice_bin_edges(x, nbins), nice_bin_edges(y, nbins)
+            counts, _, _ = np.histogram2d(x, y, bins=[x_edges, y_edges])
+            fig.add_trace(go.Heatmap(
+                x=(x_edges[:-1] + x_edges[1:]) / 2,
+                y=(y_edges[:-1] + y_edges[1:]) / 2,
+                z=np.where(counts > 0, counts, np.nan).T,
+                colorscale='Blues',
+                colorbar={'title': 'Liczba ofert'},
+                hovertemplate=f'{x_label}: %{{x}}<br>{y_label}: %{{y:,.0f}}<br>Liczba ofert: %{{z}}<extra></extra>'
+            ))
+            
+            # Ordinary least squares y = slope * x + intercept
+            if len(x) > 1 and np.ptp(x) > 0:
+                (slope, intercept), _, _, _ = np.linalg.lstsq(np.column_stack([x, np.ones(len(x))]), y, rcond=None)
+                residual = y - (slope * x + intercept)
+                r_squared = 1 - (residual @ residual) / (((y - y.mean()) ** 2).sum()) if np.ptp(y) > 0 else 0.0
+                line_x = np.array([x.min(), x.max()])
+                fig.add_trace(go.Scatter(
+                    x=line_x,
+                    y=slope * line_x + intercept,
+                    mode='lines',
+                    name=f'Trend (R² = {r_squared:.3f})',
+                    line={'color': 'red'},
+                    hovertemplate=f'{y_label} = {slope:,.0f} * {x_label} + {intercept:,.0f}<br>R² = {r_squared:.3f}<extra></extra>'
+                ))
+        fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label)
+        return fig
+    
     def _calculate_avg_skills(self, df):
         """Calculate average number of skills per job"""
-        skills_counts = []
-        for _, row in df.iterrows():
-            if isinstance(row.get('skills'), dict):
-                skills_counts.append(len(row['skills']))
-        return sum(skills_counts) / len(skills_counts) if skills_counts else 0
+        skills_counts = self.data_processor.skills_counts(df).dropna()
+        return skills_counts.mean() if len(skills_counts) else 0
+    
+    def _cooccurrence_controls(self, skills):
+        """Skill selector, any/all mode and results container of the co-occurrence panel"""
+        skill_selector = dcc.Dropdown(
+            id='skill-selector',
+            options=[{'label': skill, 'value': skill} for skill in skills],
+            value=[],
+            multi=True,
+            placeholder="Wybierz umiejętności...",
+            style={
+                'backgroundColor': '#343a40',
+                'color': 'black'
+            }
+        )
+        
+        # Whether co-occurrence counts jobs with any or with all of the selected skills
+        cooccurrence_mode = dbc.RadioItems(
+            id='cooccurrence-mode',
+            options=[
+                {'label': 'Dowolna z wybranych', 'value': 'any'},
+                {'label': 'Wszystkie wybrane', 'value': 'all'}
+            ],
+            value='any',
+            inline=True,
+            className="mt-2"
+        )
+        
+        # Container for co-occurring skills results
+        cooccurrence_results = html.Div(
+            id='cooccurrence-results',
+            children=[html.P("Wybierz umiejętności, aby zobaczyć najczęściej współwystępujące z nimi.", 
+                           style={'color': 'white', 'textAlign': 'center', 'padding': '20px'})]
+        )
+        
+        return [
+            html.P("Wybierz umiejętności:", className="text-muted mb-2"),
+            skill_selector,
+            cooccurrence_mode,
+            html.Br(),
+            cooccurrence_results
+        ]
+    
+    def _skills_stats_table(self, top_skills, total_jobs, approximate=False):
+        """Table of (skill, count) pairs with their share of all offers; approximate counts are marked with ≈"""
+        prefix = "≈" if approximate else ""
+        stats_data = []
+        for skill, count in top_skills:
+            percentage = (count / total_jobs) * 100
+            stats_data.append({
+                'Umiejętność': skill,
+                'Liczba ofert': f"{prefix}{count:,}" if approximate else count,
+                'Procent': f"{prefix}{percentage:.1f}%"
+            })
+        
+        return dash_table.DataTable(
+            data=stats_data,
+            columns=[
+                {'name': 'Umiejętność', 'id': 'Umiejętność'},
+                {'name': 'Liczba ofert', 'id': 'Liczba ofert'},
+                {'name': 'Procent ofert', 'id': 'Procent'}
+            ],
+            style_cell={
+                'textAlign': 'left',
+                'backgroundColor': '#343a40',
+                'color': 'white',
+                'border': '1px solid rgba(255, 255, 255, 0.2)'
+            },
+            style_header={
+                'backgroundColor': '#6c757d',
+                'color': 'white',
+                'fontWeight': 'bold',
+                'border': '1px solid rgba(255, 255, 255, 0.3)'
+            },
+            style_data={
+                'backgroundColor': '#343a40',
+                'color': 'white'
+            }
+        )
     
     def create_skills_analysis(self, df):
         """Create skills analysis tab content"""
-        skills_counter, skills_levels, skills_by_seniority = self.data_processor.process_skills_data(df)
+        # Independent aggregations run concurrently
+        (skills_counter, skills_levels, skills_by_seniority), skill_combinations, top_skills_by_category = \
+            run_parallel(
+                lambda: self.data_processor.process_skills_data(df),
+                lambda: self.data_processor.get_skill_combinations(df),
+                lambda: self.data_processor.get_top_skills_by_category(df)
+            )
         skill_weights = self.data_processor.calculate_skill_weights(skills_levels)
-        skill_combinations = self.data_processor.get_skill_combinations(df)
-        top_skills_by_category = self.data_processor.get_top_skills_by_category(df)
         
         # Top 20 skills bar chart
         top_skills = skills_counter.most_common(20)
@@ -86,49 +240,40 @@ class ChartGenerator:
                                       x=0.5, y=0.5, showarrow=False)
         
         # Skills selector for co-occurrence analysis
-        top_20_skills_list = [skill for skill, _ in skills_counter.most_common(20)]
-        skill_selector = dcc.Dropdown(
-            id='skill-selector',
-            options=[{'label': skill, 'value': skill} for skill in top_20_skills_list],
-            value=[],
-            multi=True,
-            placeholder="Wybierz maksymalnie 3 umiejętności...",
-            style={
-                'backgroundColor': '#343a40',
-                'color': 'black'
-            }
-        )
-        
-        # Container for co-occurring skills results
-        cooccurrence_results = html.Div(
-            id='cooccurrence-results',
-            children=[html.P("Wybierz umiejętności, aby zobaczyć najczęściej współwystępujące z nimi.", 
-                           style={'color': 'white', 'textAlign': 'center', 'padding': '20px'})]
-        )
+        cooccurrence_controls = self._cooccurrence_controls([skill for skill, _ in skills_counter.most_common(20)])
         
         # Skills statistics table
-        top_10_skills = skills_counter.most_common(10)
-        stats_data = []
-        for skill, count in top_10_skills:
-            percentage = (count / len(df)) * 100
-            stats_data.append({
-                'Umiejętność': skill,
-                'Liczba ofert': count,
-                'Procent': f"{percentage:.1f}%"
+        stats_table = self._skills_stats_table(skills_counter.most_common(10), len(df))
+        
+        # Skill combinations table
+        combinations_data = []
+        for combination in skill_combinations:
+            combinations_data.append({
+                'Kombinacja': ' + '.join(combination['skills']),
+                'Liczba ofert': combination['count'],
+                'Wsparcie': f"{combination['support'] * 100:.1f}%",
+                'Reguła': f"{' + '.join(combination['antecedent'])} → {combination['consequent']}",
+                'Pewność': f"{combination['confidence'] * 100:.1f}%",
+                'Lift': f"{combination['lift']:.2f}"
             })
         
-        stats_table = dash_table.DataTable(
-            data=stats_data,
+        combinations_table = dash_table.DataTable(
+            data=combinations_data,
             columns=[
-                {'name': 'Umiejętność', 'id': 'Umiejętność'},
+                {'name': 'Kombinacja', 'id': 'Kombinacja'},
                 {'name': 'Liczba ofert', 'id': 'Liczba ofert'},
-                {'name': 'Procent ofert', 'id': 'Procent'}
+                {'name': 'Wsparcie', 'id': 'Wsparcie'},
+                {'name': 'Najsilniejsza reguła', 'id': 'Reguła'},
+                {'name': 'Pewność', 'id': 'Pewność'},
+                {'name': 'Lift', 'id': 'Lift'}
             ],
             style_cell={
                 'textAlign': 'left',
                 'backgroundColor': '#343a40',
                 'color': 'white',
-                'border': '1px solid rgba(255, 255, 255, 0.2)'
+                'border': '1px solid rgba(255, 255, 255, 0.2)',
+                'whiteSpace': 'normal',
+                'height': 'auto'
             },
             style_header={
                 'backgroundColor': '#6c757d',
@@ -215,10 +360,7 @@ class ChartGenerator:
                     dbc.Card([
                         dbc.CardBody([
                             html.H4("🔗 Współwystępujące Umiejętności"),
-                            html.P("Wybierz maksymalnie 3 umiejętności:", className="text-muted mb-2"),
-                            skill_selector,
-                            html.Br(),
-                            cooccurrence_results
+                            *cooccurrence_controls
                         ])
                     ])
                 ], md=4),
@@ -249,16 +391,84 @@ class ChartGenerator:
                         ])
                     ])
                 ], md=6)
+            ], className="mb-4"),
+            
+            dbc.Row([
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardBody([
+                            html.H4("🧩 Najczęstsze Kombinacje Umiejętności"),
+                            combinations_table if skill_combinations else html.P("Brak częstych kombinacji umiejętności")
+                        ])
+                    ])
+                ], md=12)
             ])
         ])
     
-    def create_experience_analysis(self, df):
-        """Create experience analysis tab content"""
-        if 'seniority' not in df.columns:
+    def create_approximate_skills_analysis(self, sketches, total_jobs):
+        """Create skills analysis tab content from FrameSketches alone, without the offers"""
+        # Space-Saving top-k with Count-Min estimates; bars show the maximum overcount
+        top_skills = sketches.top_skill_estimates(20)
+        skills_df = pd.DataFrame(top_skills, columns=['Umiejętność', 'Liczba ofert', 'Maks. błąd'])
+        fig_skills = px.bar(
+            skills_df,
+            x='Liczba ofert',
+            y='Umiejętność',
+            title='Top 20 Najpopularniejszych Umiejętności (przybliżone, Count-Min + Space-Saving)',
+            orientation='h',
+            error_x_minus='Maks. błąd',
+            error_x=[0] * len(skills_df)
+        )
+        fig_skills.update_layout(height=600, yaxis={'categoryorder': 'total ascending'})
+        
+        cooccurrence_controls = self._cooccurrence_controls([skill for skill, _, _ in top_skills])
+        stats_table = self._skills_stats_table(
+            [(skill, count) for skill, count, _ in top_skills[:10]], total_jobs, approximate=True
+        )
+        
+        return dbc.Container([
+            dbc.Row([
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardBody([
+                            html.H4("📊 Najpopularniejsze Umiejętności"),
+                            dcc.Graph(figure=fig_skills)
+                        ])
+                    ])
+                ], md=12)
+            ], className="mb-4"),
+            
+            dbc.Row([
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardBody([
+                            html.H4("📈 Statystyki Top 10 Umiejętności"),
+                            stats_table
+                        ])
+                    ])
+                ], md=6),
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardBody([
+                            html.H4("🔗 Współwystępujące Umiejętności"),
+                            *cooccurrence_controls
+                        ])
+                    ])
+                ], md=6)
+            ], className="mb-4"),
+            
+            dbc.Alert("Poziomy, wagi, kombinacje i umiejętności według kategorii są dostępne po wyłączeniu trybu przybliżonego.",
+                      color="info")
+        ])
+    
+    def create_experience_analysis(self, df, cube=None):
+        """Create experience analysis tab content; counts come from the rollup cube slice when given,
+        and df may then be None"""
+        if 'seniority' not in (cube.cube.columns if cube is not None else df.columns):
             return dbc.Alert("Brak danych o poziomach doświadczenia", color="warning")
         
         # Seniority distribution
-        seniority_counts = df['seniority'].value_counts()
+        seniority_counts = cube.value_counts('seniority') if cube is not None else df['seniority'].value_counts()
         seniority_df = pd.DataFrame({
             'Poziom': seniority_counts.index,
             'Liczba': seniority_counts.values
@@ -272,8 +482,15 @@ class ChartGenerator:
         )
         
         # Skills vs experience heatmap
-        skills_counter, _, skills_by_seniority = self.data_processor.process_skills_data(df)
-        top_skills = [skill for skill, _ in skills_counter.most_common(15)]
+        if cube is not None:
+            top_skill_ids = cube.most_common_skill_ids(15)
+            top_skills = [cube.cube.skills[skill] for skill in top_skill_ids]
+            skills_by_seniority = cube.skill_counts_by('seniority', top_skill_ids)
+            avg_skills = cube.avg_skills()
+        else:
+            skills_counter, _, skills_by_seniority = self.data_processor.process_skills_data(df)
+            top_skills = [skill for skill, _ in skills_counter.most_common(15)]
+            avg_skills = self._calculate_avg_skills(df)
         
         heatmap_data = []
         seniority_levels = list(skills_by_seniority.keys())
@@ -319,7 +536,7 @@ class ChartGenerator:
                             html.H4("📈 Statystyki Poziomów"),
                             html.Div([
                                 html.P(f"Najwięcej ofert: {seniority_counts.index[0]} ({seniority_counts.iloc[0]} ofert)"),
-                                html.P(f"Średnio umiejętności na ofertę: {self._calculate_avg_skills(df):.1f}"),
+                                html.P(f"Średnio umiejętności na ofertę: {avg_skills:.1f}"),
                                 html.P(f"Całkowita liczba poziomów: {len(seniority_counts)}")
                             ])
                         ])
@@ -339,15 +556,17 @@ class ChartGenerator:
             ])
         ])
     
-    def create_location_analysis(self, df):
-        """Create location analysis tab content"""
-        if 'city' not in df.columns:
+    def create_location_analysis(self, df, cube=None):
+        """Create location analysis tab content; statistics come from the rollup cube slice when given,
+        and df may then be None"""
+        columns = cube.cube.columns if cube is not None else df.columns
+        if 'city' not in columns:
             return dbc.Alert("Brak danych o lokalizacji", color="warning")
         
-        location_stats = self.data_processor.get_location_stats(df)
+        location_stats = self.data_processor.get_location_stats(df, cube)
         
         # Top cities by job count
-        city_counts = df['city'].value_counts().head(15)
+        city_counts = (cube.value_counts('city') if cube is not None else df['city'].value_counts()).head(15)
         fig_cities = px.bar(
             x=city_counts.values,
             y=city_counts.index,
@@ -358,9 +577,10 @@ class ChartGenerator:
         fig_cities.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
         
         # Remote vs on-site distribution
-        if 'remote' in df.columns:
-            remote_counts = df['remote'].value_counts()
-            remote_labels = ['Stacjonarna/Hybrydowa', 'Zdalna']
+        if 'remote' in columns:
+            remote_counts = cube.value_counts('remote') if cube is not None else df['remote'].value_counts()
+            # Labelled by value - a remote filter leaves a single slice
+            remote_labels = ['Zdalna' if remote else 'Stacjonarna/Hybrydowa' for remote in remote_counts.index]
             
             fig_remote = px.pie(
                 values=remote_counts.values,
@@ -538,10 +758,13 @@ class ChartGenerator:
             ])
         ])
     
-    def create_trends_analysis(self, df):
-        """Create trends analysis tab content"""
-        daily_counts = self.data_processor.process_time_series(df)
-        skill_trends = self.data_processor.get_skill_trends(df)
+    def create_trends_analysis(self, df, cube=None):
+        """Create trends analysis tab content; counts come from the rollup cube slice when given,
+        and df may then be None"""
+        daily_counts, skill_trends = run_parallel(
+            lambda: self.data_processor.process_time_series(df, cube=cube),
+            lambda: self.data_processor.get_skill_trends(df, cube=cube)
+        )
         
         if daily_counts.empty:
             return dbc.Alert("Brak danych o datach publikacji ofert", color="warning")
@@ -556,32 +779,47 @@ class ChartGenerator:
         )
         
         # Skills trends
-        if not skill_trends.empty:
-            fig_skill_trends = go.Figure()
-            
-            skill_columns = [col for col in skill_trends.columns if col != 'date']
-            for skill in skill_columns:
-                fig_skill_trends.add_trace(go.Scatter(
-                    x=skill_trends['date'],
-                    y=skill_trends[skill],
-                    mode='lines+markers',
-                    name=skill,
-                    line=dict(width=2)
-                ))
-            
-            fig_skill_trends.update_layout(
-                title='Trendy Top 5 Umiejętności w Czasie',
-                xaxis_title='Data',
-                yaxis_title='Liczba ofert',
-                height=500
-            )
-        else:
-            fig_skill_trends = go.Figure()
-            fig_skill_trends.add_annotation(text="Brak danych o trendach umiejętności", 
-                                          x=0.5, y=0.5, showarrow=False)
+        fig_skill_trends = self.create_skill_trends_figure(skill_trends, 5)
+        
+        # Skills trends options - number of skills, date buckets and rolling average
+        trends_controls = dbc.Row([
+            dbc.Col([
+                html.Label("Liczba umiejętności:"),
+                dcc.Dropdown(
+                    id='trends-top-n',
+                    options=[{'label': str(n), 'value': n} for n in [5, 10, 20, 50]],
+                    value=5,
+                    clearable=False
+                )
+            ], md=4),
+            dbc.Col([
+                html.Label("Przedział:"),
+                dcc.Dropdown(
+                    id='trends-frequency',
+                    options=[
+                        {'label': 'Dzień', 'value': 'D'},
+                        {'label': 'Tydzień', 'value': 'W'},
+                        {'label': 'Miesiąc', 'value': 'M'}
+                    ],
+                    value='D',
+                    clearable=False
+                )
+            ], md=4),
+            dbc.Col([
+                html.Label("Średnia krocząca:"),
+                dcc.Dropdown(
+                    id='trends-rolling',
+                    options=[{'label': 'Brak', 'value': 0}] + [
+                        {'label': f"{n} przedziały" if n < 5 else f"{n} przedziałów", 'value': n} for n in [3, 7, 14]
+                    ],
+                    value=0,
+                    clearable=False
+                )
+            ], md=4)
+        ], className="mb-3")
         
         # Market summary
-        total_jobs = len(df)
+        total_jobs = cube.total_jobs() if cube is not None else len(df)
         date_range = ""
         if not daily_counts.empty:
             start_date = daily_counts['date'].min().strftime('%Y-%m-%d')
@@ -619,15 +857,49 @@ class ChartGenerator:
                     dbc.Card([
                         dbc.CardBody([
                             html.H4("🔥 Trendy Umiejętności"),
-                            dcc.Graph(figure=fig_skill_trends)
+                            trends_controls,
+                            dcc.Graph(id='skill-trends-chart', figure=fig_skill_trends)
                         ])
                     ])
                 ], md=12)
             ])
         ])
     
+    def create_skill_trends_figure(self, skill_trends, top_n):
+        """Line chart of skill trends returned by get_skill_trends"""
+        if skill_trends.empty:
+            fig_skill_trends = go.Figure()
+            fig_skill_trends.add_annotation(text="Brak danych o trendach umiejętności", 
+                                          x=0.5, y=0.5, showarrow=False)
+            return fig_skill_trends
+        
+        fig_skill_trends = go.Figure()
+        
+        skill_columns = [col for col in skill_trends.columns if col != 'date']
+        for skill in skill_columns:
+            fig_skill_trends.add_trace(go.Scatter(
+                x=skill_trends['date'],
+                y=skill_trends[skill],
+                mode='lines+markers' if len(skill_trends) <= 100 else 'lines',
+                name=skill,
+                line=dict(width=2)
+            ))
+        
+        fig_skill_trends.update_layout(
+            title=f'Trendy Top {top_n} Umiejętności w Czasie',
+            xaxis_title='Data',
+            yaxis_title='Liczba ofert',
+            height=500
+        )
+        return fig_skill_trends
+    
     def create_salary_analysis(self, df):
-        """Create salary analysis tab content"""
+        """Create salary analysis tab content.
+        
+        Only the panel layout is built here; every panel is filled by its own
+        callback (see create_salary_panel), so the statistics show up while
+        the heavier correlations are still being computed.
+        """
         # Check if we have any salary data (either parsed or string format)
         has_salary_data = ('salary_avg' in df.columns and df['salary_avg'].notna().any()) or \
                          ('salary' in df.columns and df['salary'].notna().any())
@@ -635,6 +907,66 @@ class ChartGenerator:
         if not has_salary_data:
             return dbc.Alert("Brak danych o wynagrodzeniach w kolumnach 'salary' lub 'salary_avg'", color="warning")
         
+        return dbc.Container([
+            dbc.Row([
+                dbc.Col([self._salary_panel('distribution', "📊 Rozkład Wynagrodzeń")], md=8),
+                dbc.Col([self._salary_panel('stats', "💰 Statystyki Wynagrodzeń")], md=4)
+            ], className="mb-4"),
+            
+            dbc.Row([
+                dbc.Col([self._salary_panel('top-skills', "🏆 Najlepiej Płacące Umiejętności")], md=12)
+            ], className="mb-4"),
+            
+            dbc.Row([
+                dbc.Col([self._salary_panel('seniority', "📈 Pensje według Doświadczenia")], md=6),
+                dbc.Col([self._salary_panel('skills-count', "🔗 Umiejętności vs Wynagrodzenie")], md=6)
+            ], className="mb-4"),
+            
+            # Skills correlation table
+            dbc.Row([
+                dbc.Col([
+                    self._salary_panel(
+                        'skills-correlation', "📊 Korelacja Umiejętności z Wynagrodzeniami",
+                        "Tabela pokazuje korelację poszczególnych umiejętności z wysokością wynagrodzenia:")
+                ], md=12)
+            ], className="mb-4"),
+            
+            # Correlation matrix
+            dbc.Row([
+                dbc.Col([
+                    self._salary_panel(
+                        'correlation-matrix', "🔥 Macierz Korelacji",
+                        "Heatmapa pokazuje korelacje między różnymi czynnikami a wynagrodzeniem:")
+                ], md=12)
+            ])
+        ])
+    
+    def _salary_panel(self, panel, title, description=None):
+        """Card with a loading placeholder that the salary panel callback fills"""
+        return dbc.Card([
+            dbc.CardBody([
+                html.H4(title),
+                html.P(description) if description else None,
+                dcc.Loading(html.Div(id={'type': 'salary-panel', 'panel': panel}), type='circle')
+            ])
+        ])
+    
+    def create_salary_panel(self, df, panel):
+        """Create the contents of one salary analysis panel"""
+        builders = {
+            'stats': self._create_salary_stats,
+            'distribution': self._create_salary_distribution,
+            'top-skills': self._create_top_paying_skills,
+            'seniority': self._create_seniority_salary,
+            'skills-count': self._create_skills_count_salary,
+            'skills-correlation': self._create_skills_salary_correlation,
+            'correlation-matrix': self._create_salary_correlation_matrix
+        }
+        if panel not in builders:
+            return html.Div()
+        return builders[panel](df)
+    
+    def _create_salary_stats(self, df):
         salary_df = self.data_processor.process_salary_data(df)
         
         if salary_df.empty:
@@ -643,18 +975,39 @@ class ChartGenerator:
             salary_count = parsed_df['salary_avg'].notna().sum() if 'salary_avg' in parsed_df.columns else 0
             return dbc.Alert(f"Brak poprawnych danych o wynagrodzeniach po parsowaniu. Znaleziono {salary_count} zapisów z wynagrodzeniami.", color="warning")
         
-        skill_salary_stats = self.data_processor.get_salary_by_skill(df)
-        correlation_matrix = self.data_processor.calculate_correlation_matrix(df)
-        skills_salary_correlation = self.data_processor.calculate_skills_salary_correlation(df)
+        # Salary statistics
+        salary_stats = {
+            'mean': salary_df['salary_avg'].mean(),
+            'median': salary_df['salary_avg'].median(),
+            'min': salary_df['salary_avg'].min(),
+            'max': salary_df['salary_avg'].max(),
+            'std': salary_df['salary_avg'].std(),
+            'count': len(salary_df)
+        }
+        
+        return html.Div([
+            html.P(f"Średnia: {salary_stats['mean']:,.0f} PLN"),
+            html.P(f"Mediana: {salary_stats['median']:,.0f} PLN"),
+            html.P(f"Minimum: {salary_stats['min']:,.0f} PLN"),
+            html.P(f"Maksimum: {salary_stats['max']:,.0f} PLN"),
+            html.P(f"Odchylenie std: {salary_stats['std']:,.0f} PLN"),
+            html.P(f"Liczba ofert z pensją: {salary_stats['count']:,}")
+        ])
+    
+    def _create_salary_distribution(self, df):
+        salary_df = self.data_processor.process_salary_data(df)
         
         # Salary distribution histogram
-        fig_salary_dist = px.histogram(
-            salary_df,
-            x='salary_avg',
+        fig_salary_dist = self._histogram_figure(
+            salary_df['salary_avg'],
+            nbins=30,
             title='Rozkład Wynagrodzeń',
-            labels={'salary_avg': 'Wynagrodzenie (PLN)', 'count': 'Liczba ofert'},
-            nbins=30
+            x_label='Wynagrodzenie (PLN)'
         )
+        return dcc.Graph(figure=fig_salary_dist)
+    
+    def _create_top_paying_skills(self, df):
+        skill_salary_stats = self.data_processor.get_salary_by_skill(df)
         
         # Top paying skills
         if skill_salary_stats:
@@ -678,197 +1031,128 @@ class ChartGenerator:
             fig_skills_salary = go.Figure()
             fig_skills_salary.add_annotation(text="Brak danych o wynagrodzeniach dla umiejętności", 
                                            x=0.5, y=0.5, showarrow=False)
-        
+        return dcc.Graph(figure=fig_skills_salary)
+    
+    def _create_seniority_salary(self, df):
         # Salary by seniority
-        if 'seniority' in salary_df.columns:
-            seniority_salary = salary_df.groupby('seniority')['salary_avg'].agg(['mean', 'count']).reset_index()
-            seniority_salary = seniority_salary[seniority_salary['count'] >= 3]  # Minimum samples
+        if 'seniority' in df.columns:
+            seniority_salary = pd.DataFrame([
+                {'seniority': seniority, 'mean': stats['mean'], 'count': stats['count'],
+                 'median': stats['median'], 'p25': stats['p25'], 'p75': stats['p75']}
+                for seniority, stats in sorted(self.data_processor.get_salary_by_seniority(df).items(),
+                                               key=lambda x: str(x[0]))
+                if stats['count'] >= 3  # Minimum samples
+            ], columns=['seniority', 'mean', 'count', 'median', 'p25', 'p75'])
             
             fig_seniority_salary = px.bar(
                 seniority_salary,
                 x='seniority',
                 y='mean',
                 title='Średnie Wynagrodzenia według Poziomu Doświadczenia',
-                labels={'seniority': 'Poziom doświadczenia', 'mean': 'Średnie wynagrodzenie (PLN)'}
+                labels={'seniority': 'Poziom doświadczenia', 'mean': 'Średnie wynagrodzenie (PLN)',
+                        'median': 'Mediana (PLN)', 'p25': 'P25 (PLN)', 'p75': 'P75 (PLN)'},
+                hover_data=['median', 'p25', 'p75', 'count']
             )
         else:
             fig_seniority_salary = go.Figure()
             fig_seniority_salary.add_annotation(text="Brak danych o poziomach doświadczenia", 
                                                x=0.5, y=0.5, showarrow=False)
-        
-        # Skills salary correlation table
-        skills_corr_table = html.Div()
-        if skills_salary_correlation:
-            # Sort by correlation coefficient
-            sorted_skills = sorted(skills_salary_correlation.items(), 
-                                 key=lambda x: abs(x[1]['correlation']), reverse=True)[:20]
-            
-            corr_data = []
-            for skill, stats in sorted_skills:
-                salary_diff = stats['avg_with_skill'] - stats['avg_without_skill']
-                corr_data.append({
-                    'Umiejętność': skill,
-                    'Korelacja': f"{stats['correlation']:.3f}",
-                    'Średnia z umiejętnością': f"{stats['avg_with_skill']:,.0f} PLN",
-                    'Średnia bez umiejętności': f"{stats['avg_without_skill']:,.0f} PLN",
-                    'Różnica': f"{salary_diff:+,.0f} PLN",
-                    'Liczba z umiejętnością': stats['count_with_skill']
-                })
-            
-            skills_corr_table = dash_table.DataTable(
-                data=corr_data,
-                columns=[
-                    {'name': 'Umiejętność', 'id': 'Umiejętność'},
-                    {'name': 'Korelacja', 'id': 'Korelacja'},
-                    {'name': 'Średnia z umiejętnością', 'id': 'Średnia z umiejętnością'},
-                    {'name': 'Średnia bez umiejętności', 'id': 'Średnia bez umiejętności'},
-                    {'name': 'Różnica', 'id': 'Różnica'},
-                    {'name': 'Liczba ofert', 'id': 'Liczba z umiejętnością'}
-                ],
-                style_cell={
-                    'textAlign': 'left',
-                    'fontSize': '12px',
-                    'backgroundColor': '#343a40',
-                    'color': 'white',
-                    'border': '1px solid rgba(255, 255, 255, 0.2)'
-                },
-                style_header={
-                    'backgroundColor': '#6c757d',
-                    'color': 'white',
-                    'fontWeight': 'bold',
-                    'border': '1px solid rgba(255, 255, 255, 0.3)'
-                },
-                style_data={
-                    'backgroundColor': '#343a40',
-                    'color': 'white'
-                },
-                page_size=10,
-                sort_action='native'
-            )
-        
-        # Correlation matrix heatmap
-        fig_correlation_matrix = go.Figure()
-        if not correlation_matrix.empty:
-            fig_correlation_matrix = px.imshow(
-                correlation_matrix,
-                title='Macierz Korelacji - Czynniki Wpływające na Wynagrodzenie',
-                aspect='auto',
-                color_continuous_scale='RdBu',
-                zmin=-1, zmax=1
-            )
-            fig_correlation_matrix.update_layout(height=500)
+        return dcc.Graph(figure=fig_seniority_salary)
+    
+    def _create_skills_count_salary(self, df):
+        salary_df = self.data_processor.process_salary_data(df)
         
         # Correlation with experience
         if 'skillsCount' in salary_df.columns:
-            fig_skills_correlation = px.scatter(
-                salary_df,
-                x='skillsCount',
-                y='salary_avg',
+            fig_skills_correlation = self._binned_scatter_figure(
+                pd.to_numeric(salary_df['skillsCount'], errors='coerce'),
+                salary_df['salary_avg'],
                 title='Korelacja: Liczba Umiejętności vs Wynagrodzenie',
-                labels={'skillsCount': 'Liczba umiejętności', 'salary_avg': 'Wynagrodzenie (PLN)'},
-                trendline='ols'
+                x_label='Liczba umiejętności',
+                y_label='Wynagrodzenie (PLN)'
             )
         else:
             fig_skills_correlation = go.Figure()
             fig_skills_correlation.add_annotation(text="Brak danych o liczbie umiejętności", 
                                                  x=0.5, y=0.5, showarrow=False)
+        return dcc.Graph(figure=fig_skills_correlation)
+    
+    def _create_skills_salary_correlation(self, df):
+        skills_salary_correlation = self.data_processor.calculate_skills_salary_correlation(df)
         
-        # Salary statistics
-        salary_stats = {
-            'mean': salary_df['salary_avg'].mean(),
-            'median': salary_df['salary_avg'].median(),
-            'min': salary_df['salary_avg'].min(),
-            'max': salary_df['salary_avg'].max(),
-            'std': salary_df['salary_avg'].std(),
-            'count': len(salary_df)
-        }
+        if not skills_salary_correlation:
+            return html.P("Brak wystarczających danych do analizy korelacji umiejętności.")
         
-        stats_card = dbc.Card([
-            dbc.CardBody([
-                html.H4("💰 Statystyki Wynagrodzeń"),
-                html.P(f"Średnia: {salary_stats['mean']:,.0f} PLN"),
-                html.P(f"Mediana: {salary_stats['median']:,.0f} PLN"),
-                html.P(f"Minimum: {salary_stats['min']:,.0f} PLN"),
-                html.P(f"Maksimum: {salary_stats['max']:,.0f} PLN"),
-                html.P(f"Odchylenie std: {salary_stats['std']:,.0f} PLN"),
-                html.P(f"Liczba ofert z pensją: {salary_stats['count']:,}")
-            ])
-        ])
+        # Sort by correlation coefficient
+        sorted_skills = sorted(skills_salary_correlation.items(), 
+                             key=lambda x: abs(x[1]['correlation']), reverse=True)[:20]
         
-        return dbc.Container([
-            dbc.Row([
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H4("📊 Rozkład Wynagrodzeń"),
-                            dcc.Graph(figure=fig_salary_dist)
-                        ])
-                    ])
-                ], md=8),
-                dbc.Col([stats_card], md=4)
-            ], className="mb-4"),
-            
-            dbc.Row([
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H4("🏆 Najlepiej Płacące Umiejętności"),
-                            dcc.Graph(figure=fig_skills_salary)
-                        ])
-                    ])
-                ], md=12)
-            ], className="mb-4"),
-            
-            dbc.Row([
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H4("📈 Pensje według Doświadczenia"),
-                            dcc.Graph(figure=fig_seniority_salary)
-                        ])
-                    ])
-                ], md=6),
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H4("🔗 Umiejętności vs Wynagrodzenie"),
-                            dcc.Graph(figure=fig_skills_correlation)
-                        ])
-                    ])
-                ], md=6)
-            ], className="mb-4"),
-            
-            # Skills correlation table
-            dbc.Row([
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H4("📊 Korelacja Umiejętności z Wynagrodzeniami"),
-                            html.P("Tabela pokazuje korelację poszczególnych umiejętności z wysokością wynagrodzenia:"),
-                            skills_corr_table if skills_salary_correlation else html.P("Brak wystarczających danych do analizy korelacji umiejętności.")
-                        ])
-                    ])
-                ], md=12)
-            ], className="mb-4"),
-            
-            # Correlation matrix
-            dbc.Row([
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H4("🔥 Macierz Korelacji"),
-                            html.P("Heatmapa pokazuje korelacje między różnymi czynnikami a wynagrodzeniem:"),
-                            dcc.Graph(figure=fig_correlation_matrix) if not correlation_matrix.empty else html.P("Brak danych do macierzy korelacji.")
-                        ])
-                    ])
-                ], md=12)
-            ])
-        ])
+        corr_data = []
+        for skill, stats in sorted_skills:
+            salary_diff = stats['avg_with_skill'] - stats['avg_without_skill']
+            corr_data.append({
+                'Umiejętność': skill,
+                'Korelacja': f"{stats['correlation']:.3f}",
+                'Średnia z umiejętnością': f"{stats['avg_with_skill']:,.0f} PLN",
+                'Średnia bez umiejętności': f"{stats['avg_without_skill']:,.0f} PLN",
+                'Różnica': f"{salary_diff:+,.0f} PLN",
+                'Liczba z umiejętnością': stats['count_with_skill']
+            })
+        
+        return dash_table.DataTable(
+            data=corr_data,
+            columns=[
+                {'name': 'Umiejętność', 'id': 'Umiejętność'},
+                {'name': 'Korelacja', 'id': 'Korelacja'},
+                {'name': 'Średnia z umiejętnością', 'id': 'Średnia z umiejętnością'},
+                {'name': 'Średnia bez umiejętności', 'id': 'Średnia bez umiejętności'},
+                {'name': 'Różnica', 'id': 'Różnica'},
+                {'name': 'Liczba ofert', 'id': 'Liczba z umiejętnością'}
+            ],
+            style_cell={
+                'textAlign': 'left',
+                'fontSize': '12px',
+                'backgroundColor': '#343a40',
+                'color': 'white',
+                'border': '1px solid rgba(255, 255, 255, 0.2)'
+            },
+            style_header={
+                'backgroundColor': '#6c757d',
+                'color': 'white',
+                'fontWeight': 'bold',
+                'border': '1px solid rgba(255, 255, 255, 0.3)'
+            },
+            style_data={
+                'backgroundColor': '#343a40',
+                'color': 'white'
+            },
+            page_size=10,
+            sort_action='native'
+        )
+    
+    def _create_salary_correlation_matrix(self, df):
+        correlation_matrix = self.data_processor.calculate_correlation_matrix(df)
+        
+        if correlation_matrix.empty:
+            return html.P("Brak danych do macierzy korelacji.")
+        
+        # Correlation matrix heatmap
+        fig_correlation_matrix = px.imshow(
+            correlation_matrix,
+            title='Macierz Korelacji - Czynniki Wpływające na Wynagrodzenie',
+            aspect='auto',
+            color_continuous_scale='RdBu',
+            zmin=-1, zmax=1
+        )
+        fig_correlation_matrix.update_layout(height=500)
+        return dcc.Graph(figure=fig_correlation_matrix)
     
     def create_detailed_analysis(self, df):
         """Create detailed analysis tab content"""
-        skills_counter, skills_levels, skills_by_seniority = self.data_processor.process_skills_data(df)
-        skill_categories, category_skill_counts = self.data_processor.get_skills_by_category(df)
+        (skills_counter, skills_levels, skills_by_seniority), (skill_categories, category_skill_counts) = run_parallel(
+            lambda: self.data_processor.process_skills_data(df),
+            lambda: self.data_processor.get_skills_by_category(df)
+        )
         
         # Skill selector
         skill_options = [{'label': skill, 'value': skill} for skill, _ in skills_counter.most_common(50)]
@@ -977,27 +1261,31 @@ class ChartGenerator:
         if 'salary_avg' in skill_jobs_parsed.columns:
             skill_salaries = skill_jobs_parsed['salary_avg'].dropna()
             if len(skill_salaries) > 0:
-                # Comprehensive salary statistics
-                avg_salary = skill_salaries.mean()
-                median_salary = skill_salaries.median()
-                min_salary = skill_salaries.min()
-                max_salary = skill_salaries.max()
-                std_salary = skill_salaries.std()
-                count_salary = len(skill_salaries)
+                # Comprehensive salary statistics - from the skill's sketch kept for the whole
+                # dataset version, or sketched from the filtered offers
+                dataset_aggregates = aggregates.for_frame(df)
+                sketch = dataset_aggregates.skill_salaries.get(skill) if dataset_aggregates is not None else None
+                if sketch is None:
+                    sketch = SalarySketch.from_values(skill_salaries.to_numpy(dtype=float))
+                avg_salary = sketch.mean()
+                median_salary = sketch.median()
+                min_salary = sketch.min
+                max_salary = sketch.max
+                std_salary = sketch.std(ddof=1)
+                count_salary = sketch.count
+                percentiles = sketch.percentiles()
                 
                 salary_info = f"Średnia: {avg_salary:,.0f} PLN | Mediana: {median_salary:,.0f} PLN"
                 
                 # Salary by seniority
                 if 'seniority' in skill_jobs_parsed.columns:
-                    for seniority in skill_jobs_parsed['seniority'].dropna().unique():
-                        seniority_salaries = skill_jobs_parsed[
-                            skill_jobs_parsed['seniority'] == seniority
-                        ]['salary_avg'].dropna()
-                        
-                        if len(seniority_salaries) >= 2:  # Minimum sample size
-                            salary_by_seniority[seniority] = {
-                                'mean': seniority_salaries.mean(),
-                                'count': len(seniority_salaries)
+                    seniority_codes, seniorities = pd.factorize(skill_jobs_parsed['seniority'])
+                    salaries = skill_jobs_parsed['salary_avg'].to_numpy(dtype=float)
+                    for seniority, seniority_sketch in grouped_sketches(seniority_codes, salaries).items():
+                        if seniority_sketch.count >= 2:  # Minimum sample size
+                            salary_by_seniority[seniorities[seniority]] = {
+                                'mean': seniority_sketch.mean(),
+                                'count': seniority_sketch.count
                             }
                 
                 # Detailed salary statistics card
@@ -1006,6 +1294,8 @@ class ChartGenerator:
                         html.H5("📊 Szczegółowe Statystyki Wynagrodzeń"),
                         html.P(f"📈 Średnia: {avg_salary:,.0f} PLN"),
                         html.P(f"📊 Mediana: {median_salary:,.0f} PLN"),
+                        html.P(f"📐 Percentyle P10 / P25 / P75 / P90: {percentiles['p10']:,.0f} / "
+                               f"{percentiles['p25']:,.0f} / {percentiles['p75']:,.0f} / {percentiles['p90']:,.0f} PLN"),
                         html.P(f"⬇️ Minimum: {min_salary:,.0f} PLN"),
                         html.P(f"⬆️ Maksimum: {max_salary:,.0f} PLN"),
                         html.P(f"📏 Odchylenie standardowe: {std_salary:,.0f} PLN"),
@@ -1014,11 +1304,11 @@ class ChartGenerator:
                 ], className="mb-3")
                 
                 # Salary histogram
-                salary_chart = px.histogram(
+                salary_chart = self._histogram_figure(
                     skill_salaries,
+                    nbins=min(20, len(skill_salaries)//2) if len(skill_salaries) > 10 else 5,
                     title=f'Rozkład Wynagrodzeń dla {skill}',
-                    labels={'value': 'Wynagrodzenie (PLN)', 'count': 'Liczba ofert'},
-                    nbins=min(20, len(skill_salaries)//2) if len(skill_salaries) > 10 else 5
+                    x_label='Wynagrodzenie (PLN)'
                 )
         
         return dbc.Container([